@@ -0,0 +1,111 @@
+"""Compare encode throughput, resident memory and agreement of embedding backends.
+
+Each backend runs in its own process so peak RSS reflects only that backend:
+
+    python -m benchmarks.embedding_backends --minutes 60 --batch-sizes 16 32 64
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.fakes import apply_benchmark_env, synthetic_transcript
+
+apply_benchmark_env()
+
+from config import get_settings  # noqa: E402
+from utils.chunking import chunk_text  # noqa: E402
+from utils.embedding_backends import load_backend  # noqa: E402
+
+settings = get_settings()
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure_backend(
+    name: str, texts: List[str], batch_sizes: List[int], threads: int, queue
+) -> None:
+    backend = load_backend(
+        name, settings.EMBEDDING_MODEL, settings.EMBEDDING_ONNX_PATH, threads
+    )
+    backend.encode(texts[:8])  # Warm up
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        vectors = backend.encode(texts, batch_size=batch_size)
+        throughput[batch_size] = len(texts) / (time.perf_counter() - started)
+
+    queue.put(
+        {
+            "backend": name,
+            "throughput": throughput,
+            "peak_rss_mib": peak_rss_mib(),
+            "vectors": np.asarray(vectors, dtype=np.float32),
+        }
+    )
+
+
+def run_isolated(
+    name: str, texts: List[str], batch_sizes: List[int], threads: int
+) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=measure_backend, args=(name, texts, batch_sizes, threads, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--threads", type=int, default=settings.EMBEDDING_THREADS)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    args = parser.parse_args()
+
+    texts = chunk_text(synthetic_transcript(args.minutes))
+    print(f"Encoding {len(texts)} chunks ({args.minutes:.0f} minutes of speech)\n")
+
+    results = [
+        run_isolated(name, texts, args.batch_sizes, args.threads)
+        for name in args.backends
+    ]
+
+    for result in results:
+        rates = "  ".join(
+            f"bs={batch_size}: {rate:8.1f}/s"
+            for batch_size, rate in result["throughput"].items()
+        )
+        print(
+            f"{result['backend']:<6} peak RSS {result['peak_rss_mib']:8.1f} MiB  {rates}"
+        )
+
+    reference = results[0]["vectors"]
+    for result in results[1:]:
+        vectors = result["vectors"]
+        cosine = np.sum(reference * vectors, axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1)
+        )
+        print(
+            f"\n{result['backend']} vs {results[0]['backend']}: cosine "
+            f"min {cosine.min():.4f} mean {cosine.mean():.4f} "
+            f"(tolerance {settings.EMBEDDING_MIN_COSINE})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Deterministic offline stand-ins shared by the benchmarks and load tests."""
+
+import asyncio
+import os
+import random
+import re
+import zlib
+from typing import List, Union
+
+import numpy as np
+
+# Enough configuration for config.Settings to load without a .env file
+BENCHMARK_ENV = {
+    "DB_USER": "postgres",
+    "DB_PASSWORD": "postgres",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "video_gpt",
+    "JWT_SECRET": "benchmark-secret",
+    "GOOGLE_API_KEY": "benchmark-key",
+}
+
+WORDS_PER_MINUTE = 150
+
+_VOCABULARY = (
+    "the a of and to in that is it for on with as this was we you be are have "
+    "model video data network learning value function result example system "
+    "time process energy market history language image training layer signal "
+    "people question answer problem structure memory speed design theory test"
+).split()
+
+
+def apply_benchmark_env() -> None:
+    for key, value in BENCHMARK_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+def synthetic_transcript(minutes: float, seed: int = 0) -> str:
+    """Generate speech-like text of roughly the length of a video of this duration."""
+    rng = random.Random(seed)
+    words_remaining = int(minutes * WORDS_PER_MINUTE)
+    sentences = []
+    while words_remaining > 0:
+        length = min(rng.randint(6, 24), words_remaining)
+        words = rng.choices(_VOCABULARY, k=length)
+        sentences.append(" ".join(words).capitalize())
+        words_remaining -= length
+    return ". ".join(sentences) + "."
+
+
+class HashingEncoder:
+    """Tiny deterministic embedding model with the SentenceTransformer encode API.
+
+    Each token is hashed into one of `dimension` buckets, so similar texts get
+    similar vectors without downloading any model weights.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(token.encode()) % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts: Union[str, List[str]], **kwargs) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._encode_one(texts)
+        return np.stack([self._encode_one(text) for text in texts])
+
+
+class FakeLLM:
+    """Stand-in for get_gemini_response with a configurable fixed latency."""
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    async def __call__(self, context: str, question: str) -> str:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return f"Answer to '{question}' from {len(context)} characters of context."
@@ -0,0 +1,275 @@
+"""End-to-end load test of one API instance with local stand-ins.
+
+Boots the FastAPI app in a child process against a local Postgres, with a fake
+Gemini backend of configurable latency, a deterministic embedding stand-in and
+Celery's in-memory broker, then drives mixed authenticated traffic at it:
+
+    python -m benchmarks.loadtest --users 20 --concurrency 50 --duration 60 \\
+        --llm-latency 0.8 --pool-size 5 --max-overflow 10
+
+Database settings are read from the environment (DB_HOST, DB_NAME, ...), so
+point them at a disposable database. Rate limiting is disabled in the server.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List
+
+import aiohttp
+import numpy as np
+
+from benchmarks.fakes import (
+    FakeLLM,
+    HashingEncoder,
+    apply_benchmark_env,
+    synthetic_transcript,
+)
+
+# Relative weights of each request type in the traffic mix
+TRAFFIC_MIX = {
+    "ask_question": 60,
+    "transcription_status": 20,
+    "query_history": 15,
+    "transcribe": 5,
+}
+
+QUESTIONS = [
+    "What is the main topic of the video?",
+    "How does the speaker describe the training process?",
+    "What example is given about memory?",
+    "Which problem does the design solve?",
+]
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    apply_benchmark_env()
+    os.environ.update(
+        {
+            "REDIS_BROKER": "memory://",
+            "REDIS_BACKEND": "cache+memory://",
+            "RATE_LIMIT_ENABLED": "false",
+            "DB_POOL_SIZE": str(args.pool_size),
+            "DB_MAX_OVERFLOW": str(args.max_overflow),
+        }
+    )
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Child process entry point: run the app with fakes patched in."""
+    configure_environment(args)
+
+    import uvicorn
+
+    import main
+    from routes import query, transcript
+    from utils import embeddings
+
+    embeddings.set_model(HashingEncoder())
+    query.get_gemini_response = FakeLLM(args.llm_latency)
+    # Skip YouTube lookups when classifying submitted videos
+    transcript.extract_metadata = lambda video_url: {
+        "title": "Load test video",
+        "thumbnail": None,
+        "duration": random.choice([300, 1800, 7200]),
+    }
+    transcript.has_captions = lambda video_id: random.random() < 0.5
+
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+async def seed_videos(count: int) -> List[str]:
+    """Insert completed transcriptions so ask_question has something to search."""
+    from db import async_session
+    from models.video_transcription import TranscriptionStatus, VideoTranscription
+    from utils.chunking import IncrementalChunker
+
+    encoder = HashingEncoder()
+    video_ids = []
+    async with async_session() as db:
+        for index in range(count):
+            transcript = synthetic_transcript(
+                minutes=random.choice([10, 30, 90]), seed=index
+            )
+            chunker = IncrementalChunker()
+            chunker.add(transcript)
+            chunks = chunker.flush()
+            texts = [chunk.text for chunk in chunks]
+            video_id = f"lt{uuid.uuid4().hex[:9]}"
+            db.add(
+                VideoTranscription(
+                    video_id=video_id,
+                    video_url=f"https://www.youtube.com/watch?v={video_id}",
+                    title=f"Load test video {index}",
+                    transcript=transcript,
+                    chunk_spans=[
+                        [chunk.start_offset, chunk.end_offset] for chunk in chunks
+                    ],
+                    embeddings=encoder.encode(texts).tolist(),
+                    status=TranscriptionStatus.COMPLETED,
+                )
+            )
+            video_ids.append(video_id)
+        await db.commit()
+    return video_ids
+
+
+async def create_user(session: aiohttp.ClientSession, base_url: str) -> str:
+    name = f"lt-{uuid.uuid4().hex[:10]}"
+    email = f"{name}@example.com"
+    password = "load-test-password"
+    async with session.post(
+        f"{base_url}/auth/register",
+        json={"username": name, "email": email, "password": password},
+    ) as response:
+        response.raise_for_status()
+    async with session.post(
+        f"{base_url}/auth/login", data={"username": email, "password": password}
+    ) as response:
+        response.raise_for_status()
+        return (await response.json())["access_token"]
+
+
+async def wait_until_healthy(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/health") as response:
+                    if (await response.json()).get("status") == "healthy":
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError("API did not become healthy in time")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def report(self, elapsed: float) -> None:
+        print(
+            f"{'endpoint':<22} {'requests':>8} {'rps':>8} {'p50 ms':>9} "
+            f"{'p95 ms':>9} {'p99 ms':>9} {'errors':>8}"
+        )
+        for endpoint in TRAFFIC_MIX:
+            latencies = self.latencies.get(endpoint)
+            if not latencies:
+                continue
+            p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+            error_rate = self.errors[endpoint] / len(latencies)
+            print(
+                f"{endpoint:<22} {len(latencies):>8} {len(latencies) / elapsed:>8.1f} "
+                f"{p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {error_rate:>8.2%}"
+            )
+
+
+async def virtual_user(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    tokens: List[str],
+    video_ids: List[str],
+    recorder: Recorder,
+    deadline: float,
+) -> None:
+    endpoints, weights = zip(*TRAFFIC_MIX.items())
+    while time.monotonic() < deadline:
+        endpoint = random.choices(endpoints, weights)[0]
+        headers = {"Authorization": f"Bearer {random.choice(tokens)}"}
+        video_id = random.choice(video_ids)
+
+        if endpoint == "ask_question":
+            request = session.post(
+                f"{base_url}/query/ask-question",
+                json={"video_id": video_id, "question": random.choice(QUESTIONS)},
+                headers=headers,
+            )
+        elif endpoint == "transcription_status":
+            request = session.get(
+                f"{base_url}/transcript/status/{video_id}", headers=headers
+            )
+        elif endpoint == "query_history":
+            request = session.get(
+                f"{base_url}/query/history/{video_id}", headers=headers
+            )
+        else:
+            new_id = f"lt{uuid.uuid4().hex[:9]}"
+            request = session.post(
+                f"{base_url}/transcript/transcribe",
+                json={"video_url": f"https://www.youtube.com/watch?v={new_id}"},
+                headers=headers,
+            )
+
+        started = time.perf_counter()
+        try:
+            async with request as response:
+                await response.read()
+                ok = response.status < 400
+        except aiohttp.ClientError:
+            ok = False
+        recorder.record(endpoint, time.perf_counter() - started, ok)
+
+
+async def drive(args: argparse.Namespace) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    await wait_until_healthy(base_url)
+    video_ids = await seed_videos(args.videos)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tokens = [await create_user(session, base_url) for _ in range(args.users)]
+        recorder = Recorder()
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(
+                virtual_user(session, base_url, tokens, video_ids, recorder, deadline)
+                for _ in range(args.concurrency)
+            )
+        )
+        elapsed = time.monotonic() - started
+
+    print(
+        f"\n{args.concurrency} virtual users, {args.duration:.0f}s, "
+        f"pool_size={args.pool_size} max_overflow={args.max_overflow}, "
+        f"LLM latency {args.llm_latency * 1000:.0f}ms\n"
+    )
+    recorder.report(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--videos", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=10)
+    args = parser.parse_args()
+
+    configure_environment(args)
+    server = multiprocessing.get_context("spawn").Process(target=serve, args=(args,))
+    server.start()
+    try:
+        asyncio.run(drive(args))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Measure /query latency while the API absorbs a burst of logins.
+
+Run against a server started with RATE_LIMIT_ENABLED=false so the login
+limiter does not short-circuit the burst:
+
+    python -m benchmarks.login_burst --base-url http://localhost:8000 --logins 50
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from typing import List
+
+import aiohttp
+import numpy as np
+
+
+async def ensure_user(
+    session: aiohttp.ClientSession, base_url: str, email: str, password: str
+):
+    username = email.split("@")[0]
+    async with session.post(
+        f"{base_url}/auth/register",
+        json={"username": username, "email": email, "password": password},
+    ) as response:
+        if response.status not in (200, 400):
+            raise RuntimeError(f"Registration failed: {await response.text()}")
+
+
+async def login(
+    session: aiohttp.ClientSession, base_url: str, email: str, password: str
+) -> str:
+    async with session.post(
+        f"{base_url}/auth/login", data={"username": email, "password": password}
+    ) as response:
+        response.raise_for_status()
+        return (await response.json())["access_token"]
+
+
+async def probe(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    token: str,
+    stop: asyncio.Event,
+    interval: float,
+) -> List[float]:
+    """Poll a cheap authenticated /query endpoint and record its latency."""
+    latencies = []
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        started = time.perf_counter()
+        async with session.get(
+            f"{base_url}/query/history/load-test", headers=headers
+        ) as response:
+            await response.read()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def summarize(label: str, latencies: List[float]) -> None:
+    if not latencies:
+        print(f"{label:>8}: no samples")
+        return
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    print(
+        f"{label:>8}: n={len(latencies):<5} p50={p50:7.1f}ms p95={p95:7.1f}ms p99={p99:7.1f}ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    email = f"loadtest-{uuid.uuid4().hex[:8]}@example.com"
+    password = "load-test-password"
+
+    async with aiohttp.ClientSession() as session:
+        await ensure_user(session, args.base_url, email, password)
+        token = await login(session, args.base_url, email, password)
+
+        # Baseline: probe latency with no logins in flight
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(
+            probe(session, args.base_url, token, stop, args.probe_interval)
+        )
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        baseline = await probe_task
+
+        # Burst: the same probe while many logins hash concurrently
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(
+            probe(session, args.base_url, token, stop, args.probe_interval)
+        )
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                login(session, args.base_url, email, password)
+                for _ in range(args.logins)
+            ),
+            return_exceptions=True,
+        )
+        burst_seconds = time.perf_counter() - started
+        stop.set()
+        during_burst = await probe_task
+
+    failures = sum(isinstance(result, Exception) for result in results)
+    print(
+        f"{args.logins} logins in {burst_seconds:.2f}s "
+        f"({args.logins / burst_seconds:.1f}/s, {failures} failed)"
+    )
+    summarize("baseline", baseline)
+    summarize("burst", during_burst)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
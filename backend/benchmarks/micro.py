@@ -0,0 +1,180 @@
+"""Offline micro-benchmarks for the retrieval and ingestion hot paths.
+
+Runs against synthetic transcripts with a deterministic embedding stand-in and
+a fake LLM, so no network, database or model download is needed:
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --save-baseline main
+    python -m benchmarks.micro --compare main --fail-on-regression
+
+Baselines are stored as JSON under benchmarks/baselines/.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.fakes import (
+    FakeLLM,
+    HashingEncoder,
+    apply_benchmark_env,
+    synthetic_transcript,
+)
+
+apply_benchmark_env()
+
+from utils import embeddings as embeddings_module  # noqa: E402
+from utils.chunking import chunk_text  # noqa: E402
+from utils.embeddings import (  # noqa: E402
+    find_relevant_chunks,
+    get_embeddings,
+    split_transcript_into_chunks,
+)
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+# Video durations in minutes, from a short clip to a long lecture series
+DURATIONS = {"10m": 10, "1h": 60, "3h": 180, "10h": 600}
+
+QUESTION = "What does the speaker say about training the model on image data?"
+
+
+def measure(
+    function: Callable[[], object], repeats: int, items: int
+) -> Dict[str, float]:
+    """Time repeated calls and record percentiles, throughput and peak memory."""
+    function()  # Warm up caches outside the measurement
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    return {
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "p99_ms": p99 * 1000,
+        "items_per_s": items / float(np.mean(timings)),
+        "peak_mib": peak / (1024 * 1024),
+    }
+
+
+def build_cases(minutes: float) -> List[Tuple[str, Callable[[], object], int]]:
+    transcript = synthetic_transcript(minutes)
+    chunks = chunk_text(transcript)
+    stored_embeddings = embeddings_module.get_model().encode(chunks).tolist()
+    stored_json = json.dumps(stored_embeddings)
+    embeddings = [np.array(emb) for emb in stored_embeddings]
+    llm = FakeLLM()
+
+    def json_round_trip():
+        decoded = json.loads(json.dumps(stored_embeddings))
+        return [np.array(emb) for emb in decoded]
+
+    def answer_pipeline():
+        # Mirrors ask_question after the row is fetched
+        vectors = [np.array(emb) for emb in json.loads(stored_json)]
+        context = "\n".join(find_relevant_chunks(QUESTION, chunks, vectors))
+        return asyncio.run(llm(context, QUESTION))
+
+    return [
+        ("chunk_text", lambda: chunk_text(transcript), len(transcript)),
+        (
+            "split_transcript_into_chunks",
+            lambda: split_transcript_into_chunks(transcript),
+            len(transcript),
+        ),
+        ("get_embeddings", lambda: get_embeddings(QUESTION), 1),
+        (
+            "find_relevant_chunks",
+            lambda: find_relevant_chunks(QUESTION, chunks, embeddings),
+            len(chunks),
+        ),
+        ("embeddings_json_round_trip", json_round_trip, len(chunks)),
+        ("answer_pipeline", answer_pipeline, 1),
+    ]
+
+
+def run(durations: List[str], repeats: int) -> Dict[str, Dict[str, float]]:
+    embeddings_module.set_model(HashingEncoder())
+    results = {}
+    for label in durations:
+        for name, function, items in build_cases(DURATIONS[label]):
+            key = f"{name}[{label}]"
+            results[key] = measure(function, repeats, items)
+            stats = results[key]
+            print(
+                f"{key:<40} p50={stats['p50_ms']:9.3f}ms p95={stats['p95_ms']:9.3f}ms "
+                f"p99={stats['p99_ms']:9.3f}ms {stats['items_per_s']:12.1f} items/s "
+                f"peak={stats['peak_mib']:8.2f}MiB"
+            )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline_name: str, threshold: float
+) -> bool:
+    """Print p50 and peak memory changes against a baseline; return True on regression."""
+    baseline = json.loads((BASELINE_DIR / f"{baseline_name}.json").read_text())
+    regressed = False
+    print(
+        f"\nComparison against baseline '{baseline_name}' (threshold {threshold:.0%}):"
+    )
+    for key, stats in results.items():
+        if key not in baseline:
+            continue
+        for metric in ("p50_ms", "peak_mib"):
+            before, after = baseline[key][metric], stats[metric]
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            print(
+                f"{key:<40} {metric:<8} {before:10.3f} -> {after:10.3f} ({change:+.1%}){flag}"
+            )
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--durations", nargs="+", choices=list(DURATIONS), default=list(DURATIONS)
+    )
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.durations, args.repeats)
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        path.write_text(json.dumps(results, indent=2, sort_keys=True))
+        print(f"\nSaved baseline to {path}")
+
+    if args.compare:
+        regressed = compare(results, args.compare, args.threshold)
+        if regressed and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare real-time factor, memory and output of transcriber backends.
+
+Each backend transcribes the same 16 kHz mono WAV in its own process:
+
+    python -m benchmarks.transcribers --audio sample.wav --threads 4 --beam-size 1
+
+A real-time factor below 1.0 means faster than the audio plays.
+"""
+
+import argparse
+import difflib
+import multiprocessing
+import resource
+import sys
+import time
+import wave
+from typing import Dict
+
+from benchmarks.fakes import apply_benchmark_env
+
+apply_benchmark_env()
+
+from config import get_settings  # noqa: E402
+from utils.transcribers import TRANSCRIBERS, load_transcriber  # noqa: E402
+
+settings = get_settings()
+
+
+def audio_duration(path: str) -> float:
+    with wave.open(path) as audio:
+        return audio.getnframes() / audio.getframerate()
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure_backend(name: str, args: argparse.Namespace, queue) -> None:
+    transcriber = load_transcriber(name, args.model_size, args.threads, args.beam_size)
+    started = time.perf_counter()
+    text = "".join(segment.text for segment in transcriber.transcribe(args.audio))
+    elapsed = time.perf_counter() - started
+    queue.put(
+        {
+            "backend": name,
+            "seconds": elapsed,
+            "peak_rss_mib": peak_rss_mib(),
+            "text": text.strip(),
+        }
+    )
+
+
+def run_isolated(name: str, args: argparse.Namespace) -> Dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=measure_backend, args=(name, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio", required=True, help="16 kHz mono WAV file")
+    parser.add_argument("--backends", nargs="+", default=list(TRANSCRIBERS))
+    parser.add_argument("--model-size", default=settings.WHISPER_MODEL_SIZE)
+    parser.add_argument("--threads", type=int, default=settings.TRANSCRIBER_THREADS)
+    parser.add_argument("--beam-size", type=int, default=settings.TRANSCRIBER_BEAM_SIZE)
+    args = parser.parse_args()
+
+    duration = audio_duration(args.audio)
+    print(f"Audio: {args.audio} ({duration:.1f}s), model {args.model_size}\n")
+
+    results = [run_isolated(name, args) for name in args.backends]
+    reference_words = results[0]["text"].lower().split()
+    for result in results:
+        similarity = difflib.SequenceMatcher(
+            None, reference_words, result["text"].lower().split()
+        ).ratio()
+        print(
+            f"{result['backend']:<15} {result['seconds']:8.1f}s  "
+            f"RTF {result['seconds'] / duration:6.3f}  "
+            f"peak RSS {result['peak_rss_mib']:8.1f} MiB  "
+            f"word agreement with {results[0]['backend']} {similarity:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
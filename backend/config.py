@@ -1,5 +1,7 @@
 import os
+import tempfile
 from functools import lru_cache
+from typing import Optional
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -15,20 +17,127 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: str
     DB_NAME: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Optional streaming replica for read-only endpoints, same credentials
+    DB_READ_HOST: Optional[str] = None
+    DB_READ_PORT: Optional[str] = None  # Defaults to DB_PORT
+    # Reads fall back to the primary while the replica is further behind
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_SECONDS: float = 1.0
 
     # API settings
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY")
     API_RATE_LIMIT: str = "5/minute"
     API_TIMEOUT: int = 30
+    RATE_LIMIT_ENABLED: bool = True
+    MAX_BATCH_QUESTIONS: int = 10
 
     # JWT settings
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Password hashing settings
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 2
+
     # Redis settings
     REDIS_BROKER: str = "redis://localhost:6379/0"
     REDIS_BACKEND: str = "redis://localhost:6379/0"
+    CELERY_QUEUES: list[str] = [
+        "transcribe.captions",
+        "transcribe.short",
+        "transcribe.long",
+    ]
+
+    # Transcription scheduling
+    METADATA_PROBE_TIMEOUT: int = 10
+    SHORT_VIDEO_SECONDS: int = 1200
+    CAPTIONS_JOB_SECONDS: int = 15
+    # Seconds of processing per second of audio, used for completion estimates
+    WHISPER_REALTIME_FACTOR: float = 0.5
+    # Workers consuming each job class queue
+    QUEUE_CONCURRENCY: dict[str, int] = {"captions": 2, "short": 2, "long": 1}
+    MAX_JOBS_PER_USER: int = 2
+    USER_JOB_RETRY_SECONDS: int = 60
+    USER_SLOT_TTL_SECONDS: int = 6 * 3600
+
+    # Question history is written in bulk by a background task; when its
+    # queue is full, "write" commits inline and "drop" discards the records
+    INTERACTION_FLUSH_SIZE: int = 100
+    INTERACTION_FLUSH_SECONDS: float = 1.0
+    INTERACTION_QUEUE_SIZE: int = 10000
+    INTERACTION_QUEUE_POLICY: str = "write"
+    # A failed bulk write is retried with exponential backoff before the
+    # records are given up on
+    INTERACTION_WRITE_ATTEMPTS: int = 3
+    INTERACTION_RETRY_SECONDS: float = 0.5
+
+    # Metrics
+    METRICS_WORKER_PORT: int = 9101
+
+    # Embedding settings
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # "torch" or "onnx"
+    EMBEDDING_ONNX_PATH: str = "artifacts/all-MiniLM-L6-v2-int8.onnx"
+    EMBEDDING_THREADS: int = 0  # 0 lets the runtime decide
+    EMBEDDING_MIN_COSINE: float = 0.98
+    # Ingestion: chunks per forward pass, and a process pool for long videos
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_PROCESSES: int = 0  # 0 or 1 encodes in the worker process
+    EMBEDDING_POOL_MIN_CHUNKS: int = 256
+    # Chunks embedded and saved per write, bounding worker memory
+    EMBEDDING_WINDOW_CHUNKS: int = 512
+
+    # Caption tracks are tried in this language order before Whisper is used
+    CAPTION_LANGUAGES: list[str] = ["en", "en-US", "en-GB"]
+    # Ask YouTube to translate other tracks to this language; empty disables
+    CAPTION_TRANSLATE_TO: str = "en"
+    # Use an untranslated track in any language rather than running Whisper
+    CAPTION_ACCEPT_ANY_LANGUAGE: bool = True
+
+    # Transcription settings
+    TRANSCRIBER_BACKEND: str = "whisper"  # "whisper" or "faster-whisper"
+    WHISPER_MODEL_SIZE: str = "base"
+    TRANSCRIBER_THREADS: int = 0  # 0 lets the runtime decide
+    TRANSCRIBER_BEAM_SIZE: int = 1
+    # Seconds of newly transcribed audio between partial saves
+    PARTIAL_FLUSH_SECONDS: int = 300
+
+    # Summaries and canonical answers generated once a transcript is complete
+    INGEST_INSIGHTS_ENABLED: bool = False
+    CANONICAL_QUESTIONS: list[str] = [
+        "What are the key points of this video?",
+        "What is the main topic of this video?",
+    ]
+    # Cosine similarity above which a question is served a stored answer
+    CANONICAL_MATCH_THRESHOLD: float = 0.9
+    # Chunks per section summary, and the most text sent in one summary prompt
+    SUMMARY_SECTION_CHUNKS: int = 8
+    SUMMARY_PROMPT_CHARS: int = 60000
+    # How much better a summary must match a question than any chunk to be used
+    SUMMARY_LEVEL_MARGIN: float = 0.05
+
+    # Scratch space for audio and intermediate files
+    SCRATCH_DIR: str = os.path.join(tempfile.gettempdir(), "video-gpt")
+    SCRATCH_QUOTA_MB: int = 10240
+    SCRATCH_MIN_FREE_MB: int = 1024
+    SCRATCH_MAX_AGE_HOURS: int = 24
+    SCRATCH_JANITOR_INTERVAL_SECONDS: int = 600
+    # How long a job waits for scratch space before failing
+    SCRATCH_WAIT_SECONDS: int = 300
+
+    # Sampling profiler; PUT /admin/profiling changes these at runtime
+    PROFILING_ENABLED: bool = False
+    PROFILE_SAMPLE_RATE: float = 0.01  # Fraction of requests and tasks kept
+    PROFILE_SLOW_MS: float = 0  # Also keep anything slower; 0 disables
+    PROFILE_INTERVAL_MS: float = 10
+    PROFILE_DIR: str = os.path.join(tempfile.gettempdir(), "video-gpt-profiles")
+    PROFILE_MAX_FILES: int = 200
+    PROFILE_CONFIG_TTL_SECONDS: float = 5
+    # Users allowed to call /admin endpoints
+    ADMIN_USERNAMES: list[str] = []
 
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -45,3 +154,8 @@ class Settings(BaseSettings):
 @lru_cache()
 def get_settings() -> Settings:
     return Settings()
+
+
+def is_redis_url(url: str) -> bool:
+    """Whether url names a Redis server, not e.g. Celery's in-memory transport."""
+    return url.split("://", 1)[0] in ("redis", "rediss", "unix")
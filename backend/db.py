@@ -1,33 +1,175 @@
-from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import func, insert, inspect, select, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config import get_settings
 from models import Base
+from utils.metrics import DB_READ_ROUTES, timed_json_loads
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 DATABASE_URL = f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+READ_DATABASE_URL: Optional[str] = (
+    f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}"
+    f"@{settings.DB_READ_HOST}:{settings.DB_READ_PORT or settings.DB_PORT}"
+    f"/{settings.DB_NAME}"
+    if settings.DB_READ_HOST
+    else None
+)
 
-# Enhanced engine configuration
-engine: AsyncEngine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    poolclass=AsyncAdaptedQueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=1800,  # Recycle connections after 30 minutes
-    pool_pre_ping=True,  # Enable connection health checks
-    connect_args={
-        "command_timeout": settings.API_TIMEOUT,
-        "server_settings": {
-            "statement_timeout": f"{settings.API_TIMEOUT * 1000}",
-            "idle_in_transaction_session_timeout": f"{settings.API_TIMEOUT * 1000}",
-        },
-    },
+# Zero when the replica has replayed everything it received, otherwise the
+# age of the last transaction it replayed; NULL-safe on a primary. WAL the
+# replica has not received yet is invisible here, so this is only an
+# estimate, good for routing reads but not for proving a replica current.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE COALESCE("
+    "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
 )
 
+
+def create_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    # Enhanced engine configuration
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=30,
+        pool_recycle=1800,  # Recycle connections after 30 minutes
+        pool_pre_ping=True,  # Enable connection health checks
+        json_deserializer=timed_json_loads,
+        connect_args={
+            "command_timeout": settings.API_TIMEOUT,
+            "server_settings": {
+                "statement_timeout": f"{settings.API_TIMEOUT * 1000}",
+                "idle_in_transaction_session_timeout": f"{settings.API_TIMEOUT * 1000}",
+            },
+        },
+    )
+
+
+engine: AsyncEngine = create_engine()
 async_session = async_sessionmaker(bind=engine, expire_on_commit=False)
+# Read-only work goes to the replica when one is configured
+read_engine: AsyncEngine = (
+    create_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
+)
+read_session = async_sessionmaker(bind=read_engine, expire_on_commit=False)
+
+
+def reset_engine_after_fork() -> AsyncEngine:
+    """Give a forked process its own engine and pool.
+
+    Connections inherited from the parent are dropped without being closed,
+    since closing them would also close the parent's sockets.
+    """
+    global engine, read_engine
+    if read_engine is not engine:
+        read_engine.sync_engine.dispose(close=False)
+    engine.sync_engine.dispose(close=False)
+    engine = create_engine()
+    read_engine = create_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
+    async_session.configure(bind=engine)
+    read_session.configure(bind=read_engine)
+    return engine
+
+
+async def dispose_engines() -> None:
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await engine.dispose()
+
+
+# (lag in seconds, time.monotonic() when it was measured)
+_replica_lag = (0.0, float("-inf"))
+
+
+async def replica_lag_seconds() -> float:
+    """How far the read replica trails the primary; 0 without a replica.
+
+    Measured at most every REPLICA_LAG_CHECK_SECONDS. A replica that cannot
+    be queried counts as infinitely far behind.
+    """
+    global _replica_lag
+    if read_engine is engine:
+        return 0.0
+    lag, checked_at = _replica_lag
+    if time.monotonic() - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+        return lag
+    try:
+        async with read_engine.connect() as conn:
+            lag = float(await conn.scalar(REPLICA_LAG_QUERY))
+    except Exception as e:
+        logger.warning(f"Failed to check replica lag: {e}")
+        lag = float("inf")
+    _replica_lag = (lag, time.monotonic())
+    return lag
+
+
+def reads_replica(db: AsyncSession) -> bool:
+    """Whether db reads the replica rather than the primary.
+
+    Lag is only estimated, so routes re-read from the primary whenever a row
+    looks missing or unfinished on the replica, however small the lag.
+    """
+    return db.bind is not engine
+
+
+def _add_missing_columns(sync_conn):
+    # Nullable columns added to a model after its table was created are
+    # appended in place; anything more involved needs a real migration
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(
+                text(
+                    f'ALTER TABLE "{table.name}" '
+                    f'ADD COLUMN IF NOT EXISTS "{column.name}" {column_type}'
+                )
+            )
+
+
+def _create_missing_indexes(sync_conn):
+    # create_all only emits indexes for tables it creates, so add any that
+    # were declared after a table already existed
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+async def _backfill_user_video_summaries(conn):
+    from models.query_interaction import QueryInteraction
+    from models.user_video_summary import UserVideoSummary
+
+    if await conn.scalar(select(UserVideoSummary.username).limit(1)) is not None:
+        return
+    await conn.execute(
+        insert(UserVideoSummary).from_select(
+            ["username", "video_id", "last_interaction", "interaction_count"],
+            select(
+                QueryInteraction.username,
+                QueryInteraction.video_id,
+                func.max(QueryInteraction.created_at),
+                func.count(),
+            ).group_by(QueryInteraction.username, QueryInteraction.video_id),
+        )
+    )
 
 
 async def init_db():
@@ -35,6 +177,9 @@ async def init_db():
         # Create QueryInteraction table if it doesn't exist
         # This won't drop existing tables
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        await _backfill_user_video_summaries(conn)
 
 
 async def get_db():
@@ -43,3 +188,21 @@ async def get_db():
             yield session
         finally:
             await session.close()
+
+
+async def get_read_db():
+    """Session for read-only work.
+
+    Uses the replica unless it is more than REPLICA_MAX_LAG_SECONDS behind,
+    in which case reads go to the primary until it catches up.
+    """
+    use_replica = (
+        read_engine is not engine
+        and await replica_lag_seconds() <= settings.REPLICA_MAX_LAG_SECONDS
+    )
+    DB_READ_ROUTES.labels("replica" if use_replica else "primary").inc()
+    async with (read_session if use_replica else async_session)() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -1,19 +1,38 @@
+import asyncio
 import logging
-import tempfile
 from datetime import datetime
+from typing import Optional
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 from sqlalchemy import text
 
-from config import get_settings
-from db import engine, init_db
-from routes import auth, query, transcript, video_history, videos
-from utils.cleanup import ResourceCleaner
+from config import get_settings, is_redis_url
+from db import dispose_engines, engine, init_db
+from routes import admin, auth, query, transcript, video_history, videos
+from services.interaction_writer import get_interaction_writer
+from services.passwords import shutdown_password_pool
+from utils.cleanup import get_scratch_cleaner
+from utils.embeddings import get_model
+from utils.metrics import (
+    CONTENT_TYPE_LATEST,
+    CeleryQueueCollector,
+    DatabasePoolCollector,
+    get_registry,
+    render_metrics,
+)
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.profiling import (
+    config_is_stale,
+    finish_profile,
+    get_config,
+    refresh_config,
+    start_profile,
+)
 
 settings = get_settings()
 
@@ -24,7 +43,11 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=[settings.API_RATE_LIMIT])
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=[settings.API_RATE_LIMIT],
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
 app = FastAPI()
 
 # Configure CORS
@@ -34,6 +57,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=[NEXT_CURSOR_HEADER],  # Pagination cursor for history pages
 )
 
 # Add rate limiter to app
@@ -46,20 +70,79 @@ app.include_router(auth.router, prefix="/auth")
 app.include_router(transcript.router, prefix="/transcript")
 app.include_router(video_history.router)
 app.include_router(videos.router, prefix="/videos")
+app.include_router(admin.router, prefix="/admin")
 
 # Load environment variables
 load_dotenv()
 
-# Initialize resource cleaner
-temp_cleaner = ResourceCleaner(tempfile.gettempdir())
+
+# The profiling config refresh in progress, shared by the requests awaiting it
+_config_refresh: Optional[asyncio.Future] = None
+
+
+async def refresh_profiling_config() -> None:
+    """Read the profiling config from Redis off the event loop, once per TTL.
+
+    Requests arriving while a refresh is in flight wait for it rather than
+    starting their own.
+    """
+    global _config_refresh
+    if _config_refresh is None:
+        _config_refresh = asyncio.ensure_future(asyncio.to_thread(refresh_config))
+
+        def clear(future: asyncio.Future) -> None:
+            global _config_refresh
+            _config_refresh = None
+
+        _config_refresh.add_done_callback(clear)
+    # Shielded so one cancelled request does not cancel the others' refresh
+    await asyncio.shield(_config_refresh)
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Sample the stacks of requests selected by the profiling config."""
+    if config_is_stale():
+        await refresh_profiling_config()
+    profile = start_profile(get_config())
+    if profile is None:
+        return await call_next(request)
+    try:
+        return await call_next(request)
+    finally:
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        await asyncio.to_thread(
+            finish_profile, profile, "request", f"{request.method} {route}"
+        )
+
+
+# Metrics exposed on /metrics, including pool and queue gauges read at scrape time
+metrics_registry = get_registry()
+metrics_registry.register(DatabasePoolCollector(engine))
+# Queue depth is read from Redis; the load test runs on Celery's memory broker
+if is_redis_url(settings.REDIS_BROKER):
+    metrics_registry.register(
+        CeleryQueueCollector(settings.REDIS_BROKER, settings.CELERY_QUEUES)
+    )
+
+# Initialize resource cleaner for the application scratch directory
+temp_cleaner = get_scratch_cleaner()
+janitor_task = None
 
 
 @app.on_event("startup")
 async def startup_event():
     try:
+        global janitor_task
         await init_db()
-        # Clean up any leftover temporary files
-        await temp_cleaner.cleanup_temp_files()
+        # Load the embedding model now, off the event loop, rather than inside
+        # the first question, where it would stall every in-flight request
+        await asyncio.to_thread(get_model)
+        get_interaction_writer().start()
+        # Periodically clean up scratch files, starting with any leftovers
+        janitor_task = asyncio.create_task(
+            temp_cleaner.run_periodic(settings.SCRATCH_JANITOR_INTERVAL_SECONDS)
+        )
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
@@ -69,15 +152,25 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     try:
-        # Clean up temporary files
+        # Stop the janitor and clean up temporary files
+        if janitor_task:
+            janitor_task.cancel()
         await temp_cleaner.cleanup_temp_files()
+        # Write queued question history before the connections close
+        await get_interaction_writer().stop()
         # Close database connections
-        await engine.dispose()
+        await dispose_engines()
+        shutdown_password_pool()
         logger.info("Cleanup completed successfully")
     except Exception as e:
         logger.error(f"Shutdown cleanup failed: {e}")
 
 
+@app.get("/metrics")
+def metrics():
+    return Response(render_metrics(metrics_registry), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
 async def health_check():
     try:
@@ -1,7 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
-from sqlalchemy.sql import func
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, Integer, String, Text
 
 from models import Base
 
@@ -16,5 +15,21 @@ class QueryInteraction(Base):
     )
     question = Column(Text, nullable=False)
     answer = Column(Text, nullable=False)
-    context = Column(Text, nullable=True)  # Make context nullable
+    context = Column(Text, nullable=True)  # Legacy rows only, see context_refs
+    # [{"chunk": ordinal, "score": similarity}, ...] into the video's chunks
+    context_refs = Column(JSON, nullable=True)
+    # VideoTranscription.transcript_version the references point into
+    transcript_version = Column(Integer, nullable=True)
+    embedding_model = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Serves per-user, per-video history pages ordered newest first
+    __table_args__ = (
+        Index(
+            "ix_query_interactions_user_video_created",
+            "username",
+            "video_id",
+            "created_at",
+            "id",
+        ),
+    )
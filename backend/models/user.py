@@ -1,9 +1,7 @@
-from passlib.context import CryptContext
 from sqlalchemy import Column, Integer, String
 
 from db import Base
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from services.passwords import pwd_context
 
 
 class User(Base):
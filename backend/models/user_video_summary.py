@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+
+from models import Base
+
+
+class UserVideoSummary(Base):
+    """One row per user and video, maintained whenever an interaction is stored."""
+
+    __tablename__ = "user_video_summaries"
+
+    username = Column(String, primary_key=True)
+    video_id = Column(
+        String, ForeignKey("video_transcriptions.video_id"), primary_key=True
+    )
+    last_interaction = Column(DateTime, nullable=False, default=datetime.utcnow)
+    interaction_count = Column(Integer, nullable=False, default=0)
+
+    # Serves the history page as a range scan ordered by recency
+    __table_args__ = (
+        Index(
+            "ix_user_video_summaries_user_last",
+            "username",
+            "last_interaction",
+            "video_id",
+        ),
+    )
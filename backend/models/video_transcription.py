@@ -1,12 +1,12 @@
-import re
 from datetime import datetime
 from enum import Enum
 
 from sqlalchemy import JSON, CheckConstraint, Column, DateTime
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import Integer, String, Text
+from sqlalchemy import Float, Integer, String, Text
 
 from models import Base
+from utils.video_ids import extract_video_id
 
 
 class TranscriptionStatus(str, Enum):
@@ -15,6 +15,11 @@ class TranscriptionStatus(str, Enum):
     ERROR = "ERROR"
 
 
+# None is written as SQL NULL rather than JSON null, which SQL would treat
+# as a value, e.g. when appending to an array column
+NullableJSON = JSON(none_as_null=True)
+
+
 class VideoTranscription(Base):
     __tablename__ = "video_transcriptions"
 
@@ -24,8 +29,28 @@ class VideoTranscription(Base):
     title = Column(String, nullable=True)
     thumbnail_url = Column(String, nullable=True)
     transcript = Column(Text, nullable=True)
-    chunks = Column(JSON, nullable=True)  # Store transcript chunks
-    embeddings = Column(JSON, nullable=True)  # Store embeddings as JSON
+    # Chunk text, only on rows written before chunk_spans
+    chunks = Column(NullableJSON, nullable=True)
+    # [start, end) character offsets of each chunk into transcript
+    chunk_spans = Column(NullableJSON, nullable=True)
+    # Bumped whenever the chunks are replaced, invalidating chunk references
+    transcript_version = Column(Integer, nullable=True)
+    embeddings = Column(NullableJSON, nullable=True)  # Store embeddings as JSON
+    chunk_times = Column(NullableJSON, nullable=True)  # [start, end] seconds per chunk
+    duration_seconds = Column(Float, nullable=True)
+    # How much of the audio the stored chunks cover while still processing
+    transcribed_seconds = Column(Float, nullable=True)
+    # "captions:<kind>:<language>" or "whisper"
+    transcript_source = Column(String, nullable=True)
+    # Checkpoint of [start, end, text] Whisper segments until completion
+    whisper_segments = Column(NullableJSON, nullable=True)
+    summary = Column(Text, nullable=True)
+    summary_embedding = Column(NullableJSON, nullable=True)
+    # [{start_chunk, end_chunk, summary}] for consecutive runs of chunks
+    section_summaries = Column(NullableJSON, nullable=True)
+    section_embeddings = Column(NullableJSON, nullable=True)
+    # Answers generated at ingest time, keyed by canonical question
+    canonical_answers = Column(NullableJSON, nullable=True)
     status = Column(SQLEnum(TranscriptionStatus), default=TranscriptionStatus.PENDING)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -37,7 +62,28 @@ class VideoTranscription(Base):
         ),
     )
 
+    def chunk_count(self) -> int:
+        """Number of chunks, without touching chunk text on legacy rows."""
+        return len(self.chunk_spans or self.embeddings or [])
+
+    def coverage(self) -> dict:
+        """Describe how much of the video the stored chunks cover."""
+        complete = self.status == TranscriptionStatus.COMPLETED
+        description = "full video"
+        if not complete:
+            transcribed_minutes = round((self.transcribed_seconds or 0) / 60)
+            if self.duration_seconds:
+                total_minutes = round(self.duration_seconds / 60)
+                description = f"first {transcribed_minutes} of {total_minutes} minutes"
+            else:
+                description = f"first {transcribed_minutes} minutes"
+        return {
+            "complete": complete,
+            "transcribed_seconds": self.transcribed_seconds,
+            "duration_seconds": self.duration_seconds,
+            "description": description,
+        }
+
     @staticmethod
     def validate_youtube_url(url: str) -> bool:
-        pattern = r"^https?://(?:www\.)?youtube\.com/watch\?v=[\w-]+$"
-        return bool(re.match(pattern, url))
+        return extract_video_id(url) is not None
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+
+from services.auth import get_admin_user
+from utils.profiling import ProfilingConfig, get_config, get_profile_store, set_config
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class ProfilingUpdate(BaseModel):
+    enabled: bool
+    sample_rate: float = Field(0.01, ge=0, le=1)
+    slow_ms: float = Field(0, ge=0)
+
+
+@router.get("/profiling")
+async def get_profiling(admin: str = Depends(get_admin_user)):
+    """Current profiler settings and the profiles stored on this host."""
+    config = await asyncio.to_thread(get_config)
+    profiles = await asyncio.to_thread(get_profile_store().list)
+    return {"config": asdict(config), "profiles": profiles}
+
+
+@router.put("/profiling")
+async def update_profiling(
+    update: ProfilingUpdate, admin: str = Depends(get_admin_user)
+):
+    """Change profiler settings for the API and every worker."""
+    config = ProfilingConfig(update.enabled, update.sample_rate, update.slow_ms)
+    try:
+        await asyncio.to_thread(set_config, config)
+    except Exception as e:
+        logger.error(f"Error updating profiling config: {e}")
+        raise HTTPException(
+            status_code=500, detail="Failed to update profiling settings"
+        )
+    logger.info(f"{admin} set profiling to {config}")
+    return {"config": asdict(config)}
+
+
+@router.get("/profiling/{filename}")
+async def download_profile(filename: str, admin: str = Depends(get_admin_user)):
+    """A stored profile in collapsed stack format, for flamegraph.pl or speedscope."""
+    path = get_profile_store().path(filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=filename)
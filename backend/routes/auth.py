@@ -13,11 +13,12 @@ from config import get_settings
 from db import get_db
 from models.user import User
 from services.auth import get_current_user
+from services.passwords import hash_password, verify_and_update_password
 import jwt
 
 router = APIRouter()
 settings = get_settings()
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, enabled=settings.RATE_LIMIT_ENABLED)
 
 # Add these to your environment variables
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
@@ -68,7 +69,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=User.hash_password(user_data.password),
+        hashed_password=await hash_password(user_data.password),
     )
     db.add(user)
     await db.commit()
@@ -85,13 +86,24 @@ async def login(
     db: AsyncSession = Depends(get_db),
 ):
     user = await get_user(form_data.username, db)
-    if not user or not user.verify_password(form_data.password):
+    if user:
+        valid, new_hash = await verify_and_update_password(
+            form_data.password, user.hashed_password
+        )
+    else:
+        valid, new_hash = False, None
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Upgrade hashes created with an older cost factor
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
@@ -1,22 +1,32 @@
 import logging
+from typing import List, Optional
 
 import numpy as np
-from fastapi import APIRouter, Depends, HTTPException, Request
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, validator
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-from sqlalchemy import select
+from sqlalchemy import desc, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 
-from db import get_db
+from config import get_settings
+from db import async_session, get_read_db, reads_replica
 from models.query_interaction import QueryInteraction
-from models.video_transcription import VideoTranscription
+from models.video_transcription import TranscriptionStatus, VideoTranscription
 from services.auth import get_current_user
-from services.gemini_client import get_gemini_response
-from utils.embeddings import find_relevant_chunks
+from services.gemini_client import get_gemini_batch_response, get_gemini_response
+from services.history import context_refs_from_ranking, resolve_context
+from services.insights import match_exact, match_similar, precomputed_answers
+from services.interaction_writer import get_interaction_writer
+from services.summary_tree import select_context
+from services.transcript import load_chunk_texts
+from utils.embeddings import get_batch_embeddings, get_embeddings, score_chunks_batch
+from utils.metrics import ASK_QUESTION_STAGE_SECONDS, observe_stage
+from utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 
 router = APIRouter()
+settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
@@ -27,56 +37,126 @@ class QueryRequest(BaseModel):
     question: str
 
 
-limiter = Limiter(key_func=get_remote_address)
+class BatchQueryRequest(BaseModel):
+    video_id: str
+    questions: List[str]
+
+    @validator("questions")
+    def validate_questions(cls, v):
+        questions = [question.strip() for question in v if question.strip()]
+        if not questions:
+            raise ValueError("At least one question is required")
+        if len(questions) > settings.MAX_BATCH_QUESTIONS:
+            raise ValueError(
+                f"At most {settings.MAX_BATCH_QUESTIONS} questions can be asked at once"
+            )
+        return questions
+
+
+limiter = Limiter(key_func=get_remote_address, enabled=settings.RATE_LIMIT_ENABLED)
+
+
+async def load_video(db: AsyncSession, video_id: str) -> Optional[VideoTranscription]:
+    """Load a transcription, from the primary if the replica's is unfinished.
+
+    Chunk text is left in the database; see load_chunk_texts.
+    """
+    statement = (
+        select(VideoTranscription)
+        .options(defer(VideoTranscription.transcript), defer(VideoTranscription.chunks))
+        .where(VideoTranscription.video_id == video_id)
+    )
+    video = (await db.execute(statement)).scalars().first()
+    # The primary may have chunks the replica has not replayed yet
+    unfinished = not video or video.status != TranscriptionStatus.COMPLETED
+    if unfinished and reads_replica(db):
+        async with async_session() as primary:
+            video = (await primary.execute(statement)).scalars().first()
+    return video
 
 
 @router.post("/ask-question")
-@limiter.limit("5/minute")
+@limiter.shared_limit("5/minute", scope="ask")
 async def ask_question(
     request: Request,  # Add this parameter for rate limiting
     query: QueryRequest,  # Rename from 'request' to 'query' to avoid conflict
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user),
 ):
     try:
-        result = await db.execute(
-            select(VideoTranscription).where(
-                VideoTranscription.video_id == query.video_id
-            )
-        )
-        video = result.scalars().first()
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "db_fetch"):
+            video = await load_video(db, query.video_id)
 
-        if not video or not video.chunks or not video.embeddings:
+        if not video or not video.chunk_count() or not video.embeddings:
             raise HTTPException(
                 status_code=404, detail="Transcript not found for the given video."
             )
 
+        # Serve answers generated at ingest time when the question matches one
+        answers = precomputed_answers(video)
+        answer = match_exact(query.question, answers)
+        query_embedding = None
+        if answer is None and answers:
+            with observe_stage(ASK_QUESTION_STAGE_SECONDS, "query_embed"):
+                query_embedding = get_embeddings(query.question)
+            answer = match_similar(query_embedding, answers)
+        if answer is not None:
+            interaction = QueryInteraction(
+                username=current_user,
+                video_id=query.video_id,
+                question=query.question,
+                answer=answer,
+                transcript_version=video.transcript_version,
+                embedding_model=settings.EMBEDDING_MODEL,
+            )
+            with observe_stage(ASK_QUESTION_STAGE_SECONDS, "db_insert"):
+                await get_interaction_writer().submit([interaction])
+            return {
+                "answer": answer,
+                "context": [],
+                "coverage": video.coverage(),
+                "precomputed": True,
+            }
+
         # Convert stored embeddings back to numpy arrays
-        embeddings = [np.array(emb) for emb in video.embeddings]
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "decode"):
+            embeddings = [np.array(emb) for emb in video.embeddings]
 
         # Find relevant chunks for the query
-        relevant_chunks = find_relevant_chunks(query.question, video.chunks, embeddings)
+        if query_embedding is None:
+            with observe_stage(ASK_QUESTION_STAGE_SECONDS, "query_embed"):
+                query_embedding = get_embeddings(query.question)
+        # Broad questions are answered from section or video summaries
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "similarity"):
+            selection = await select_context(db, video, query_embedding, embeddings)
+        relevant_chunks = selection.texts
 
         # Construct context from relevant chunks
         context = "\n".join(relevant_chunks)
 
         # Get answer using Gemini
-        response = await get_gemini_response(context, query.question)
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "llm"):
+            response = await get_gemini_response(context, query.question)
 
-        # Store the interaction without specifying the ID
+        # Store references to the chunks rather than a copy of their text
         interaction = QueryInteraction(
             username=current_user,
             video_id=query.video_id,
             question=query.question,
             answer=response,
-            context=context,
+            context_refs=selection.refs,
+            transcript_version=video.transcript_version,
+            embedding_model=settings.EMBEDDING_MODEL,
         )
-        db.add(interaction)
-        await db.commit()
+        # Written in bulk by a background task
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "db_insert"):
+            await get_interaction_writer().submit([interaction])
 
         return {
             "answer": response,
             "context": relevant_chunks,  # Optionally return the used context
+            # Transcription may still be running; say how much was searched
+            "coverage": video.coverage(),
         }
     except Exception as e:
         logger.error(f"Error processing question for video {query.video_id}: {e}")
@@ -86,24 +166,123 @@ async def ask_question(
         )
 
 
+@router.post("/ask-questions")
+# One budget with ask-question, so batching saves calls rather than adding them
+@limiter.shared_limit("5/minute", scope="ask")
+async def ask_questions(
+    request: Request,
+    query: BatchQueryRequest,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user),
+):
+    """Answer several questions about one video with a single LLM call."""
+    try:
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "db_fetch"):
+            video = await load_video(db, query.video_id)
+
+        if not video or not video.chunk_count() or not video.embeddings:
+            raise HTTPException(
+                status_code=404, detail="Transcript not found for the given video."
+            )
+
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "decode"):
+            embeddings = np.asarray(video.embeddings, dtype=np.float32)
+
+        # Encode every question in one batch and rank them all at once
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "query_embed"):
+            query_embeddings = get_batch_embeddings(query.questions)
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "similarity"):
+            rankings = score_chunks_batch(query_embeddings, embeddings)
+
+        # Chunks retrieved by several questions go into the prompt once
+        excerpt_chunks = sorted({index for ranked in rankings for index, _ in ranked})
+        excerpt_positions = {chunk: i for i, chunk in enumerate(excerpt_chunks)}
+        excerpt_ids = [
+            [excerpt_positions[index] for index, _ in ranked] for ranked in rankings
+        ]
+
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "db_fetch"):
+            texts = await load_chunk_texts(db, query.video_id, excerpt_chunks)
+
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "llm"):
+            answers = await get_gemini_batch_response(
+                [texts.get(index, "") for index in excerpt_chunks],
+                query.questions,
+                excerpt_ids,
+            )
+
+        interactions = [
+            QueryInteraction(
+                username=current_user,
+                video_id=query.video_id,
+                question=question,
+                answer=answer,
+                context_refs=context_refs_from_ranking(ranked),
+                transcript_version=video.transcript_version,
+                embedding_model=settings.EMBEDDING_MODEL,
+            )
+            for question, answer, ranked in zip(query.questions, answers, rankings)
+        ]
+        # Written in bulk by a background task
+        with observe_stage(ASK_QUESTION_STAGE_SECONDS, "db_insert"):
+            await get_interaction_writer().submit(interactions)
+
+        return {
+            "answers": [
+                {
+                    "question": question,
+                    "answer": answer,
+                    "context": [texts.get(index, "") for index, _ in ranked],
+                }
+                for question, answer, ranked in zip(query.questions, answers, rankings)
+            ],
+            "coverage": video.coverage(),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing questions for video {query.video_id}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to process your questions. Please try again later.",
+        )
+
+
 @router.get("/history/{video_id}")
 async def get_query_history(
     video_id: str,
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_context: bool = False,
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user),
 ):
     try:
-        result = await db.execute(
+        statement = (
             select(QueryInteraction)
             .where(
                 QueryInteraction.video_id == video_id,
                 QueryInteraction.username == current_user,
             )
-            .order_by(QueryInteraction.created_at.desc())
+            .order_by(desc(QueryInteraction.created_at), desc(QueryInteraction.id))
+            .limit(limit)
         )
+        if cursor:
+            created_at, interaction_id = decode_cursor(cursor)
+            statement = statement.where(
+                tuple_(QueryInteraction.created_at, QueryInteraction.id)
+                < tuple_(created_at, interaction_id)
+            )
+        result = await db.execute(statement)
         interactions = result.scalars().all()
 
-        return [
+        if len(interactions) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                interactions[-1].created_at, interactions[-1].id
+            )
+
+        history = [
             {
                 "id": interaction.id,
                 "question": interaction.question,
@@ -112,6 +291,36 @@ async def get_query_history(
             }
             for interaction in interactions
         ]
+
+        if include_context and interactions:
+            result = await db.execute(
+                select(
+                    VideoTranscription.section_summaries,
+                    VideoTranscription.summary,
+                    VideoTranscription.transcript_version,
+                ).where(VideoTranscription.video_id == video_id)
+            )
+            sections, summary, version = result.first() or (None, None, None)
+            # Only the current chunks these answers referenced are materialized
+            chunks = await load_chunk_texts(
+                db,
+                video_id,
+                [
+                    ref["chunk"]
+                    for interaction in interactions
+                    if interaction.transcript_version == version
+                    for ref in interaction.context_refs or []
+                    if "chunk" in ref
+                ],
+            )
+            for entry, interaction in zip(history, interactions):
+                entry["context"] = resolve_context(
+                    interaction, chunks, sections, summary, version
+                )
+
+        return history
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching history for video {video_id}: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch query history")
@@ -1,18 +1,29 @@
+import asyncio
 import logging
+from typing import Optional
 
 from celery.result import AsyncResult
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, validator
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
-from db import get_db
+from config import get_settings
+from db import async_session, get_db, get_read_db, reads_replica
 from models.video_transcription import TranscriptionStatus, VideoTranscription
 from services.auth import get_current_user
+from services.scheduling import classify_job, enqueue_transcription
+from services.transcript import load_chunk_range
+from services.youtube import extract_metadata, has_captions
 from tasks.video_processor import celery_app, fetch_or_generate_transcript_with_whisper
+from utils.http_cache import cached_json_response, make_etag, match_etag, not_modified
+from utils.video_ids import canonical_url, extract_video_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 class TranscriptionRequest(BaseModel):
@@ -20,9 +31,77 @@ class TranscriptionRequest(BaseModel):
 
     @validator("video_url")
     def validate_youtube_url(cls, v):
-        if not VideoTranscription.validate_youtube_url(v):
+        video_id = extract_video_id(v)
+        if video_id is None:
             raise ValueError("Invalid YouTube URL")
-        return v
+        # Every form of a video's URL maps to the same row and job
+        return canonical_url(video_id)
+
+
+async def probe_video(video_url: str, video_id: str) -> dict:
+    """Fetch metadata and caption availability to classify the job.
+
+    Gives up after METADATA_PROBE_TIMEOUT and schedules the job as long.
+    """
+    try:
+        metadata, captions = await asyncio.wait_for(
+            asyncio.gather(
+                asyncio.to_thread(extract_metadata, video_url),
+                asyncio.to_thread(has_captions, video_id),
+            ),
+            timeout=settings.METADATA_PROBE_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Timed out probing video {video_id}")
+        metadata = {"title": None, "thumbnail": None, "duration": None}
+        captions = None
+    return {**metadata, "captions": captions}
+
+
+async def schedule_transcription(
+    transcription: VideoTranscription, probe: dict, username: str
+) -> dict:
+    job_class = classify_job(probe["duration"], probe["captions"])
+    return await asyncio.to_thread(
+        enqueue_transcription,
+        fetch_or_generate_transcript_with_whisper,
+        transcription.video_url,
+        username,
+        job_class,
+        probe["duration"],
+    )
+
+
+async def claim_transcription(
+    db: AsyncSession, video_id: str, video_url: str
+) -> Optional[str]:
+    """Mark a new or failed video PENDING, returning the message for its job.
+
+    The row is inserted, or flipped from ERROR, in a single statement, so of
+    several concurrent submits of one video only one claims it. The others
+    get None and report the video's current status.
+    """
+    inserted = await db.scalar(
+        insert(VideoTranscription)
+        .values(
+            video_id=video_id, video_url=video_url, status=TranscriptionStatus.PENDING
+        )
+        .on_conflict_do_nothing(index_elements=[VideoTranscription.video_id])
+        .returning(VideoTranscription.id)
+    )
+    if inserted is not None:
+        return "Transcription started"
+
+    retried = await db.scalar(
+        update(VideoTranscription)
+        .where(
+            VideoTranscription.video_id == video_id,
+            VideoTranscription.status == TranscriptionStatus.ERROR,
+        )
+        .values(status=TranscriptionStatus.PENDING)
+        .returning(VideoTranscription.id)
+    )
+    return "Retrying transcription" if retried is not None else None
 
 
 @router.post("/transcribe")
@@ -32,49 +111,63 @@ async def transcribe_video(
     current_user: str = Depends(get_current_user),
 ):
     try:
-        video_id = request.video_url.split("v=")[1]
+        video_id = extract_video_id(request.video_url)
 
         # Check if transcription already exists
-        result = await db.execute(
+        existing = await db.scalar(
             select(VideoTranscription).where(VideoTranscription.video_id == video_id)
         )
-        existing_transcription = result.scalar_one_or_none()
 
-        if existing_transcription:
-            # If it exists but is in error state, retry transcription
-            if existing_transcription.status == TranscriptionStatus.ERROR:
-                existing_transcription.status = TranscriptionStatus.PENDING
-                await db.commit()
-                fetch_or_generate_transcript_with_whisper.delay(request.video_url)
-                return {
-                    "status": "processing",
-                    "message": "Retrying transcription",
-                    "video_id": video_id,
-                }
-
-            # If it's pending or completed, return current status
+        # Claim new and failed videos before the probe, which can take seconds
+        message = None
+        if existing is None or existing.status == TranscriptionStatus.ERROR:
+            message = await claim_transcription(db, video_id, request.video_url)
+            await db.commit()
+
+        if message is None:
+            # Pending or completed, possibly by a concurrent request
+            status = await db.scalar(
+                select(VideoTranscription.status).where(
+                    VideoTranscription.video_id == video_id
+                )
+            )
             return {
-                "status": existing_transcription.status,
-                "message": f"Transcription already {existing_transcription.status}",
+                "status": status,
+                "message": f"Transcription already {status}",
                 "video_id": video_id,
             }
 
-        # Create new transcription if it doesn't exist
-        transcription = VideoTranscription(
-            video_id=video_id,
-            video_url=request.video_url,
-            status=TranscriptionStatus.PENDING,  # Use enum value
-        )
-        db.add(transcription)
-        await db.commit()
+        try:
+            transcription = await db.scalar(
+                select(VideoTranscription)
+                .where(VideoTranscription.video_id == video_id)
+                .execution_options(populate_existing=True)
+            )
+            probe = await probe_video(transcription.video_url, video_id)
+            if existing is None:
+                transcription.title = probe["title"]
+                transcription.thumbnail_url = probe["thumbnail"]
+                transcription.duration_seconds = probe["duration"]
+                await db.commit()
 
-        # Start transcription process
-        fetch_or_generate_transcript_with_whisper.delay(request.video_url)
+            # Start transcription process on the queue matching its cost
+            schedule = await schedule_transcription(transcription, probe, current_user)
+        except Exception:
+            # Let a later submit retry instead of leaving the video PENDING
+            await db.rollback()
+            await db.execute(
+                update(VideoTranscription)
+                .where(VideoTranscription.video_id == video_id)
+                .values(status=TranscriptionStatus.ERROR)
+            )
+            await db.commit()
+            raise
 
         return {
             "status": "processing",
-            "message": "Transcription started",
+            "message": message,
             "video_id": video_id,
+            **schedule,
         }
     except Exception as e:
         logger.error(f"Error starting transcription: {e}")
@@ -86,24 +179,48 @@ async def transcribe_video(
 @router.get("/status/{video_id}")
 async def get_transcription_status(
     video_id: str,
-    db: AsyncSession = Depends(get_db),
+    include_transcript: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user),
 ):
+    """Poll a transcription. Use GET /transcript/{video_id} for the text itself."""
     try:
-        result = await db.execute(
-            select(VideoTranscription).where(VideoTranscription.video_id == video_id)
+        columns = [
+            VideoTranscription.status,
+            VideoTranscription.transcribed_seconds,
+            VideoTranscription.duration_seconds,
+            VideoTranscription.transcript_source,
+        ]
+        if include_transcript:
+            columns.append(VideoTranscription.transcript)
+        statement = (
+            select(VideoTranscription)
+            .options(load_only(*columns))
+            .where(VideoTranscription.video_id == video_id)
         )
-        transcription = result.scalars().first()
+        transcription = (await db.execute(statement)).scalars().first()
+        # The replica may not have replayed the worker's latest write yet
+        unfinished = transcription is None or transcription.status not in (
+            TranscriptionStatus.COMPLETED,
+            TranscriptionStatus.ERROR,
+        )
+        if unfinished and reads_replica(db):
+            async with async_session() as primary:
+                transcription = (await primary.execute(statement)).scalars().first()
         if not transcription:
             raise HTTPException(status_code=404, detail="Transcription not found")
-        return {
+        response = {
             "status": transcription.status,
-            "transcript": (
+            "coverage": transcription.coverage(),
+            "source": transcription.transcript_source,
+        }
+        if include_transcript:
+            response["transcript"] = (
                 transcription.transcript
                 if transcription.status == TranscriptionStatus.COMPLETED
                 else None
-            ),
-        }
+            )
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -111,3 +228,127 @@ async def get_transcription_status(
         raise HTTPException(
             status_code=500, detail="Failed to fetch transcription status"
         )
+
+
+def select_chunk_range(
+    chunk_times: Optional[list],
+    total_chunks: int,
+    start_chunk: int,
+    limit: int,
+    start_time: Optional[float],
+    end_time: Optional[float],
+) -> range:
+    """Indices of the chunks to return, by chunk offset or by time range."""
+    if start_time is None and end_time is None:
+        stop = min(start_chunk + limit, total_chunks)
+        return range(min(start_chunk, stop), stop)
+    if not chunk_times or len(chunk_times) != total_chunks:
+        raise HTTPException(
+            status_code=400, detail="Time ranges are not available for this video"
+        )
+    start_time = start_time or 0.0
+    end_time = float("inf") if end_time is None else end_time
+    if end_time < start_time:
+        raise HTTPException(status_code=400, detail="end_time is before start_time")
+    # Chunks overlapping [start_time, end_time], at most limit of them
+    overlapping = [
+        index
+        for index, (chunk_start, chunk_end) in enumerate(chunk_times)
+        if index >= start_chunk and chunk_end >= start_time and chunk_start <= end_time
+    ]
+    if not overlapping:
+        return range(0)
+    return range(overlapping[0], min(overlapping[-1] + 1, overlapping[0] + limit))
+
+
+@router.get("/{video_id}")
+async def get_transcript(
+    video_id: str,
+    request: Request,
+    start_chunk: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    start_time: Optional[float] = Query(None, ge=0),
+    end_time: Optional[float] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    """Transcript chunks by offset or time range, with ETag revalidation.
+
+    Continue from next_chunk until it is null. The ETag changes whenever the
+    transcription row is updated, so a 304 means the cached page is current.
+    """
+    try:
+        # Check the validator before loading any transcript text
+        result = await db.execute(
+            select(VideoTranscription.updated_at, VideoTranscription.created_at).where(
+                VideoTranscription.video_id == video_id
+            )
+        )
+        row = result.first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Transcription not found")
+        etag = make_etag(video_id, row.updated_at or row.created_at)
+        matched = match_etag(request.headers.get("if-none-match"), etag)
+        if matched:
+            return not_modified(matched)
+
+        result = await db.execute(
+            select(VideoTranscription)
+            .options(
+                load_only(
+                    VideoTranscription.status,
+                    VideoTranscription.chunks,
+                    VideoTranscription.chunk_spans,
+                    VideoTranscription.chunk_times,
+                    VideoTranscription.transcribed_seconds,
+                    VideoTranscription.duration_seconds,
+                )
+            )
+            .where(VideoTranscription.video_id == video_id)
+        )
+        transcription = result.scalars().first()
+        if transcription is None:
+            # Deleted since the validator was read
+            raise HTTPException(status_code=404, detail="Transcription not found")
+        spans = transcription.chunk_spans
+        total_chunks = len(spans or transcription.chunks or [])
+        chunk_times = transcription.chunk_times
+        indices = select_chunk_range(
+            chunk_times, total_chunks, start_chunk, limit, start_time, end_time
+        )
+        if spans:
+            # Cut just this page out of the transcript
+            texts = await load_chunk_range(db, video_id, spans, indices)
+        else:
+            texts = [transcription.chunks[index] for index in indices]
+        has_times = chunk_times and len(chunk_times) == total_chunks
+        next_chunk = indices.stop if indices and indices.stop < total_chunks else None
+        if next_chunk is not None and end_time is not None and has_times:
+            # The time range ends before the next chunk starts
+            if chunk_times[next_chunk][0] > end_time:
+                next_chunk = None
+        return cached_json_response(
+            request,
+            {
+                "video_id": video_id,
+                "status": transcription.status.value,
+                "coverage": transcription.coverage(),
+                "total_chunks": total_chunks,
+                "chunks": [
+                    {
+                        "index": index,
+                        "text": text,
+                        "start_time": chunk_times[index][0] if has_times else None,
+                        "end_time": chunk_times[index][1] if has_times else None,
+                    }
+                    for index, text in zip(indices, texts)
+                ],
+                "next_chunk": next_chunk,
+            },
+            etag,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching transcript: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch transcript")
@@ -1,16 +1,17 @@
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
-from sqlalchemy import desc, func, select
+from sqlalchemy import desc, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db import async_session
+from db import get_read_db
 from models.query_interaction import QueryInteraction
-from models.user import User
+from models.user_video_summary import UserVideoSummary
 from models.video_transcription import VideoTranscription
 from services.auth import get_current_user
+from utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 
 router = APIRouter()
 
@@ -35,44 +36,62 @@ class QueryHistoryResponse(BaseModel):
 
 
 @router.get("/videos/history", response_model=List[VideoHistoryResponse])
-async def get_video_history(current_user: str = Depends(get_current_user)):
-    """Get all videos that the user has interacted with"""
+async def get_video_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user),
+):
+    """Get the videos that the user has interacted with, most recent first.
+
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        async with async_session() as db:
-            # First, get all video IDs the user has interacted with
-            query = (
-                select(
-                    VideoTranscription.video_id,
-                    VideoTranscription.title,
-                    VideoTranscription.thumbnail_url,
-                    func.max(QueryInteraction.created_at).label("last_interaction"),
-                )
-                .select_from(QueryInteraction)
-                .join(
-                    VideoTranscription,
-                    VideoTranscription.video_id == QueryInteraction.video_id,
-                )
-                .where(QueryInteraction.username == current_user)
-                .group_by(
-                    VideoTranscription.video_id,
-                    VideoTranscription.title,
-                    VideoTranscription.thumbnail_url,
-                )
-                .order_by(desc("last_interaction"))
+        query = (
+            select(
+                UserVideoSummary.video_id,
+                UserVideoSummary.last_interaction,
+                VideoTranscription.title,
+                VideoTranscription.thumbnail_url,
+            )
+            .join(
+                VideoTranscription,
+                VideoTranscription.video_id == UserVideoSummary.video_id,
+            )
+            .where(UserVideoSummary.username == current_user)
+            .order_by(
+                desc(UserVideoSummary.last_interaction),
+                desc(UserVideoSummary.video_id),
+            )
+            .limit(limit)
+        )
+        if cursor:
+            last_interaction, video_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(UserVideoSummary.last_interaction, UserVideoSummary.video_id)
+                < tuple_(last_interaction, video_id)
+            )
+
+        result = await db.execute(query)
+        videos = result.all()
+
+        if len(videos) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                videos[-1].last_interaction, videos[-1].video_id
             )
 
-            result = await db.execute(query)
-            videos = result.all()
-
-            return [
-                VideoHistoryResponse(
-                    video_id=video.video_id,
-                    video_title=video.title or "Untitled Video",
-                    last_interaction=video.last_interaction,
-                    thumbnail_url=video.thumbnail_url or "",
-                )
-                for video in videos
-            ]
+        return [
+            VideoHistoryResponse(
+                video_id=video.video_id,
+                video_title=video.title or "Untitled Video",
+                last_interaction=video.last_interaction,
+                thumbnail_url=video.thumbnail_url or "",
+            )
+            for video in videos
+        ]
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_video_history: {str(e)}")
         raise HTTPException(
@@ -82,32 +101,49 @@ async def get_video_history(current_user: str = Depends(get_current_user)):
 
 @router.get("/videos/{video_id}/queries", response_model=List[QueryHistoryResponse])
 async def get_video_queries(
-    video_id: str, current_user: str = Depends(get_current_user)
+    video_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: str = Depends(get_current_user),
 ):
-    """Get all queries for a specific video"""
+    """Get the queries for a specific video, newest first"""
     try:
-        async with async_session() as db:
-            # Get all queries for this video from this user
-            query = (
-                select(QueryInteraction)
-                .where(
-                    QueryInteraction.video_id == video_id,
-                    QueryInteraction.username == current_user,
-                )
-                .order_by(desc(QueryInteraction.created_at))
+        query = (
+            select(QueryInteraction)
+            .where(
+                QueryInteraction.video_id == video_id,
+                QueryInteraction.username == current_user,
+            )
+            .order_by(desc(QueryInteraction.created_at), desc(QueryInteraction.id))
+            .limit(limit)
+        )
+        if cursor:
+            created_at, interaction_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(QueryInteraction.created_at, QueryInteraction.id)
+                < tuple_(created_at, interaction_id)
             )
 
-            result = await db.execute(query)
-            queries = result.scalars().all()
-
-            return [
-                QueryHistoryResponse(
-                    question=query.question,
-                    answer=query.answer,
-                    timestamp=query.created_at,
-                )
-                for query in queries
-            ]
+        result = await db.execute(query)
+        queries = result.scalars().all()
+
+        if len(queries) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                queries[-1].created_at, queries[-1].id
+            )
+
+        return [
+            QueryHistoryResponse(
+                question=query.question,
+                answer=query.answer,
+                timestamp=query.created_at,
+            )
+            for query in queries
+        ]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch query history: {str(e)}"
@@ -4,8 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db import get_db
-from models.video_transcription import VideoTranscription
+from db import async_session, get_read_db, reads_replica
+from models.video_transcription import TranscriptionStatus, VideoTranscription
 from services.auth import get_current_user
 
 logger = logging.getLogger(__name__)
@@ -16,14 +16,22 @@ router = APIRouter()
 @router.get("/{video_id}")
 async def get_video_details(
     video_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: str = Depends(get_current_user),
 ):
     try:
-        result = await db.execute(
-            select(VideoTranscription).where(VideoTranscription.video_id == video_id)
+        statement = select(VideoTranscription).where(
+            VideoTranscription.video_id == video_id
         )
-        video = result.scalar_one_or_none()
+        video = (await db.execute(statement)).scalar_one_or_none()
+        unfinished = video is None or video.status not in (
+            TranscriptionStatus.COMPLETED,
+            TranscriptionStatus.ERROR,
+        )
+        if unfinished and reads_replica(db):
+            # The replica may not have replayed the latest write yet
+            async with async_session() as primary:
+                video = (await primary.execute(statement)).scalar_one_or_none()
 
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
@@ -0,0 +1,131 @@
+"""Replace the stored context text of older interactions with chunk references.
+
+Rows are processed in id order in small batches, each in its own transaction,
+so the backfill can be interrupted and resumed safely:
+
+    python -m scripts.compact_interactions --batch-size 500
+
+Rows whose context cannot be matched to the video's current chunks are left
+untouched. Run VACUUM on query_interactions afterwards to return the space.
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+
+from config import get_settings
+from db import async_session, engine
+from models.query_interaction import QueryInteraction
+from models.video_transcription import VideoTranscription
+from utils.chunking import slice_chunks
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def match_context(context: str, chunks: List[str]) -> Optional[List[int]]:
+    """Find the chunk ordinals that were joined with newlines to build context."""
+    ordinals = []
+    position = 0
+    while position < len(context):
+        candidates = [
+            (len(chunk), index)
+            for index, chunk in enumerate(chunks)
+            if chunk and context.startswith(chunk, position)
+        ]
+        if not candidates:
+            return None
+        length, index = max(candidates)
+        ordinals.append(index)
+        # Skip the newline separator between chunks
+        position += length + 1
+    return ordinals
+
+
+async def compact_batch(after_id: int, batch_size: int) -> Optional[int]:
+    """Compact one batch, returning the last id seen or None when done."""
+    async with async_session() as db:
+        async with db.begin():
+            result = await db.execute(
+                select(
+                    QueryInteraction.id,
+                    QueryInteraction.video_id,
+                    QueryInteraction.context,
+                )
+                .where(
+                    QueryInteraction.id > after_id,
+                    QueryInteraction.context.is_not(None),
+                    QueryInteraction.context_refs.is_(None),
+                )
+                .order_by(QueryInteraction.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                return None
+
+            video_ids = {row.video_id for row in rows}
+            result = await db.execute(
+                select(
+                    VideoTranscription.video_id,
+                    VideoTranscription.chunks,
+                    VideoTranscription.transcript,
+                    VideoTranscription.chunk_spans,
+                    VideoTranscription.transcript_version,
+                ).where(VideoTranscription.video_id.in_(video_ids))
+            )
+            chunks_by_video: Dict[str, List[str]] = {}
+            versions: Dict[str, Optional[int]] = {}
+            for video_id, chunks, transcript, spans, version in result.all():
+                chunks_by_video[video_id] = chunks or slice_chunks(transcript, spans)
+                versions[video_id] = version
+
+            updates = []
+            for row in rows:
+                ordinals = match_context(
+                    row.context, chunks_by_video.get(row.video_id, [])
+                )
+                if ordinals is None:
+                    continue
+                updates.append(
+                    {
+                        "id": row.id,
+                        "context": None,
+                        # Similarity scores were never stored for legacy rows
+                        "context_refs": [{"chunk": i, "score": None} for i in ordinals],
+                        "transcript_version": versions[row.video_id],
+                        "embedding_model": settings.EMBEDDING_MODEL,
+                    }
+                )
+            if updates:
+                # ORM bulk UPDATE by primary key, executed as one executemany
+                await db.execute(update(QueryInteraction), updates)
+
+            logger.info(
+                f"Compacted {len(updates)}/{len(rows)} interactions up to id {rows[-1].id}"
+            )
+            return rows[-1].id
+
+
+async def run(batch_size: int) -> None:
+    last_id = 0
+    try:
+        while last_id is not None:
+            last_id = await compact_batch(last_id, batch_size)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    asyncio.run(run(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Export the embedding model to int8 ONNX and check it against PyTorch.
+
+    python -m scripts.export_onnx_embeddings
+
+The export fails if any sample sentence's embedding drops below
+EMBEDDING_MIN_COSINE similarity to the PyTorch embedding.
+"""
+
+import argparse
+import logging
+import sys
+
+from config import get_settings
+from utils.embedding_backends import (
+    OnnxBackend,
+    SentenceTransformerBackend,
+    cosine_agreement,
+    export_quantized_onnx,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SAMPLE_TEXTS = [
+    "Welcome back to the channel, today we are looking at transformers.",
+    "The gradient is propagated backwards through every layer of the network.",
+    "So the key point here is that the market reacted before the announcement.",
+    "Add the flour slowly while stirring, otherwise you will get lumps.",
+    "In 1969 the first message was sent over what would become the internet.",
+    "um so yeah I think that's basically it for this part let's move on",
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "If you liked this video, please subscribe and hit the notification bell.",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=settings.EMBEDDING_ONNX_PATH)
+    parser.add_argument(
+        "--min-cosine", type=float, default=settings.EMBEDDING_MIN_COSINE
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+
+    export_quantized_onnx(settings.EMBEDDING_MODEL, args.output)
+
+    agreement = cosine_agreement(
+        SentenceTransformerBackend(settings.EMBEDDING_MODEL),
+        OnnxBackend(settings.EMBEDDING_MODEL, args.output),
+        SAMPLE_TEXTS,
+    )
+    logger.info(
+        f"Cosine similarity to PyTorch: min {agreement.min():.4f}, "
+        f"mean {agreement.mean():.4f}"
+    )
+    if agreement.min() < args.min_cosine:
+        logger.error(f"Exported model is below the {args.min_cosine} tolerance")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
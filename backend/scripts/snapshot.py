@@ -0,0 +1,303 @@
+"""Export completed transcriptions to a Parquet snapshot, or load one back.
+
+Rows are streamed in id order, one Parquet row group per batch, and embeddings
+are stored as fixed-size float32 binaries rather than JSON text:
+
+    python -m scripts.snapshot export videos.parquet --batch-size 200
+    python -m scripts.snapshot import videos.parquet [--replace]
+
+Imports COPY each batch into a temporary table and insert it from there, so
+videos that already exist are skipped, or overwritten with --replace. Memory
+use is bounded by the batch size in both directions.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+
+from config import get_settings
+from db import async_session, engine
+from models.video_transcription import TranscriptionStatus, VideoTranscription
+from utils.chunking import locate_chunks, slice_chunks
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SNAPSHOT_VERSION = "2"
+
+# Columns copied in both directions, in the order of the snapshot schema
+COLUMNS = [
+    "video_id",
+    "video_url",
+    "title",
+    "thumbnail_url",
+    "duration_seconds",
+    "transcribed_seconds",
+    "transcript_source",
+    "transcript",
+    "chunks",
+    "chunk_times",
+    "embeddings",
+    "summary",
+    "summary_embedding",
+    "section_summaries",
+    "section_embeddings",
+    "canonical_answers",
+    "created_at",
+]
+
+# Columns written on import, derived from the snapshot rather than stored in it
+IMPORT_COLUMNS = COLUMNS + ["chunk_spans", "status", "updated_at"]
+
+
+def snapshot_schema(dimension: int) -> pa.Schema:
+    vector = pa.binary(dimension * 4)
+    return pa.schema(
+        [
+            ("video_id", pa.string()),
+            ("video_url", pa.string()),
+            ("title", pa.string()),
+            ("thumbnail_url", pa.string()),
+            ("duration_seconds", pa.float64()),
+            ("transcribed_seconds", pa.float64()),
+            ("transcript_source", pa.string()),
+            ("transcript", pa.large_string()),
+            ("chunks", pa.list_(pa.string())),
+            ("chunk_times", pa.list_(pa.list_(pa.float64(), 2))),
+            ("embeddings", pa.list_(vector)),
+            ("summary", pa.string()),
+            ("summary_embedding", vector),
+            # Small nested structures stay as JSON text
+            ("section_summaries", pa.string()),
+            ("section_embeddings", pa.list_(vector)),
+            ("canonical_answers", pa.string()),
+            ("created_at", pa.timestamp("us")),
+        ],
+        metadata={
+            "snapshot_version": SNAPSHOT_VERSION,
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "embedding_dimension": str(dimension),
+        },
+    )
+
+
+def pack_vectors(vectors: Optional[List[List[float]]]) -> Optional[List[bytes]]:
+    if vectors is None:
+        return None
+    return [np.asarray(vector, dtype="<f4").tobytes() for vector in vectors]
+
+
+def unpack_vectors(packed: Optional[List[bytes]]) -> Optional[List[List[float]]]:
+    if packed is None:
+        return None
+    return [np.frombuffer(vector, dtype="<f4").tolist() for vector in packed]
+
+
+def to_record(video: VideoTranscription) -> Dict:
+    return {
+        "video_id": video.video_id,
+        "video_url": video.video_url,
+        "title": video.title,
+        "thumbnail_url": video.thumbnail_url,
+        "duration_seconds": video.duration_seconds,
+        "transcribed_seconds": video.transcribed_seconds,
+        "transcript_source": video.transcript_source,
+        "transcript": video.transcript,
+        # Chunk text is written out so snapshots stay self-contained
+        "chunks": video.chunks or slice_chunks(video.transcript, video.chunk_spans),
+        "chunk_times": video.chunk_times,
+        "embeddings": pack_vectors(video.embeddings),
+        "summary": video.summary,
+        "summary_embedding": (
+            pack_vectors([video.summary_embedding])[0]
+            if video.summary_embedding
+            else None
+        ),
+        "section_summaries": (
+            json.dumps(video.section_summaries) if video.section_summaries else None
+        ),
+        "section_embeddings": pack_vectors(video.section_embeddings),
+        "canonical_answers": (
+            json.dumps(video.canonical_answers) if video.canonical_answers else None
+        ),
+        "created_at": video.created_at,
+    }
+
+
+async def export_snapshot(path: str, batch_size: int) -> None:
+    writer: Optional[pq.ParquetWriter] = None
+    dimension = None
+    last_id = 0
+    exported = skipped = 0
+    try:
+        while True:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(VideoTranscription)
+                    .where(
+                        VideoTranscription.id > last_id,
+                        VideoTranscription.status == TranscriptionStatus.COMPLETED,
+                    )
+                    .order_by(VideoTranscription.id)
+                    .limit(batch_size)
+                )
+                videos = result.scalars().all()
+            if not videos:
+                break
+            last_id = videos[-1].id
+
+            records = []
+            for video in videos:
+                if not video.embeddings:
+                    skipped += 1
+                    continue
+                if dimension is None:
+                    dimension = len(video.embeddings[0])
+                    writer = pq.ParquetWriter(
+                        path, snapshot_schema(dimension), compression="zstd"
+                    )
+                if len(video.embeddings[0]) != dimension:
+                    logger.warning(
+                        f"Skipping {video.video_id}: embeddings have "
+                        f"{len(video.embeddings[0])} dimensions, not {dimension}"
+                    )
+                    skipped += 1
+                    continue
+                records.append(to_record(video))
+
+            if records:
+                writer.write_batch(
+                    pa.RecordBatch.from_pylist(records, schema=writer.schema)
+                )
+                exported += len(records)
+            logger.info(f"Exported {exported} videos up to id {last_id}")
+    finally:
+        if writer is not None:
+            writer.close()
+        await engine.dispose()
+
+    if writer is None:
+        logger.warning("No completed transcriptions to export")
+    logger.info(f"Exported {exported} videos to {path}, skipped {skipped}")
+
+
+def _json(value) -> Optional[str]:
+    return None if value is None else json.dumps(value)
+
+
+def to_row(record: Dict, now: datetime) -> tuple:
+    """Convert a snapshot record into a row for COPY, in IMPORT_COLUMNS order."""
+    # Version 1 snapshots predate transcript_source
+    record = {"transcript_source": None, **record}
+    summary_embedding = record["summary_embedding"]
+    # Store chunks as offsets into the transcript when they can be located
+    spans = locate_chunks(record["transcript"], record["chunks"] or [])
+    values = dict(
+        record,
+        chunks=None if spans else _json(record["chunks"]),
+        chunk_spans=_json(spans),
+        chunk_times=_json(record["chunk_times"]),
+        embeddings=_json(unpack_vectors(record["embeddings"])),
+        summary_embedding=_json(
+            unpack_vectors([summary_embedding])[0] if summary_embedding else None
+        ),
+        section_embeddings=_json(unpack_vectors(record["section_embeddings"])),
+        # section_summaries and canonical_answers are already JSON text
+    )
+    values.update(status=TranscriptionStatus.COMPLETED.value, updated_at=now)
+    return tuple(values[column] for column in IMPORT_COLUMNS)
+
+
+async def import_snapshot(path: str, batch_size: int, replace: bool) -> None:
+    snapshot = pq.ParquetFile(path)
+    metadata = snapshot.schema_arrow.metadata or {}
+    model = metadata.get(b"embedding_model", b"").decode()
+    if model and model != settings.EMBEDDING_MODEL:
+        logger.warning(
+            f"Snapshot embeddings are from {model}, "
+            f"but EMBEDDING_MODEL is {settings.EMBEDDING_MODEL}"
+        )
+
+    table = VideoTranscription.__tablename__
+    columns = IMPORT_COLUMNS
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    if replace:
+        on_conflict = "DO UPDATE SET " + ", ".join(
+            [
+                f'"{column}" = EXCLUDED."{column}"'
+                for column in columns
+                if column != "video_id"
+            ]
+            # Chunk references from existing history no longer apply
+            + [
+                f'"transcript_version" = '
+                f'COALESCE("{table}"."transcript_version", 0) + 1'
+            ]
+        )
+    else:
+        on_conflict = "DO NOTHING"
+
+    imported = total = 0
+    try:
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            connection = raw.driver_connection
+            for batch in snapshot.iter_batches(batch_size=batch_size):
+                now = datetime.utcnow()
+                rows = [to_row(record, now) for record in batch.to_pylist()]
+                async with connection.transaction():
+                    # Only the imported columns: LIKE would also copy NOT NULL
+                    # on id, which COPY leaves empty for the insert to assign
+                    await connection.execute(
+                        "CREATE TEMP TABLE snapshot_stage ON COMMIT DROP AS "
+                        f'SELECT {column_list} FROM "{table}" WITH NO DATA'
+                    )
+                    await connection.copy_records_to_table(
+                        "snapshot_stage", records=rows, columns=columns
+                    )
+                    status = await connection.execute(
+                        f'INSERT INTO "{table}" ({column_list}) '
+                        f"SELECT {column_list} FROM snapshot_stage "
+                        f"ON CONFLICT (video_id) {on_conflict}"
+                    )
+                imported += int(status.split()[-1])
+                total += len(rows)
+                logger.info(f"Imported {imported} of {total} videos read so far")
+    finally:
+        await engine.dispose()
+    logger.info(
+        f"Imported {imported} videos from {path}, skipped {total - imported} existing"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--batch-size", type=int, default=200)
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--batch-size", type=int, default=200)
+    import_parser.add_argument(
+        "--replace", action="store_true", help="Overwrite videos that already exist"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+
+    if args.command == "export":
+        asyncio.run(export_snapshot(args.path, args.batch_size))
+    else:
+        asyncio.run(import_snapshot(args.path, args.batch_size, args.replace))
+
+
+if __name__ == "__main__":
+    main()
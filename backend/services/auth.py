@@ -7,11 +7,11 @@ import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from config import get_settings
 from models.user import User
+from services.passwords import pwd_context
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -19,8 +19,6 @@ settings = get_settings()
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = "HS256"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
@@ -77,3 +75,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except Exception as e:
         logger.error(f"Unexpected error in auth: {e}")
         raise credentials_exception
+
+
+async def get_admin_user(current_user: str = Depends(get_current_user)):
+    if current_user not in settings.ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required"
+        )
+    return current_user
@@ -1,5 +1,6 @@
+import json
 import logging
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import backoff
 import google.genai as genai
@@ -40,3 +41,161 @@ async def get_gemini_response(context: str, question: str) -> Optional[str]:
     except Exception as e:
         logger.error(f"Gemini API error: {str(e)}")
         raise
+
+
+# Structured output for get_gemini_batch_response: one answer per question id
+BATCH_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "answer": {"type": "STRING"},
+        },
+        "required": ["id", "answer"],
+    },
+}
+
+MISSING_ANSWER = "I cannot answer this based on the available transcript"
+
+
+@backoff.on_exception(backoff.expo, Exception, max_tries=3)
+async def get_gemini_batch_response(
+    excerpts: List[str], questions: List[str], excerpt_ids: List[List[int]]
+) -> List[str]:
+    """Answer several questions about one video in a single request.
+
+    Excerpts shared between questions are sent once; excerpt_ids lists the
+    excerpts retrieved for each question.
+    """
+    try:
+        numbered_excerpts = "\n\n".join(
+            f"[Excerpt {index}]\n{excerpt}" for index, excerpt in enumerate(excerpts)
+        )
+        numbered_questions = "\n".join(
+            f"{index}. {question} (relevant excerpts: "
+            f"{', '.join(str(i) for i in ids)})"
+            for index, (question, ids) in enumerate(zip(questions, excerpt_ids))
+        )
+        prompt = f"""You are an AI assistant helping users understand video content. Answer each of the following questions based on the provided video transcript excerpts.
+
+        Excerpts from Video Transcript:
+        {numbered_excerpts}
+
+        Questions:
+        {numbered_questions}
+
+        Instructions:
+        1. Answer each question based ONLY on the information in its relevant excerpts
+        2. If an answer cannot be found in the excerpts, say "{MISSING_ANSWER}"
+        3. Keep each answer focused and relevant to its question
+        4. Use clear, natural language
+        5. Return one object per question, with "id" set to the question number"""
+
+        response = client.models.generate_content(
+            model=model,
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": BATCH_RESPONSE_SCHEMA,
+            },
+        )
+        answers: Dict[int, str] = {
+            item["id"]: item["answer"] for item in json.loads(response.text)
+        }
+        return [answers.get(index, MISSING_ANSWER) for index in range(len(questions))]
+    except Exception as e:
+        logger.error(f"Gemini API error: {str(e)}")
+        raise
+
+
+INSIGHTS_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {"type": "STRING"},
+        "answers": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["summary", "answers"],
+}
+
+
+@backoff.on_exception(backoff.expo, Exception, max_tries=3)
+async def get_gemini_insights(
+    transcript: str, questions: List[str]
+) -> Tuple[str, List[str]]:
+    """Summarize a whole transcript and answer questions about it in one request.
+
+    For long videos, transcript is the text of the section summaries.
+    """
+    try:
+        numbered_questions = "\n".join(
+            f"{index}. {question}" for index, question in enumerate(questions)
+        )
+        prompt = f"""You are an AI assistant helping users understand video content. Summarize the following video transcript and answer the questions about it.
+
+        Video Transcript:
+        {transcript}
+
+        Questions:
+        {numbered_questions}
+
+        Instructions:
+        1. Use ONLY the information in the transcript
+        2. Write the summary as a short paragraph followed by the key points
+        3. Return one answer per question, in the order the questions are numbered
+        4. If an answer cannot be found in the transcript, say "{MISSING_ANSWER}"
+        5. Use clear, natural language"""
+
+        response = client.models.generate_content(
+            model=model,
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": INSIGHTS_RESPONSE_SCHEMA,
+            },
+        )
+        insights = json.loads(response.text)
+        answers = list(insights["answers"])[: len(questions)]
+        answers += [MISSING_ANSWER] * (len(questions) - len(answers))
+        return insights["summary"], answers
+    except Exception as e:
+        logger.error(f"Gemini API error: {str(e)}")
+        raise
+
+
+SUMMARIES_RESPONSE_SCHEMA = {"type": "ARRAY", "items": {"type": "STRING"}}
+
+
+@backoff.on_exception(backoff.expo, Exception, max_tries=3)
+async def get_gemini_summaries(passages: List[str]) -> List[str]:
+    """Summarize consecutive passages of one transcript, one summary each."""
+    try:
+        numbered_passages = "\n\n".join(
+            f"[Passage {index}]\n{passage}" for index, passage in enumerate(passages)
+        )
+        prompt = f"""You are an AI assistant helping users understand video content. Summarize each of the following consecutive passages from a video transcript.
+
+        Passages:
+        {numbered_passages}
+
+        Instructions:
+        1. Write one summary per passage, in the order the passages are numbered
+        2. Use ONLY the information in that passage
+        3. Keep each summary to a few sentences that name the main points, terms and examples
+        4. Use clear, natural language"""
+
+        response = client.models.generate_content(
+            model=model,
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": SUMMARIES_RESPONSE_SCHEMA,
+            },
+        )
+        summaries = list(json.loads(response.text))[: len(passages)]
+        # Fall back to the start of the passage rather than losing it
+        summaries += [passage[:500] for passage in passages[len(summaries) :]]
+        return summaries
+    except Exception as e:
+        logger.error(f"Gemini API error: {str(e)}")
+        raise
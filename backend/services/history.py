@@ -0,0 +1,92 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.query_interaction import QueryInteraction
+from models.user_video_summary import UserVideoSummary
+
+
+def context_refs_from_ranking(ranked: Sequence[Tuple[int, float]]) -> List[dict]:
+    """Convert rank_chunks output into the form stored on QueryInteraction."""
+    return [{"chunk": index, "score": round(score, 6)} for index, score in ranked]
+
+
+def resolve_context(
+    interaction: QueryInteraction,
+    chunks: Optional[Dict[int, str]],
+    sections: Optional[List[dict]] = None,
+    summary: Optional[str] = None,
+    transcript_version: Optional[int] = None,
+) -> Optional[str]:
+    """Rebuild the context an answer was generated from.
+
+    Legacy rows still carry the full text; newer rows reference chunk,
+    section or video summary ordinals. chunks maps chunk ordinals to text.
+    References into an earlier transcript_version of the video, since
+    re-transcribed, no longer point at the text they were made from.
+    """
+    if interaction.context is not None:
+        return interaction.context
+    if not interaction.context_refs:
+        return None
+    if interaction.transcript_version != transcript_version:
+        return None
+    texts = []
+    for ref in interaction.context_refs:
+        if "chunk" in ref and chunks and ref["chunk"] in chunks:
+            texts.append(chunks[ref["chunk"]])
+        elif "section" in ref and sections and ref["section"] < len(sections):
+            texts.append(sections[ref["section"]]["summary"])
+        elif "summary" in ref and summary:
+            texts.append(summary)
+    return "\n".join(texts) or None
+
+
+async def record_interactions(
+    db: AsyncSession, interactions: List[QueryInteraction]
+) -> None:
+    """Add interactions and fold them into the per-user video summaries.
+
+    The caller owns the transaction and is expected to commit.
+    """
+    totals: Dict[Tuple[str, str], List] = defaultdict(lambda: [None, 0])
+    for interaction in interactions:
+        if interaction.created_at is None:
+            interaction.created_at = datetime.utcnow()
+        total = totals[(interaction.username, interaction.video_id)]
+        if total[0] is None or interaction.created_at > total[0]:
+            total[0] = interaction.created_at
+        total[1] += 1
+        db.add(interaction)
+
+    if not totals:
+        return
+
+    statement = insert(UserVideoSummary).values(
+        [
+            {
+                "username": username,
+                "video_id": video_id,
+                "last_interaction": last_interaction,
+                "interaction_count": count,
+            }
+            for (username, video_id), (last_interaction, count) in totals.items()
+        ]
+    )
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[UserVideoSummary.username, UserVideoSummary.video_id],
+            set_={
+                "last_interaction": func.greatest(
+                    UserVideoSummary.last_interaction,
+                    statement.excluded.last_interaction,
+                ),
+                "interaction_count": UserVideoSummary.interaction_count
+                + statement.excluded.interaction_count,
+            },
+        )
+    )
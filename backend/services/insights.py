@@ -0,0 +1,55 @@
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from config import get_settings
+from models.video_transcription import VideoTranscription
+from utils.embeddings import get_batch_embeddings
+
+settings = get_settings()
+
+# The stored summary answers this question and anything close to it
+SUMMARY_QUESTION = "Summarize this video"
+
+
+def _normalize(question: str) -> str:
+    return " ".join(question.lower().strip(" ?.!").split())
+
+
+@lru_cache(maxsize=32)
+def _question_matrix(questions: Tuple[str, ...]) -> np.ndarray:
+    embeddings = get_batch_embeddings(list(questions))
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def precomputed_answers(video: VideoTranscription) -> Dict[str, str]:
+    """Answers generated at ingest time, keyed by the question they answer."""
+    answers = dict(video.canonical_answers or {})
+    if video.summary:
+        answers[SUMMARY_QUESTION] = video.summary
+    return answers
+
+
+def match_exact(question: str, answers: Dict[str, str]) -> Optional[str]:
+    normalized = _normalize(question)
+    for canonical, answer in answers.items():
+        if _normalize(canonical) == normalized:
+            return answer
+    return None
+
+
+def match_similar(
+    query_embedding: np.ndarray, answers: Dict[str, str]
+) -> Optional[str]:
+    """Stored answer whose question is within CANONICAL_MATCH_THRESHOLD, if any."""
+    if not answers:
+        return None
+    questions = tuple(sorted(answers))
+    similarities = _question_matrix(questions) @ (
+        query_embedding / np.linalg.norm(query_embedding)
+    )
+    best = int(np.argmax(similarities))
+    if similarities[best] >= settings.CANONICAL_MATCH_THRESHOLD:
+        return answers[questions[best]]
+    return None
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+
+from config import get_settings
+from db import async_session
+from models.query_interaction import QueryInteraction
+from services.history import record_interactions
+from utils.metrics import INTERACTION_WRITES
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionWriter:
+    """Persists QueryInteractions in bulk, off the request path.
+
+    Interactions are queued and written by a background task once
+    flush_size have accumulated or flush_seconds have passed since the first
+    of them. When the queue is full, policy "write" commits the caller's
+    interactions inline, as before buffering, and "drop" discards them.
+    A failed write is retried write_attempts times in all, with exponential
+    backoff from retry_seconds, before its interactions are counted as failed.
+    History reads can lag answers by up to flush_seconds.
+    """
+
+    def __init__(
+        self,
+        flush_size: int,
+        flush_seconds: float,
+        max_queue: int,
+        policy: str = "write",
+        write_attempts: int = 3,
+        retry_seconds: float = 0.5,
+    ):
+        if policy not in ("write", "drop"):
+            raise ValueError(f"Unknown interaction queue policy: {policy}")
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.policy = policy
+        self.write_attempts = max(write_attempts, 1)
+        self.retry_seconds = retry_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        # The batch being collected, and the write of the previous one
+        self._batch: List[QueryInteraction] = []
+        self._writing: Optional[asyncio.Future] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writing is not None:
+            await self._writing
+        await self._write(self._batch)
+        self._batch = []
+        while not self._queue.empty():
+            await self._write(self._take(self.flush_size))
+
+    async def submit(self, interactions: List[QueryInteraction]) -> None:
+        """Queue interactions, applying the overflow policy to any that don't fit."""
+        for interaction in interactions:
+            # Timestamp the answer, not the flush
+            if interaction.created_at is None:
+                interaction.created_at = datetime.utcnow()
+        if self._task is None:
+            await self._write(interactions, "inline")
+            return
+        for position, interaction in enumerate(interactions):
+            try:
+                self._queue.put_nowait(interaction)
+            except asyncio.QueueFull:
+                overflow = interactions[position:]
+                if self.policy == "drop":
+                    logger.warning(
+                        f"Interaction queue full, dropping {len(overflow)} records"
+                    )
+                    INTERACTION_WRITES.labels("dropped").inc(len(overflow))
+                else:
+                    await self._write(overflow, "inline")
+                return
+
+    def _take(self, limit: int) -> List[QueryInteraction]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._batch
+            batch.append(await self._queue.get())
+            deadline = loop.time() + self.flush_seconds
+            while len(batch) < self.flush_size:
+                batch += self._take(self.flush_size - len(batch))
+                remaining = deadline - loop.time()
+                if len(batch) >= self.flush_size or remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Shielded so a shutdown mid-write still commits this batch
+            self._batch = []
+            self._writing = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._writing)
+            self._writing = None
+
+    async def _write(
+        self, interactions: List[QueryInteraction], result: str = "buffered"
+    ) -> None:
+        if not interactions:
+            return
+        for attempt in range(1, self.write_attempts + 1):
+            try:
+                async with async_session() as db:
+                    try:
+                        await record_interactions(db, interactions)
+                        await db.commit()
+                    except Exception:
+                        # Returns the records to transient, so a retry in a
+                        # new session inserts them again
+                        await db.rollback()
+                        raise
+                INTERACTION_WRITES.labels(result).inc(len(interactions))
+                return
+            except Exception as e:
+                if attempt == self.write_attempts:
+                    logger.error(
+                        f"Failed to write {len(interactions)} interactions "
+                        f"after {attempt} attempts: {e}"
+                    )
+                    INTERACTION_WRITES.labels("failed").inc(len(interactions))
+                    return
+                delay = self.retry_seconds * 2 ** (attempt - 1)
+                logger.warning(
+                    f"Failed to write {len(interactions)} interactions, "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
+
+@lru_cache()
+def get_interaction_writer() -> InteractionWriter:
+    settings = get_settings()
+    return InteractionWriter(
+        settings.INTERACTION_FLUSH_SIZE,
+        settings.INTERACTION_FLUSH_SECONDS,
+        settings.INTERACTION_QUEUE_SIZE,
+        settings.INTERACTION_QUEUE_POLICY,
+        settings.INTERACTION_WRITE_ATTEMPTS,
+        settings.INTERACTION_RETRY_SECONDS,
+    )
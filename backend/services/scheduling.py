@@ -0,0 +1,159 @@
+import logging
+from datetime import datetime, timedelta
+from enum import Enum
+from functools import lru_cache
+from typing import Optional
+
+import redis
+
+from config import get_settings, is_redis_url
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BACKLOG_KEY = "videogpt:backlog:{queue}"
+USER_JOBS_KEY = "videogpt:user_jobs:{username}"
+
+# Adds video_id to the user's running set unless the cap is already reached
+_ACQUIRE_USER_SLOT = """
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then return 1 end
+if redis.call('SCARD', KEYS[1]) >= tonumber(ARGV[2]) then return 0 end
+redis.call('SADD', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class JobClass(str, Enum):
+    CAPTIONS = "captions"
+    SHORT = "short"
+    LONG = "long"
+
+    @property
+    def queue(self) -> str:
+        return f"transcribe.{self.value}"
+
+
+# Workers consume queues in this order, so cheap jobs are always taken first
+QUEUE_ORDER = [JobClass.CAPTIONS.queue, JobClass.SHORT.queue, JobClass.LONG.queue]
+
+
+@lru_cache()
+def get_redis() -> Optional[redis.Redis]:
+    """Client for the broker, or None when the broker is not Redis.
+
+    Without Redis, backlog estimates and per-user caps are skipped.
+    """
+    if not is_redis_url(settings.REDIS_BROKER):
+        return None
+    return redis.Redis.from_url(settings.REDIS_BROKER, socket_timeout=2)
+
+
+def classify_job(duration: Optional[float], captions: Optional[bool]) -> JobClass:
+    """Route caption-only jobs and short Whisper jobs ahead of long ones."""
+    if captions:
+        return JobClass.CAPTIONS
+    if duration is not None and duration <= settings.SHORT_VIDEO_SECONDS:
+        return JobClass.SHORT
+    return JobClass.LONG
+
+
+def estimate_processing_seconds(
+    job_class: JobClass, duration: Optional[float]
+) -> float:
+    if job_class == JobClass.CAPTIONS:
+        return settings.CAPTIONS_JOB_SECONDS
+    # Without a duration, assume a video at the long-job threshold
+    duration = duration or settings.SHORT_VIDEO_SECONDS
+    return settings.CAPTIONS_JOB_SECONDS + duration * settings.WHISPER_REALTIME_FACTOR
+
+
+def enqueue_transcription(
+    task,
+    video_url: str,
+    username: Optional[str],
+    job_class: JobClass,
+    duration: Optional[float],
+) -> dict:
+    """Send a transcription task to its class queue and estimate when it finishes."""
+    estimated_seconds = estimate_processing_seconds(job_class, duration)
+    queue = job_class.queue
+
+    # Work already queued ahead of this job, shared across its queue's workers
+    backlog = 0.0
+    client = get_redis()
+    if client is not None:
+        try:
+            backlog = float(
+                client.incrbyfloat(BACKLOG_KEY.format(queue=queue), estimated_seconds)
+            )
+            backlog -= estimated_seconds
+        except redis.RedisError as e:
+            logger.warning(f"Could not update backlog for {queue}: {e}")
+
+    task.apply_async(
+        args=[video_url],
+        kwargs={
+            "username": username,
+            "job_class": job_class.value,
+            "estimated_seconds": estimated_seconds,
+        },
+        queue=queue,
+    )
+
+    workers = max(settings.QUEUE_CONCURRENCY.get(job_class.value, 1), 1)
+    eta_seconds = max(backlog, 0.0) / workers + estimated_seconds
+    return {
+        "queue": queue,
+        "estimated_seconds": round(eta_seconds),
+        "estimated_completion": (
+            datetime.utcnow() + timedelta(seconds=eta_seconds)
+        ).isoformat(),
+    }
+
+
+def finish_job(job_class: Optional[str], estimated_seconds: float) -> None:
+    """Remove a finished job's estimate from its queue backlog."""
+    client = get_redis()
+    if client is None or not job_class or not estimated_seconds:
+        return
+    key = BACKLOG_KEY.format(queue=JobClass(job_class).queue)
+    try:
+        if float(client.incrbyfloat(key, -estimated_seconds)) < 0:
+            client.set(key, 0)
+    except redis.RedisError as e:
+        logger.warning(f"Could not update backlog {key}: {e}")
+
+
+def acquire_user_slot(username: str, video_id: str) -> bool:
+    """Claim one of the user's concurrent transcription slots.
+
+    Fails open if Redis is unavailable so jobs are never stuck on it.
+    """
+    client = get_redis()
+    if client is None:
+        return True
+    try:
+        return bool(
+            client.eval(
+                _ACQUIRE_USER_SLOT,
+                1,
+                USER_JOBS_KEY.format(username=username),
+                video_id,
+                settings.MAX_JOBS_PER_USER,
+                settings.USER_SLOT_TTL_SECONDS,
+            )
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Could not check job slots for {username}: {e}")
+        return True
+
+
+def release_user_slot(username: str, video_id: str) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.srem(USER_JOBS_KEY.format(username=username), video_id)
+    except redis.RedisError as e:
+        logger.warning(f"Could not release job slot for {username}: {e}")
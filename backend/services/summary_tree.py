@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_settings
+from models.video_transcription import VideoTranscription
+from services.transcript import load_chunk_texts
+from utils.embeddings import score_chunks
+
+settings = get_settings()
+
+Summarizer = Callable[[List[str]], Awaitable[List[str]]]
+
+
+@dataclass
+class ContextSelection:
+    level: str  # "chunk", "section" or "video"
+    texts: List[str]
+    refs: List[dict]
+
+
+def group_sections(chunk_count: int, size: int) -> List[Tuple[int, int]]:
+    """[start, end) chunk ranges of consecutive sections."""
+    return [
+        (start, min(start + size, chunk_count)) for start in range(0, chunk_count, size)
+    ]
+
+
+async def summarize_in_batches(
+    passages: List[str], summarize: Summarizer, max_chars: int
+) -> List[str]:
+    """Summarize passages with as few calls as fit within max_chars each."""
+    summaries: List[str] = []
+    batch: List[str] = []
+    batch_chars = 0
+    for passage in passages:
+        if batch and batch_chars + len(passage) > max_chars:
+            summaries += await summarize(batch)
+            batch, batch_chars = [], 0
+        batch.append(passage)
+        batch_chars += len(passage)
+    if batch:
+        summaries += await summarize(batch)
+    return summaries
+
+
+async def build_summary_tree(
+    chunks: List[str], summarize: Summarizer
+) -> Tuple[List[dict], str]:
+    """Summarize chunks into sections, then reduce until one prompt holds them.
+
+    Returns the section entries to store and the top-level text, from which
+    the video summary is generated.
+    """
+    size = settings.SUMMARY_SECTION_CHUNKS
+    max_chars = settings.SUMMARY_PROMPT_CHARS
+    ranges = group_sections(len(chunks), size)
+    section_summaries = await summarize_in_batches(
+        ["\n".join(chunks[start:end]) for start, end in ranges], summarize, max_chars
+    )
+    sections = [
+        {"start_chunk": start, "end_chunk": end, "summary": summary}
+        for (start, end), summary in zip(ranges, section_summaries)
+    ]
+
+    # Higher levels only bound the final prompt; retrieval uses the sections.
+    # Every level merges at least two entries, so the reduction terminates
+    # even with SUMMARY_SECTION_CHUNKS=1, and it stops early once summaries
+    # no longer get shorter
+    fan_in = max(size, 2)
+    level = section_summaries
+    level_chars = sum(len(text) for text in level)
+    while len(level) > 1 and level_chars > max_chars:
+        groups = [
+            "\n\n".join(level[i : i + fan_in]) for i in range(0, len(level), fan_in)
+        ]
+        level = await summarize_in_batches(groups, summarize, max_chars)
+        reduced_chars = sum(len(text) for text in level)
+        if reduced_chars >= level_chars:
+            break
+        level_chars = reduced_chars
+    return sections, "\n\n".join(level)
+
+
+async def select_context(
+    db: AsyncSession,
+    video: VideoTranscription,
+    query_embedding: np.ndarray,
+    embeddings: List[np.ndarray],
+    top_k: int = 3,
+) -> ContextSelection:
+    """Pick chunks, section summaries or the video summary for a question.
+
+    Summaries are used only when they match the question better than any
+    chunk by SUMMARY_LEVEL_MARGIN, so specific questions keep exact text.
+    Chunk text is only loaded if chunks are picked.
+    """
+    ranked = score_chunks(query_embedding, embeddings, top_k)
+
+    async def chunk_selection() -> ContextSelection:
+        texts = await load_chunk_texts(
+            db, video.video_id, [index for index, _ in ranked]
+        )
+        return ContextSelection(
+            "chunk",
+            [texts.get(index, "") for index, _ in ranked],
+            [{"chunk": index, "score": round(score, 6)} for index, score in ranked],
+        )
+
+    if not video.section_summaries or not video.section_embeddings:
+        return await chunk_selection()
+
+    best_chunk = ranked[0][1] if ranked else -1.0
+    sections = score_chunks(
+        query_embedding, [np.array(emb) for emb in video.section_embeddings], top_k
+    )
+    section_texts = [video.section_summaries[index]["summary"] for index, _ in sections]
+    section_refs = [
+        {"section": index, "score": round(score, 6)} for index, score in sections
+    ]
+
+    summary_score = _similarity(query_embedding, video.summary_embedding)
+    if (
+        summary_score is not None
+        and summary_score >= sections[0][1]
+        and summary_score >= best_chunk + settings.SUMMARY_LEVEL_MARGIN
+    ):
+        return ContextSelection(
+            "video",
+            [video.summary] + section_texts,
+            [{"summary": 0, "score": round(summary_score, 6)}] + section_refs,
+        )
+    if sections[0][1] >= best_chunk + settings.SUMMARY_LEVEL_MARGIN:
+        return ContextSelection("section", section_texts, section_refs)
+    return await chunk_selection()
+
+
+def _similarity(
+    query_embedding: np.ndarray, embedding: Optional[List[float]]
+) -> Optional[float]:
+    if not embedding:
+        return None
+    vector = np.array(embedding)
+    return float(
+        np.dot(query_embedding, vector)
+        / (np.linalg.norm(query_embedding) * np.linalg.norm(vector))
+    )
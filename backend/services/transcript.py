@@ -1,6 +1,24 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import (
+    JSON,
+    Integer,
+    cast,
+    func,
+    literal,
+    literal_column,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from models.video_transcription import VideoTranscription
+from db import async_session, reads_replica
+from models.video_transcription import TranscriptionStatus, VideoTranscription
+from utils.chunking import Chunk, slice_chunks
+from utils.transcribers import Segment
 
 
 def get_transcript_by_video_id(db: Session, video_id: str):
@@ -9,3 +27,286 @@ def get_transcript_by_video_id(db: Session, video_id: str):
         .filter(VideoTranscription.video_id == video_id)
         .first()
     )
+
+
+def _json_array(column):
+    """A JSON array column as JSONB, with JSON null read as SQL NULL.
+
+    Rows cleared before NullableJSON may hold JSON null instead of NULL.
+    """
+    return func.nullif(cast(column, JSONB), literal_column("'null'::jsonb"))
+
+
+def _append_json(column, values: list):
+    """Append to a JSON array column in SQL, without reading the column back."""
+    existing = func.coalesce(_json_array(column), literal_column("'[]'::jsonb"))
+    return cast(existing.op("||", return_type=JSONB)(literal(values, JSONB)), JSON)
+
+
+async def _update_transcription(video_id: str, values: dict) -> bool:
+    async with async_session() as db:
+        async with db.begin():
+            result = await db.execute(
+                update(VideoTranscription)
+                .where(VideoTranscription.video_id == video_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+    return result.rowcount > 0
+
+
+async def set_transcription_status(video_id: str, status: TranscriptionStatus) -> bool:
+    return await _update_transcription(video_id, {"status": status})
+
+
+@dataclass
+class Checkpoint:
+    """What an earlier attempt at a video left behind."""
+
+    title: Optional[str]
+    thumbnail_url: Optional[str]
+    duration_seconds: Optional[float]
+    transcript_source: Optional[str]
+    # [start, end, text] of every Whisper segment behind the saved chunks
+    segments: List[list]
+    chunk_count: int
+
+    @property
+    def has_metadata(self) -> bool:
+        return self.title is not None and self.duration_seconds is not None
+
+    @property
+    def resumable(self) -> bool:
+        return (
+            self.transcript_source == "whisper"
+            and bool(self.segments)
+            and self.chunk_count > 0
+        )
+
+
+async def load_checkpoint(video_id: str) -> Optional[Checkpoint]:
+    async with async_session() as db:
+        result = await db.execute(
+            select(
+                VideoTranscription.title,
+                VideoTranscription.thumbnail_url,
+                VideoTranscription.duration_seconds,
+                VideoTranscription.transcript_source,
+                VideoTranscription.whisper_segments,
+                # Rows with chunk text predate checkpoints, so never resume them
+                func.coalesce(
+                    func.jsonb_array_length(
+                        _json_array(VideoTranscription.chunk_spans)
+                    ),
+                    0,
+                ),
+            ).where(VideoTranscription.video_id == video_id)
+        )
+        row = result.first()
+    if row is None:
+        return None
+    title, thumbnail_url, duration, source, segments, chunk_count = row
+    return Checkpoint(
+        title, thumbnail_url, duration, source, segments or [], chunk_count
+    )
+
+
+async def load_chunks(video_id: str) -> Optional[List[str]]:
+    """Every chunk's text, for work that needs the whole transcript."""
+    async with async_session() as db:
+        result = await db.execute(
+            select(
+                VideoTranscription.transcript,
+                VideoTranscription.chunk_spans,
+                VideoTranscription.chunks,
+            ).where(VideoTranscription.video_id == video_id)
+        )
+        row = result.first()
+    if row is None:
+        return None
+    return row.chunks or slice_chunks(row.transcript, row.chunk_spans)
+
+
+def _chunk_text_at(index: int):
+    """SQL for one chunk's text, cut from the transcript or read from chunks."""
+    span = VideoTranscription.chunk_spans
+    start = cast(func.json_extract_path_text(span, str(index), "0"), Integer)
+    end = cast(func.json_extract_path_text(span, str(index), "1"), Integer)
+    return func.coalesce(
+        func.json_extract_path_text(VideoTranscription.chunks, str(index)),
+        # substr counts characters from 1, like Python offsets from 0
+        func.substr(VideoTranscription.transcript, start + 1, end - start),
+    )
+
+
+async def _select_chunk_texts(
+    db: AsyncSession, video_id: str, indices: List[int]
+) -> Dict[int, str]:
+    result = await db.execute(
+        select(*[_chunk_text_at(index) for index in indices]).where(
+            VideoTranscription.video_id == video_id
+        )
+    )
+    row = result.first()
+    if row is None:
+        return {}
+    return {index: text for index, text in zip(indices, row) if text is not None}
+
+
+async def load_chunk_texts(
+    db: AsyncSession, video_id: str, indices: Sequence[int]
+) -> Dict[int, str]:
+    """Text of just the given chunks, materialized in the database.
+
+    Neither the transcript nor the chunk list is sent to the application,
+    so this costs the same for a 10-hour video as for a short one. Chunks
+    the replica does not have yet are read from the primary.
+    """
+    indices = sorted(set(indices))
+    if not indices:
+        return {}
+    texts = await _select_chunk_texts(db, video_id, indices)
+    if len(texts) < len(indices) and reads_replica(db):
+        async with async_session() as primary:
+            texts = await _select_chunk_texts(primary, video_id, indices)
+    return texts
+
+
+async def load_chunk_range(
+    db: AsyncSession, video_id: str, spans: List[list], indices: range
+) -> List[str]:
+    """Text of consecutive chunks, cut from one substring of the transcript."""
+    if not indices:
+        return []
+    first = spans[indices.start][0]
+    last = spans[indices.stop - 1][1]
+    text = await db.scalar(
+        select(
+            func.substr(VideoTranscription.transcript, first + 1, last - first)
+        ).where(VideoTranscription.video_id == video_id)
+    )
+    return [
+        (text or "")[spans[index][0] - first : spans[index][1] - first]
+        for index in indices
+    ]
+
+
+async def save_insights(
+    video_id: str,
+    summary: Optional[str],
+    summary_embedding: Optional[List[float]],
+    sections: List[dict],
+    section_embeddings: List[List[float]],
+    canonical_answers: Dict[str, str],
+) -> bool:
+    return await _update_transcription(
+        video_id,
+        {
+            "summary": summary,
+            "summary_embedding": summary_embedding,
+            "section_summaries": sections,
+            "section_embeddings": section_embeddings,
+            "canonical_answers": canonical_answers,
+        },
+    )
+
+
+class TranscriptionWriter:
+    """Writes a worker's results for one video with targeted UPDATEs.
+
+    Metadata is held back and sent with the next write, and the first write
+    replaces anything left from an earlier attempt instead of appending to it,
+    unless the writer is resuming that attempt.
+    """
+
+    def __init__(self, video_id: str, resume: bool = False):
+        self.video_id = video_id
+        self._pending: dict = {}
+        self._replace = not resume
+
+    @property
+    def resuming(self) -> bool:
+        return not self._replace
+
+    def restart(self) -> None:
+        """Discard the earlier attempt's results on the next write."""
+        self._replace = True
+
+    def set_metadata(
+        self, title: Optional[str], thumbnail: Optional[str], duration: Optional[float]
+    ) -> None:
+        self._pending.update(
+            title=title, thumbnail_url=thumbnail, duration_seconds=duration
+        )
+
+    def set_source(self, source: str) -> None:
+        self._pending["transcript_source"] = source
+
+    async def save(
+        self,
+        transcript: Optional[str] = None,
+        chunks: Sequence[Chunk] = (),
+        embeddings: Sequence[List[float]] = (),
+        transcribed_seconds: Optional[float] = None,
+        completed: bool = False,
+        segments: Sequence[Segment] = (),
+    ) -> bool:
+        """Publish pending metadata and any new chunks in a single statement.
+
+        Chunks are stored as offsets into transcript, so every save with
+        chunks must also pass the transcript they were cut from.
+
+        segments are the Whisper segments transcribed since the last save,
+        kept as a checkpoint until the transcription completes.
+        """
+        values = dict(self._pending)
+        spans = [[chunk.start_offset, chunk.end_offset] for chunk in chunks]
+        times = [[chunk.start_time, chunk.end_time] for chunk in chunks]
+        embeddings = list(embeddings)
+        checkpoint = [
+            [segment.start, segment.end, segment.text] for segment in segments
+        ]
+        if self._replace:
+            # Earlier references to chunk ordinals no longer hold
+            next_version = func.coalesce(VideoTranscription.transcript_version, 0) + 1
+            values.update(
+                transcript=transcript,
+                chunks=None,
+                chunk_spans=spans or None,
+                transcript_version=next_version,
+                embeddings=embeddings or None,
+                chunk_times=times or None,
+                transcribed_seconds=transcribed_seconds,
+                whisper_segments=checkpoint or None,
+                summary=None,
+                summary_embedding=None,
+                section_summaries=None,
+                section_embeddings=None,
+                canonical_answers=None,
+            )
+        else:
+            if transcript is not None:
+                values["transcript"] = transcript
+            if spans:
+                values.update(
+                    chunk_spans=_append_json(VideoTranscription.chunk_spans, spans),
+                    embeddings=_append_json(VideoTranscription.embeddings, embeddings),
+                    chunk_times=_append_json(VideoTranscription.chunk_times, times),
+                )
+            if checkpoint:
+                values["whisper_segments"] = _append_json(
+                    VideoTranscription.whisper_segments, checkpoint
+                )
+            if transcribed_seconds is not None:
+                values["transcribed_seconds"] = transcribed_seconds
+        if completed:
+            values["status"] = TranscriptionStatus.COMPLETED
+            # The results are complete, so nothing will resume from these
+            values["whisper_segments"] = None
+        if not values:
+            return True
+
+        saved = await _update_transcription(self.video_id, values)
+        self._pending.clear()
+        self._replace = False
+        return saved
@@ -0,0 +1,110 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from youtube_transcript_api import (
+    CouldNotRetrieveTranscript,
+    NoTranscriptFound,
+    YouTubeTranscriptApi,
+)
+from yt_dlp import YoutubeDL
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class CaptionTrack:
+    transcript: Any  # youtube_transcript_api Transcript, ready to fetch
+    kind: str  # "manual", "generated" or "translated"
+    language: str
+
+    @property
+    def source(self) -> str:
+        """Recorded on the transcription, e.g. "captions:generated:de"."""
+        return f"captions:{self.kind}:{self.language}"
+
+
+def extract_metadata(video_url: str) -> dict:
+    """Fetch title, thumbnail and duration without downloading the video.
+
+    Missing values are None if YouTube cannot be reached.
+    """
+    try:
+        with YoutubeDL({"quiet": True}) as ydl:
+            info = ydl.extract_info(video_url, download=False)
+        return {
+            "title": info.get("title"),
+            "thumbnail": info.get("thumbnail"),
+            "duration": info.get("duration"),
+        }
+    except Exception as e:
+        logger.warning(f"Failed to fetch video metadata: {e}")
+        return {"title": None, "thumbnail": None, "duration": None}
+
+
+def _kind(transcript) -> str:
+    return "generated" if transcript.is_generated else "manual"
+
+
+def select_caption_track(
+    video_id: str,
+    languages: Optional[List[str]] = None,
+    translate_to: Optional[str] = None,
+    accept_any: Optional[bool] = None,
+) -> Optional[CaptionTrack]:
+    """Pick the best caption track, or None if Whisper is needed.
+
+    Preference: manual then auto-generated tracks in CAPTION_LANGUAGES order,
+    then any track YouTube can translate to CAPTION_TRANSLATE_TO, then any
+    track as-is if CAPTION_ACCEPT_ANY_LANGUAGE is set. Raises
+    CouldNotRetrieveTranscript if captions are disabled for the video.
+    """
+    languages = languages or settings.CAPTION_LANGUAGES
+    if translate_to is None:
+        translate_to = settings.CAPTION_TRANSLATE_TO
+    if accept_any is None:
+        accept_any = settings.CAPTION_ACCEPT_ANY_LANGUAGE
+
+    transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+    for find in (
+        transcripts.find_manually_created_transcript,
+        transcripts.find_generated_transcript,
+    ):
+        try:
+            transcript = find(languages)
+            return CaptionTrack(transcript, _kind(transcript), transcript.language_code)
+        except NoTranscriptFound:
+            continue
+
+    # Manual tracks translate better than auto-generated ones
+    candidates = sorted(transcripts, key=lambda transcript: transcript.is_generated)
+    if translate_to:
+        for transcript in candidates:
+            targets = {
+                language["language_code"]
+                for language in transcript.translation_languages
+            }
+            if transcript.is_translatable and translate_to in targets:
+                return CaptionTrack(
+                    transcript.translate(translate_to),
+                    "translated",
+                    f"{transcript.language_code}->{translate_to}",
+                )
+    if accept_any and candidates:
+        transcript = candidates[0]
+        return CaptionTrack(transcript, _kind(transcript), transcript.language_code)
+    return None
+
+
+def has_captions(video_id: str) -> Optional[bool]:
+    """Whether a usable caption track exists, or None if it could not be checked."""
+    try:
+        return select_caption_track(video_id) is not None
+    except CouldNotRetrieveTranscript:
+        return False
+    except Exception as e:
+        logger.warning(f"Failed to list captions for {video_id}: {e}")
+        return None
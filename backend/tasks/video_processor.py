@@ -1,76 +1,164 @@
+import asyncio
 import logging
 import os
 import subprocess
-import tempfile
-from contextlib import contextmanager
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
-import whisper
-from asgiref.sync import async_to_sync
 from celery import Celery
-from sentence_transformers import SentenceTransformer
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from youtube_transcript_api import CouldNotRetrieveTranscript, YouTubeTranscriptApi
-from yt_dlp import YoutubeDL
+from celery.signals import (
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_ready,
+    worker_shutdown,
+)
+from prometheus_client import multiprocess, start_http_server
+from youtube_transcript_api import CouldNotRetrieveTranscript
 
+import db
 from config import get_settings
-from db import async_session
-from models.video_transcription import TranscriptionStatus, VideoTranscription
-from utils.embeddings import split_transcript_into_chunks
+from models.video_transcription import TranscriptionStatus
+from services.scheduling import (
+    JobClass,
+    acquire_user_slot,
+    finish_job,
+    release_user_slot,
+)
+from services.summary_tree import build_summary_tree
+from services.transcript import (
+    Checkpoint,
+    TranscriptionWriter,
+    load_checkpoint,
+    load_chunks,
+    save_insights,
+    set_transcription_status,
+)
+from services.youtube import extract_metadata, select_caption_track
+from utils.chunking import Chunk, IncrementalChunker
+from utils.cleanup import get_scratch_cleaner
+from utils.embedding_engine import close_engine, get_engine
+from utils.metrics import (
+    RESUMED_TRANSCRIPTIONS,
+    TRANSCRIPT_SOURCES,
+    TRANSCRIPTION_STAGE_SECONDS,
+    WHISPER_RUNS_AVOIDED,
+    get_registry,
+    observe_stage,
+)
+from utils.profiling import ActiveProfile, finish_profile, get_config, start_profile
+from utils.transcribers import Segment, load_transcriber
+from utils.video_ids import extract_video_id
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 16 kHz mono 16-bit PCM, plus a generous allowance for the compressed download
+WAV_BYTES_PER_SECOND = 32000
+DOWNLOAD_BYTES_PER_SECOND = 24000
+DEFAULT_AUDIO_BYTES = 512 * 1024 * 1024
+
 # Initialize Celery
 celery_app = Celery(
     "video_processor", broker=settings.REDIS_BROKER, backend=settings.REDIS_BACKEND
 )
+celery_app.conf.update(
+    task_default_queue=JobClass.SHORT.queue,
+    # Take one job at a time so long jobs are not prefetched behind short ones
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    # Requeue jobs whose worker process died; they resume from their checkpoint
+    task_reject_on_worker_lost=True,
+    # Poll queues in the order given to -Q instead of round-robin
+    broker_transport_options={"queue_order_strategy": "priority"},
+)
+
+
+@worker_ready.connect
+def start_metrics_server(**kwargs):
+    """Expose worker metrics; set PROMETHEUS_MULTIPROC_DIR for prefork pools."""
+    start_http_server(settings.METRICS_WORKER_PORT, registry=get_registry())
+
+
+# One event loop per worker process, shared by every task it runs
+_loop: Optional[asyncio.AbstractEventLoop] = None
 
-# Initialize the model (this will download it the first time)
-embedding_model = SentenceTransformer(
-    "all-MiniLM-L6-v2"
-)  # Small, fast model with good performance
 
+def run_async(coroutine):
+    """Run a coroutine on this process's event loop, creating it on first use."""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coroutine)
 
-@contextmanager
-def temporary_file(suffix=None):
-    """Context manager for handling temporary files."""
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    # The engine was created before the pool forked; its connections belong
+    # to the parent process and to a loop this process will never run
+    db.reset_engine_after_fork()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(pid=None, **kwargs):
+    if _loop is not None and not _loop.is_closed():
+        run_async(db.engine.dispose())
+        _loop.close()
+    close_engine()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+@worker_shutdown.connect
+def shutdown_worker(**kwargs):
+    # With -P solo, tasks and their embedding pool run in the main process
+    close_engine()
+
+
+# Profiles of the tasks running in this process, by task id
+_profiles: Dict[str, ActiveProfile] = {}
+
+
+@task_prerun.connect
+def start_task_profile(task_id=None, task=None, **kwargs):
     try:
-        yield temp_file.name
-    finally:
-        try:
-            os.unlink(temp_file.name)
-        except Exception as e:
-            logger.error(f"Failed to delete temporary file {temp_file.name}: {e}")
-
-
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
-    """Split text into overlapping chunks."""
-    chunks = []
-    start = 0
-    text_length = len(text)
-
-    while start < text_length:
-        end = min(start + chunk_size, text_length)
-        # If this is not the first chunk, include the overlap
-        if start > 0:
-            chunk_start = max(start - overlap, 0)
-        else:
-            chunk_start = start
-        chunks.append(text[chunk_start:end])
-        start = end - overlap if end < text_length else text_length
+        profile = start_profile(get_config())
+    except Exception as e:
+        logger.warning(f"Failed to start profiling task {task_id}: {e}")
+        return
+    if profile is not None:
+        _profiles[task_id] = profile
+
+
+@task_postrun.connect
+def finish_task_profile(task_id=None, task=None, **kwargs):
+    profile = _profiles.pop(task_id, None)
+    if profile is not None:
+        finish_profile(profile, "task", task.name)
 
-    return chunks
+
+def get_transcriber():
+    return load_transcriber(
+        settings.TRANSCRIBER_BACKEND,
+        settings.WHISPER_MODEL_SIZE,
+        settings.TRANSCRIBER_THREADS,
+        settings.TRANSCRIBER_BEAM_SIZE,
+    )
+
+
+def estimate_audio_bytes(duration: Optional[float]) -> int:
+    """Scratch space needed for the downloaded audio plus its WAV conversion."""
+    if not duration:
+        return DEFAULT_AUDIO_BYTES
+    return int(duration * (WAV_BYTES_PER_SECOND + DOWNLOAD_BYTES_PER_SECOND))
 
 
 def get_embeddings(texts: List[str]) -> List[List[float]]:
-    """Get embeddings using sentence-transformers."""
+    """Get embeddings using the ingestion embedding engine."""
     try:
-        # Generate embeddings for all texts at once
-        embeddings = embedding_model.encode(texts)
+        embeddings = get_engine().embed(texts)
         # Convert numpy arrays to lists for JSON serialization
         return embeddings.tolist()
     except Exception as e:
@@ -78,105 +166,285 @@ def get_embeddings(texts: List[str]) -> List[List[float]]:
         raise
 
 
-@celery_app.task
-def fetch_or_generate_transcript_with_whisper(video_url: str):
+async def embed_and_save(
+    writer: TranscriptionWriter,
+    chunker: IncrementalChunker,
+    chunks: List[Chunk],
+    transcribed_seconds: Optional[float],
+    completed: bool = False,
+    segments: Sequence[Segment] = (),
+):
+    """Append newly embedded chunks so questions can use them right away.
+
+    Long inputs are embedded and appended EMBEDDING_WINDOW_CHUNKS at a time,
+    so memory stays bounded; the last window carries the rest of the update.
+    """
+    window = settings.EMBEDDING_WINDOW_CHUNKS
+    for start in range(0, len(chunks), window) or [0]:
+        part = chunks[start : start + window]
+        with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "embed"):
+            embeddings = get_embeddings([chunk.text for chunk in part]) if part else []
+        with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "db_write"):
+            if start + window < len(chunks):
+                await writer.save(chunker.text, part, embeddings)
+            else:
+                await writer.save(
+                    chunker.text,
+                    part,
+                    embeddings,
+                    transcribed_seconds,
+                    completed,
+                    segments,
+                )
+
+
+def resume_chunker(
+    video_id: str, checkpoint: Checkpoint
+) -> Tuple[IncrementalChunker, float]:
+    """Rebuild the chunker from checkpointed segments.
+
+    Returns the chunker, positioned after the chunks already saved, and the
+    audio offset to continue from. Raises ValueError if the replay does not
+    reproduce the saved chunks.
+    """
+    chunker = IncrementalChunker()
+    for start, end, text in checkpoint.segments:
+        chunker.add(text, start, end)
+    replayed = chunker.take_ready()
+    if len(replayed) != checkpoint.chunk_count:
+        raise ValueError(
+            f"Checkpoint for {video_id} replays {len(replayed)} chunks, "
+            f"but {checkpoint.chunk_count} are saved"
+        )
+    return chunker, checkpoint.segments[-1][1]
+
+
+async def transcribe_with_whisper(
+    video_id: str,
+    video_url: str,
+    writer: TranscriptionWriter,
+    duration: Optional[float],
+    checkpoint: Optional[Checkpoint],
+):
+    """Transcribe the audio, publishing the transcript in pieces.
+
+    Each partial save also checkpoints the segments behind it, and a failed
+    job keeps its audio, so a retry only transcribes what is left.
+    """
+    chunker, offset = IncrementalChunker(), 0.0
+    if writer.resuming:
+        try:
+            chunker, offset = resume_chunker(video_id, checkpoint)
+            RESUMED_TRANSCRIPTIONS.labels("resumed").inc()
+            logger.info(
+                f"Resuming video {video_id} at {offset:.0f}s "
+                f"after {checkpoint.chunk_count} saved chunks"
+            )
+        except ValueError as e:
+            logger.warning(f"{e}; starting over")
+            RESUMED_TRANSCRIPTIONS.labels("restarted").inc()
+            writer.restart()
+    if not writer.resuming:
+        # Publish metadata and drop results of any earlier attempt before
+        # the download, which can take minutes
+        writer.set_source("whisper")
+        await writer.save()
+
+    scratch = get_scratch_cleaner()
+    with scratch.job_dir(video_id, keep_on_error=True) as job_dir:
+        audio_path = os.path.join(job_dir, "audio.wav")
+        if os.path.exists(audio_path):
+            logger.info(f"Reusing audio downloaded for video {video_id}")
+        else:
+            # Reserved for this job, so concurrent downloads cannot overcommit
+            await asyncio.to_thread(
+                scratch.ensure_capacity,
+                estimate_audio_bytes(duration),
+                settings.SCRATCH_WAIT_SECONDS,
+                job_path=job_dir,
+            )
+            await download_audio(video_url, audio_path)
+            if not os.path.exists(audio_path):
+                raise Exception(f"Audio file not found at {audio_path}")
+
+        remaining_path = audio_path
+        if offset:
+            remaining_path = os.path.join(job_dir, "remaining.wav")
+            await trim_audio(audio_path, offset, remaining_path)
+
+        transcribed_seconds = last_saved_seconds = offset
+        segments: List[Segment] = []
+        with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "whisper"):
+            for segment in get_transcriber().transcribe(remaining_path):
+                # Times in the trimmed audio are relative to the offset
+                segment = Segment(
+                    segment.start + offset, segment.end + offset, segment.text
+                )
+                chunker.add(segment.text, segment.start, segment.end)
+                segments.append(segment)
+                transcribed_seconds = segment.end
+                if (
+                    transcribed_seconds - last_saved_seconds
+                    < settings.PARTIAL_FLUSH_SECONDS
+                ):
+                    continue
+                chunks = chunker.take_ready()
+                if chunks:
+                    await embed_and_save(
+                        writer, chunker, chunks, transcribed_seconds, segments=segments
+                    )
+                    segments = []
+                    last_saved_seconds = transcribed_seconds
+
+        await embed_and_save(
+            writer,
+            chunker,
+            chunker.flush(),
+            duration or transcribed_seconds,
+            completed=True,
+        )
+
+
+@celery_app.task(bind=True)
+def fetch_or_generate_transcript_with_whisper(
+    self,
+    video_url: str,
+    username: Optional[str] = None,
+    job_class: Optional[str] = None,
+    estimated_seconds: float = 0.0,
+):
+    video_id = extract_video_id(video_url)
+    if video_id is None:
+        raise ValueError(f"Not a YouTube video URL: {video_url}")
+
+    # Cap how many Whisper jobs one user can occupy workers with
+    needs_slot = bool(username) and job_class != JobClass.CAPTIONS.value
+    if needs_slot and not acquire_user_slot(username, video_id):
+        logger.info(f"{username} is at the job limit, deferring video {video_id}")
+        raise self.retry(countdown=settings.USER_JOB_RETRY_SECONDS, max_retries=None)
+
     try:
         logger.info(f"Starting transcription for video: {video_url}")
-        video_id = video_url.split("v=")[1]
 
-        @async_to_sync
         async def process_transcription():
-            transcript = None
-
-            # First get video metadata
-            try:
-                with YoutubeDL() as ydl:
-                    info = ydl.extract_info(video_url, download=False)
-                    title = info.get("title")
-                    thumbnail = info.get("thumbnail")
-                    logger.info(f"Successfully fetched metadata for video: {title}")
-            except Exception as e:
-                logger.warning(f"Failed to fetch video metadata: {e}")
-                title = None
-                thumbnail = None
-            # breakpoint()
-            # First try to fetch from YouTube's API
-            try:
-                transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                transcript = " ".join(
-                    [
-                        entry["text"]
-                        for entry in transcript_list.find_transcript(["en"]).fetch()
-                    ]
-                )
-                logger.info("Successfully fetched transcript from YouTube API")
-            except CouldNotRetrieveTranscript as e:
-                logger.warning(f"Failed to fetch YouTube transcript: {e}")
-
-                # If YouTube transcript fails, use Whisper
+            # Pick up whatever an earlier attempt at this video completed
+            checkpoint = await load_checkpoint(video_id)
+            if checkpoint and checkpoint.has_metadata:
+                metadata = {
+                    "title": checkpoint.title,
+                    "thumbnail": checkpoint.thumbnail_url,
+                    "duration": checkpoint.duration_seconds,
+                }
+            else:
+                # Metadata is written along with the results
+                with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "metadata"):
+                    metadata = extract_metadata(video_url)
+            duration = metadata["duration"]
+            resume = bool(checkpoint and checkpoint.resumable)
+            writer = TranscriptionWriter(video_id, resume=resume)
+            writer.set_metadata(metadata["title"], metadata["thumbnail"], duration)
+
+            # A Whisper run in progress is resumed rather than retried on captions
+            track = None
+            if not resume:
+                # First try any usable caption track from YouTube's API
+                try:
+                    with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "captions"):
+                        track = select_caption_track(video_id)
+                        entries = track.transcript.fetch() if track else []
+                except CouldNotRetrieveTranscript as e:
+                    logger.warning(f"Failed to fetch YouTube transcript: {e}")
+                    track = None
+
+            if track is not None:
+                chunker = IncrementalChunker()
+                for index, entry in enumerate(entries):
+                    chunker.add(
+                        entry["text"] if index == 0 else " " + entry["text"],
+                        entry["start"],
+                        entry["start"] + entry["duration"],
+                    )
+                logger.info(f"Successfully fetched {track.source} transcript")
+                with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "chunk"):
+                    chunks = chunker.flush()
+                writer.set_source(track.source)
+                await embed_and_save(writer, chunker, chunks, duration, completed=True)
+                TRANSCRIPT_SOURCES.labels(track.kind).inc()
+                # Only English tracks were used before; anything else ran Whisper
+                if track.kind == "translated" or track.language != "en":
+                    WHISPER_RUNS_AVOIDED.labels(track.kind).inc()
+            else:
                 try:
-                    with temporary_file(suffix=".wav") as audio_path:
-                        await download_audio(video_url, audio_path)
-                        if os.path.exists(audio_path):
-                            transcript = await transcribe_with_whisper(audio_path)
-                            logger.info(
-                                "Successfully generated transcript with Whisper"
-                            )
-                        else:
-                            raise Exception(f"Audio file not found at {audio_path}")
+                    await transcribe_with_whisper(
+                        video_id, video_url, writer, duration, checkpoint
+                    )
+                    TRANSCRIPT_SOURCES.labels("whisper").inc()
+                    logger.info("Successfully generated transcript with Whisper")
                 except Exception as e:
                     logger.error(f"Failed to generate transcript with Whisper: {e}")
                     raise
 
-            if transcript:
-                # Process transcript into chunks and get embeddings
-                chunks = chunk_text(transcript)
-                embeddings = get_embeddings(chunks)
-
-                # Update database with transcript, chunks, and embeddings
-                async with async_session() as db:
-                    async with db.begin():
-                        result = await db.execute(
-                            select(VideoTranscription).where(
-                                VideoTranscription.video_id == video_id
-                            )
-                        )
-                        transcription = result.scalar_one_or_none()
-
-                        if transcription:
-                            transcription.transcript = transcript
-                            transcription.chunks = chunks
-                            transcription.embeddings = embeddings
-                            transcription.title = title
-                            transcription.thumbnail_url = thumbnail
-                            transcription.status = TranscriptionStatus.COMPLETED
-                            await db.commit()
-                            logger.info(
-                                f"Successfully saved transcript and metadata for video {video_id}"
-                            )
-
+            logger.info(
+                f"Successfully saved transcript and metadata for video {video_id}"
+            )
+            if settings.INGEST_INSIGHTS_ENABLED:
+                generate_video_insights.apply_async(
+                    args=[video_id], queue=JobClass.CAPTIONS.queue
+                )
             return {"status": "success", "video_id": video_id}
 
-        return process_transcription()
+        return run_async(process_transcription())
     except Exception as e:
         logger.error(f"Error in transcription task: {e}")
+        run_async(set_transcription_status(video_id, TranscriptionStatus.ERROR))
+        raise
+    finally:
+        if needs_slot:
+            release_user_slot(username, video_id)
+        finish_job(job_class, estimated_seconds)
 
-        @async_to_sync
-        async def update_error_status():
-            async with async_session() as db:
-                async with db.begin():
-                    result = await db.execute(
-                        select(VideoTranscription).where(
-                            VideoTranscription.video_id == video_id
-                        )
-                    )
-                    transcription = result.scalar_one_or_none()
-                    if transcription:
-                        transcription.status = TranscriptionStatus.ERROR
-                        await db.commit()
 
-        update_error_status()
-        raise
+@celery_app.task
+def generate_video_insights(video_id: str):
+    """Build the summary tree and answer CANONICAL_QUESTIONS for a finished video.
+
+    Sections summarize runs of chunks, and the video summary and canonical
+    answers are generated from the sections, so no prompt grows with the video.
+    """
+    # Imported here so workers without a Gemini key can still transcribe
+    from services.gemini_client import get_gemini_insights, get_gemini_summaries
+
+    async def generate():
+        chunks = await load_chunks(video_id)
+        if not chunks:
+            logger.warning(f"No transcript to summarize for video {video_id}")
+            return
+        with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "insights"):
+            sections, top_level = await build_summary_tree(chunks, get_gemini_summaries)
+            summary, answers = await get_gemini_insights(
+                top_level, settings.CANONICAL_QUESTIONS
+            )
+        with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "embed"):
+            embeddings = get_embeddings(
+                [section["summary"] for section in sections] + [summary]
+            )
+        await save_insights(
+            video_id,
+            summary,
+            embeddings[-1],
+            sections,
+            embeddings[:-1],
+            dict(zip(settings.CANONICAL_QUESTIONS, answers)),
+        )
+        logger.info(
+            f"Saved summary tree of {len(sections)} sections for video {video_id}"
+        )
+
+    try:
+        run_async(generate())
+    except Exception as e:
+        # Questions are still answered through retrieval without these
+        logger.error(f"Failed to generate insights for video {video_id}: {e}")
 
 
 # Helper functions
@@ -194,10 +462,11 @@ async def download_audio(video_url: str, output_path: str):
             video_url,
         ]
 
-        process = subprocess.Popen(
-            download_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        stdout, stderr = process.communicate()
+        with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "download"):
+            process = subprocess.Popen(
+                download_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            stdout, stderr = process.communicate()
 
         if process.returncode != 0:
             raise Exception(f"yt-dlp download failed: {stderr.decode()}")
@@ -212,7 +481,9 @@ async def download_audio(video_url: str, output_path: str):
         if not downloaded_file:
             raise Exception("Could not find downloaded audio file")
 
-        # Convert to WAV using ffmpeg
+        # Convert to WAV using ffmpeg, renamed into place once complete so a
+        # retry never reuses a partial file
+        partial_path = output_path + ".partial.wav"
         convert_command = [
             "ffmpeg",
             "-i",
@@ -224,16 +495,18 @@ async def download_audio(video_url: str, output_path: str):
             "-ac",
             "1",  # Mono
             "-y",  # Overwrite output file
-            output_path,
+            partial_path,
         ]
 
-        process = subprocess.Popen(
-            convert_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        stdout, stderr = process.communicate()
+        with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "ffmpeg"):
+            process = subprocess.Popen(
+                convert_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            stdout, stderr = process.communicate()
 
         if process.returncode != 0:
             raise Exception(f"ffmpeg conversion failed: {stderr.decode()}")
+        os.replace(partial_path, output_path)
 
         # Clean up the original downloaded file
         if downloaded_file and os.path.exists(downloaded_file):
@@ -244,12 +517,38 @@ async def download_audio(video_url: str, output_path: str):
         raise
 
 
-async def transcribe_with_whisper(audio_path: str) -> str:
-    """Transcribe audio file using Whisper."""
+async def trim_audio(audio_path: str, offset: float, output_path: str):
+    """Write the audio from offset seconds onwards to output_path."""
+    trim_command = [
+        "ffmpeg",
+        "-ss",
+        f"{offset:.3f}",
+        "-i",
+        audio_path,
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        "16000",
+        "-ac",
+        "1",
+        "-y",
+        output_path,
+    ]
+    with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "ffmpeg"):
+        process = subprocess.Popen(
+            trim_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        stdout, stderr = process.communicate()
+    if process.returncode != 0:
+        raise Exception(f"ffmpeg trim failed: {stderr.decode()}")
+
+
+async def transcribe_audio(audio_path: str) -> str:
+    """Transcribe audio file using the configured transcriber backend."""
     try:
-        model = whisper.load_model("base")
-        result = model.transcribe(audio_path)
-        return result["text"]
+        with observe_stage(TRANSCRIPTION_STAGE_SECONDS, "whisper"):
+            segments = list(get_transcriber().transcribe(audio_path))
+        return "".join(segment.text for segment in segments)
     except Exception as e:
         logger.error(f"Error transcribing audio: {e}")
         raise
@@ -257,68 +556,31 @@ async def transcribe_with_whisper(audio_path: str) -> str:
 
 async def process_transcription(video_id: str, video_url: str):
     """Process video transcription including metadata and audio transcription."""
-    audio_path = f"temp_{video_id}.wav"
+    audio_path = os.path.join(settings.SCRATCH_DIR, f"temp_{video_id}.wav")
 
     try:
         # Get video metadata first
-        with YoutubeDL() as ydl:
-            info = ydl.extract_info(video_url, download=False)
-            title = info.get("title")
-            thumbnail = info.get("thumbnail")
-
-        async with async_session() as db:
-            async with db.begin():
-                # Update video with metadata
-                result = await db.execute(
-                    select(VideoTranscription).where(
-                        VideoTranscription.video_id == video_id
-                    )
-                )
-                transcription = result.scalar_one_or_none()
-                if transcription:
-                    transcription.title = title
-                    transcription.thumbnail_url = thumbnail
-                    transcription.status = TranscriptionStatus.PENDING
-                    await db.commit()
+        metadata = extract_metadata(video_url)
+        writer = TranscriptionWriter(video_id)
+        writer.set_metadata(
+            metadata["title"], metadata["thumbnail"], metadata["duration"]
+        )
 
         # Download audio
         await download_audio(video_url, audio_path)
 
-        # Load Whisper model and transcribe
-        model = whisper.load_model("base")
-        result = model.transcribe(audio_path)
-        transcript_text = result["text"]
-
-        # Update database with transcript
-        async with async_session() as db:
-            async with db.begin():
-                result = await db.execute(
-                    select(VideoTranscription).where(
-                        VideoTranscription.video_id == video_id
-                    )
-                )
-                transcription = result.scalar_one_or_none()
-                if transcription:
-                    transcription.transcript = transcript_text
-                    transcription.status = TranscriptionStatus.COMPLETED
-                    await db.commit()
+        # Transcribe with the configured backend
+        transcript_text = await transcribe_audio(audio_path)
+
+        # Update database with transcript and metadata in one statement
+        await writer.save(transcript_text, completed=True)
 
         logger.info(f"Successfully transcribed video {video_id}")
 
     except Exception as e:
         logger.error(f"Error processing video {video_id}: {str(e)}")
         # Update status to error in database
-        async with async_session() as db:
-            async with db.begin():
-                result = await db.execute(
-                    select(VideoTranscription).where(
-                        VideoTranscription.video_id == video_id
-                    )
-                )
-                transcription = result.scalar_one_or_none()
-                if transcription:
-                    transcription.status = TranscriptionStatus.ERROR
-                    await db.commit()
+        await set_transcription_status(video_id, TranscriptionStatus.ERROR)
         raise
 
     finally:
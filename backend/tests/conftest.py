@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+# Enough configuration to import the app without a .env file
+for name, value in {
+    "DB_USER": "postgres",
+    "DB_PASSWORD": "postgres",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "videogpt_test",
+    "JWT_SECRET": "test-secret",
+    "GOOGLE_API_KEY": "test-key",
+}.items():
+    os.environ.setdefault(name, value)
+
+# Database tests empty the tables they use, so they never run against DB_NAME
+if os.environ.get("TEST_DB_NAME"):
+    os.environ["DB_NAME"] = os.environ["TEST_DB_NAME"]
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("TEST_DB_NAME"):
+        return
+    skip = pytest.mark.skip(reason="set TEST_DB_NAME to a throwaway database")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,67 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+from utils.embedding_engine import EmbeddingEngine
+from utils.metrics import EMBEDDED_CHUNKS
+
+TEXTS = [f"chunk {index} " * (index % 7 + 1) for index in range(40)]
+
+
+class FakeBackend:
+    """Encodes each text as its length and the id of the encoding process."""
+
+    def encode(self, texts, batch_size=32):
+        return np.asarray([[len(text), os.getpid()] for text in texts], np.float32)
+
+
+def load_fake_backend(threads: int) -> FakeBackend:
+    return FakeBackend()
+
+
+def embedded(mode: str) -> float:
+    return EMBEDDED_CHUNKS.labels(mode)._value.get()
+
+
+def test_long_inputs_are_encoded_by_the_pool():
+    engine = EmbeddingEngine(
+        FakeBackend(), 4, processes=2, pool_min_texts=10, loader=load_fake_backend
+    )
+    before = embedded("pool")
+    try:
+        embeddings = engine.embed(TEXTS)
+    finally:
+        engine.close()
+
+    assert embedded("pool") - before == len(TEXTS)
+    assert embeddings[:, 0].tolist() == [len(text) for text in TEXTS]
+    # Encoded in the pool's processes, not in this one
+    assert os.getpid() not in set(embeddings[:, 1].tolist())
+    assert engine.processes == 2
+
+
+def test_short_inputs_are_encoded_in_process():
+    engine = EmbeddingEngine(
+        FakeBackend(), 4, processes=2, pool_min_texts=100, loader=load_fake_backend
+    )
+    embeddings = engine.embed(TEXTS)
+    assert set(embeddings[:, 1].tolist()) == {os.getpid()}
+    assert engine._pool is None
+
+
+def _processes_in_daemonic_child(results):
+    engine = EmbeddingEngine(FakeBackend(), 4, processes=2, loader=load_fake_backend)
+    results.put(engine.processes)
+
+
+def test_daemonic_processes_encode_in_process():
+    # Like a Celery prefork child, which may not start processes of its own
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(
+        target=_processes_in_daemonic_child, args=(results,), daemon=True
+    )
+    child.start()
+    child.join(30)
+    assert results.get(timeout=5) == 0
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+transformers = pytest.importorskip("transformers")
+
+from utils.embedding_backends import (  # noqa: E402
+    OnnxBackend,
+    SentenceTransformerBackend,
+    cosine_agreement,
+    export_quantized_onnx,
+)
+
+WORDS = "the talk covers part of segment a in some detail hello world".split()
+TEXTS = [
+    "the talk covers part of segment a",
+    "hello world",
+    "some detail in the talk",
+    "a part of the world",
+]
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """A tiny randomly initialized BERT with its tokenizer, saved locally."""
+    directory = tmp_path / "model"
+    directory.mkdir()
+    vocab = directory / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    transformers.BertTokenizerFast(str(vocab)).save_pretrained(directory)
+    config = transformers.BertConfig(
+        vocab_size=5 + len(WORDS),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+    )
+    transformers.BertModel(config).save_pretrained(directory)
+    return str(directory)
+
+
+def test_exported_model_matches_pytorch(model_dir, tmp_path):
+    onnx_path = tmp_path / "model.int8.onnx"
+    export_quantized_onnx(model_dir, str(onnx_path))
+    assert [path.name for path in tmp_path.glob("*.onnx")] == ["model.int8.onnx"]
+
+    agreement = cosine_agreement(
+        SentenceTransformerBackend(model_dir),
+        OnnxBackend(model_dir, str(onnx_path)),
+        TEXTS,
+    )
+    assert agreement.min() > 0.99
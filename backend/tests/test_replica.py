@@ -0,0 +1,201 @@
+"""Reads from a streaming replica that has not replayed the latest writes.
+
+Needs the two-instance setup from docker-compose.replica.yml, or any primary
+and hot standby, with DB_READ_HOST and DB_READ_PORT pointing at the standby
+and DB_USER a superuser, so the test can cut the standby off from the primary.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import delete, select, text, update
+
+import models.user_video_summary  # noqa: F401, registers the table for init_db
+from db import (
+    REPLICA_LAG_QUERY,
+    async_session,
+    dispose_engines,
+    engine,
+    init_db,
+    read_engine,
+    read_session,
+    reads_replica,
+)
+from models.query_interaction import QueryInteraction
+from models.video_transcription import TranscriptionStatus, VideoTranscription
+from routes.query import load_video
+from routes.transcript import get_transcription_status
+from routes.videos import get_video_details
+from services.transcript import load_chunk_texts
+from utils.chunking import IncrementalChunker
+
+pytestmark = [
+    pytest.mark.postgres,
+    pytest.mark.skipif(
+        not os.environ.get("DB_READ_HOST"), reason="set DB_READ_HOST to a replica"
+    ),
+]
+
+TRANSCRIPT = " ".join(f"Sentence {index} of the talk." for index in range(300))
+
+
+def run(coroutine):
+    """Run a test body in a fresh loop, closing its connections at the end."""
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await dispose_engines()
+
+    return asyncio.run(main())
+
+
+def chunk_columns() -> dict:
+    chunker = IncrementalChunker()
+    chunker.add(TRANSCRIPT)
+    chunks = chunker.flush()
+    return {
+        "transcript": TRANSCRIPT,
+        "chunk_spans": [[chunk.start_offset, chunk.end_offset] for chunk in chunks],
+        "embeddings": [[float(index)] for index in range(len(chunks))],
+        "transcript_source": "captions",
+    }
+
+
+async def wait_for_replay(timeout: float = 10) -> None:
+    async with engine.connect() as conn:
+        lsn = await conn.scalar(text("SELECT pg_current_wal_lsn()::text"))
+    deadline = time.monotonic() + timeout
+    async with read_engine.connect() as conn:
+        while not await conn.scalar(
+            text(
+                "SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)"
+            ),
+            {"lsn": lsn},
+        ):
+            assert time.monotonic() < deadline, "replica did not catch up"
+            await asyncio.sleep(0.05)
+
+
+@asynccontextmanager
+async def replica_disconnected():
+    """Stop the replica's WAL receiver, so it falls behind but reports no lag.
+
+    Receive and replay positions stay equal, the case REPLICA_LAG_QUERY
+    cannot tell from a replica that is current.
+    """
+    async with read_engine.connect() as conn:
+        conninfo = await conn.scalar(text("SHOW primary_conninfo"))
+    await configure_replica("ALTER SYSTEM SET primary_conninfo = ''")
+    try:
+        async with read_engine.connect() as conn:
+            while await conn.scalar(text("SELECT count(*) FROM pg_stat_wal_receiver")):
+                await asyncio.sleep(0.05)
+        yield
+    finally:
+        escaped = conninfo.replace("'", "''")
+        await configure_replica(f"ALTER SYSTEM SET primary_conninfo = '{escaped}'")
+
+
+async def configure_replica(statement: str) -> None:
+    async with read_engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(statement))
+        await conn.execute(text("SELECT pg_reload_conf()"))
+
+
+async def reset(video: VideoTranscription = None) -> None:
+    await init_db()
+    async with async_session() as db:
+        await db.execute(delete(QueryInteraction))
+        await db.execute(delete(VideoTranscription))
+        if video is not None:
+            db.add(video)
+        await db.commit()
+    await wait_for_replay()
+
+
+async def replica_lag() -> float:
+    async with read_engine.connect() as conn:
+        return float(await conn.scalar(REPLICA_LAG_QUERY))
+
+
+async def read_everything(video_id: str) -> dict:
+    async with read_session() as db:
+        assert reads_replica(db)
+        on_replica = (
+            await db.execute(
+                select(VideoTranscription.status).where(
+                    VideoTranscription.video_id == video_id
+                )
+            )
+        ).scalar()
+        status = await get_transcription_status(video_id, False, db, "user")
+        details = await get_video_details(video_id, db, "user")
+        video = await load_video(db, video_id)
+        texts = await load_chunk_texts(db, video_id, [0, 1])
+    return {
+        "on_replica": on_replica,
+        "status": status["status"],
+        "details": details["status"],
+        "chunks": video.chunk_count(),
+        "texts": sorted(texts),
+        "lag": await replica_lag(),
+    }
+
+
+def test_row_not_yet_replayed_is_read_from_primary():
+    async def main():
+        await reset()
+        async with replica_disconnected():
+            async with async_session() as db:
+                db.add(
+                    VideoTranscription(
+                        video_id="new",
+                        video_url="https://youtu.be/new",
+                        status=TranscriptionStatus.COMPLETED,
+                        **chunk_columns(),
+                    )
+                )
+                await db.commit()
+            return await read_everything("new")
+
+    result = run(main())
+    # The lag estimate cannot see that the replica is behind
+    assert result["lag"] == 0
+    assert result["on_replica"] is None
+    assert result["status"] == result["details"] == TranscriptionStatus.COMPLETED
+    assert result["chunks"] > 1
+    assert result["texts"] == [0, 1]
+
+
+def test_unfinished_row_is_read_from_primary():
+    async def main():
+        await reset(
+            VideoTranscription(
+                video_id="running",
+                video_url="https://youtu.be/running",
+                status=TranscriptionStatus.PENDING,
+            )
+        )
+        async with replica_disconnected():
+            async with async_session() as db:
+                await db.execute(
+                    update(VideoTranscription)
+                    .where(VideoTranscription.video_id == "running")
+                    .values(status=TranscriptionStatus.COMPLETED, **chunk_columns())
+                )
+                await db.commit()
+            return await read_everything("running")
+
+    result = run(main())
+    # The lag estimate cannot see that the replica is behind
+    assert result["lag"] == 0
+    assert result["on_replica"] == TranscriptionStatus.PENDING
+    assert result["status"] == result["details"] == TranscriptionStatus.COMPLETED
+    assert result["chunks"] > 1
+    assert result["texts"] == [0, 1]
@@ -0,0 +1,277 @@
+import os
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import delete, select, text
+
+import models.user_video_summary  # noqa: F401, registers the table for init_db
+from db import async_session, dispose_engines, init_db
+from models.query_interaction import QueryInteraction
+from models.video_transcription import TranscriptionStatus, VideoTranscription
+from services.transcript import Checkpoint, load_checkpoint
+from tasks import video_processor
+from tasks.video_processor import resume_chunker, run_async
+from utils.chunking import IncrementalChunker
+from utils.cleanup import ResourceCleaner
+from utils.transcribers import Segment
+
+# Ten seconds of speech per segment, long enough to fill several chunks
+SEGMENTS = [
+    Segment(
+        index * 10.0,
+        (index + 1) * 10.0,
+        f" Segment {index} covers part {index % 5} of the talk in some detail.",
+    )
+    for index in range(60)
+]
+DURATION = SEGMENTS[-1].end
+
+# Compared between an interrupted and an uninterrupted run
+RESULT_COLUMNS = ["transcript", "chunk_spans", "chunk_times", "embeddings"]
+
+
+class WorkerKilled(Exception):
+    pass
+
+
+class FakeTranscriber:
+    """Transcribes SEGMENTS from wherever the audio file starts.
+
+    Records the absolute start of every segment it produces, and raises
+    after fail_after segments to simulate the worker being killed.
+    """
+
+    def __init__(self, offsets: Dict[str, float], fail_after: int = None):
+        self.offsets = offsets
+        self.fail_after = fail_after
+        self.starts: List[float] = []
+
+    def transcribe(self, audio_path: str):
+        offset = self.offsets.get(audio_path, 0.0)
+        for segment in SEGMENTS:
+            if segment.start < offset:
+                continue
+            if self.fail_after is not None and len(self.starts) == self.fail_after:
+                raise WorkerKilled()
+            self.starts.append(segment.start)
+            yield Segment(segment.start - offset, segment.end - offset, segment.text)
+
+
+def test_resumed_chunker_continues_where_the_checkpoint_ends():
+    uninterrupted = IncrementalChunker()
+    for segment in SEGMENTS:
+        uninterrupted.add(segment.text, segment.start, segment.end)
+    expected = uninterrupted.take_ready() + uninterrupted.flush()
+
+    interrupted = IncrementalChunker()
+    for segment in SEGMENTS[:35]:
+        interrupted.add(segment.text, segment.start, segment.end)
+    saved = interrupted.take_ready()
+    checkpoint = Checkpoint(
+        None,
+        None,
+        DURATION,
+        "whisper",
+        [[s.start, s.end, s.text] for s in SEGMENTS[:35]],
+        len(saved),
+    )
+
+    chunker, offset = resume_chunker("video", checkpoint)
+    assert offset == SEGMENTS[34].end
+    for segment in SEGMENTS[35:]:
+        chunker.add(segment.text, segment.start, segment.end)
+    assert saved + chunker.take_ready() + chunker.flush() == expected
+
+    checkpoint.chunk_count += 1
+    with pytest.raises(ValueError):
+        resume_chunker("video", checkpoint)
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    """Patch out YouTube, audio and embeddings around the real task and writer.
+
+    Returns what the fakes observed: trim offsets, downloads and caption
+    lookups.
+    """
+    calls: Dict = {"offsets": {}, "downloads": [], "captions": []}
+
+    async def download_audio(video_url, output_path):
+        calls["downloads"].append(video_url)
+        with open(output_path, "wb") as f:
+            f.write(b"audio")
+
+    async def trim_audio(audio_path, offset, output_path):
+        with open(output_path, "wb") as f:
+            f.write(b"remaining")
+        calls["offsets"][output_path] = offset
+
+    def select_caption_track(video_id):
+        calls["captions"].append(video_id)
+        return None
+
+    cleaner = ResourceCleaner(str(tmp_path))
+    monkeypatch.setattr(video_processor, "download_audio", download_audio)
+    monkeypatch.setattr(video_processor, "trim_audio", trim_audio)
+    monkeypatch.setattr(video_processor, "select_caption_track", select_caption_track)
+    monkeypatch.setattr(
+        video_processor,
+        "extract_metadata",
+        lambda url: {"title": "Talk", "thumbnail": None, "duration": DURATION},
+    )
+    monkeypatch.setattr(video_processor, "get_scratch_cleaner", lambda: cleaner)
+    monkeypatch.setattr(
+        video_processor, "get_embeddings", lambda texts: [[len(t)] for t in texts]
+    )
+    monkeypatch.setattr(video_processor.settings, "PARTIAL_FLUSH_SECONDS", 30)
+    monkeypatch.setattr(video_processor.settings, "INGEST_INSIGHTS_ENABLED", False)
+
+    run_async(reset())
+    yield calls
+    run_async(dispose_engines())
+
+
+async def reset() -> None:
+    await init_db()
+    async with async_session() as db:
+        await db.execute(delete(QueryInteraction))
+        await db.execute(delete(VideoTranscription))
+        await db.commit()
+
+
+async def add_video(video_id: str, **columns) -> None:
+    async with async_session() as db:
+        db.add(
+            VideoTranscription(
+                video_id=video_id,
+                video_url=f"https://youtu.be/{video_id}",
+                status=TranscriptionStatus.PENDING,
+                **columns,
+            )
+        )
+        await db.commit()
+
+
+async def load_row(video_id: str) -> VideoTranscription:
+    async with async_session() as db:
+        result = await db.execute(
+            select(VideoTranscription).where(VideoTranscription.video_id == video_id)
+        )
+        return result.scalars().one()
+
+
+def transcribe(monkeypatch, transcriber, video_id):
+    monkeypatch.setattr(video_processor, "get_transcriber", lambda: transcriber)
+    return video_processor.fetch_or_generate_transcript_with_whisper(
+        f"https://youtu.be/{video_id}"
+    )
+
+
+@pytest.mark.postgres
+def test_killed_job_resumes_from_its_checkpoint(worker, monkeypatch):
+    run_async(add_video("uninterrupt"))
+    transcribe(monkeypatch, FakeTranscriber(worker["offsets"]), "uninterrupt")
+    expected = run_async(load_row("uninterrupt"))
+    assert expected.status == TranscriptionStatus.COMPLETED
+
+    run_async(add_video("interrupted"))
+    killed = FakeTranscriber(worker["offsets"], fail_after=35)
+    with pytest.raises(WorkerKilled):
+        transcribe(monkeypatch, killed, "interrupted")
+    row = run_async(load_row("interrupted"))
+    assert row.status == TranscriptionStatus.ERROR
+    version = row.transcript_version
+
+    # The partial saves left a checkpoint behind the chunks they published
+    checkpoint = run_async(load_checkpoint("interrupted"))
+    assert checkpoint.resumable
+    assert checkpoint.chunk_count == len(row.chunk_spans)
+    assert checkpoint.segments == [
+        [s.start, s.end, s.text] for s in SEGMENTS[: len(checkpoint.segments)]
+    ]
+    offset = checkpoint.segments[-1][1]
+    assert 0 < offset < killed.starts[-1]
+
+    worker["captions"].clear()
+    worker["offsets"].clear()
+    resumed = FakeTranscriber(worker["offsets"])
+    transcribe(monkeypatch, resumed, "interrupted")
+
+    # Resumed on Whisper with the kept audio, from the checkpoint offset on
+    assert worker["captions"] == []
+    assert worker["downloads"] == [
+        "https://youtu.be/uninterrupt",
+        "https://youtu.be/interrupted",
+    ]
+    assert list(worker["offsets"].values()) == [offset]
+    assert resumed.starts == [s.start for s in SEGMENTS if s.start >= offset]
+
+    # The result matches a run that was never interrupted
+    row = run_async(load_row("interrupted"))
+    assert row.status == TranscriptionStatus.COMPLETED
+    for column in RESULT_COLUMNS:
+        assert getattr(row, column) == getattr(expected, column), column
+    # Appended to, not replaced, and the checkpoint is cleared on completion
+    assert row.transcript_version == version
+    assert row.whisper_segments is None
+    assert not run_async(load_checkpoint("interrupted")).resumable
+
+
+@pytest.mark.postgres
+def test_rows_with_stored_chunk_text_are_not_resumed(worker, monkeypatch):
+    # Saved before chunks were stored as offsets, so segments cannot be trusted
+    run_async(
+        add_video(
+            "legacyrow01",
+            title="Talk",
+            duration_seconds=DURATION,
+            transcript_source="whisper",
+            transcript=SEGMENTS[0].text,
+            chunks=[SEGMENTS[0].text],
+            whisper_segments=[[0.0, 10.0, SEGMENTS[0].text]],
+        )
+    )
+    checkpoint = run_async(load_checkpoint("legacyrow01"))
+    assert checkpoint.chunk_count == 0
+    assert not checkpoint.resumable
+
+    transcriber = FakeTranscriber(worker["offsets"])
+    transcribe(monkeypatch, transcriber, "legacyrow01")
+    assert worker["captions"] == ["legacyrow01"]
+    assert transcriber.starts == [s.start for s in SEGMENTS]
+    row = run_async(load_row("legacyrow01"))
+    assert row.status == TranscriptionStatus.COMPLETED
+    assert row.chunks is None
+
+
+@pytest.mark.postgres
+def test_failed_job_keeps_its_audio(worker, monkeypatch, tmp_path):
+    run_async(add_video("interrupted"))
+    with pytest.raises(WorkerKilled):
+        transcribe(
+            monkeypatch,
+            FakeTranscriber(worker["offsets"], fail_after=35),
+            "interrupted",
+        )
+    assert os.path.exists(tmp_path / "interrupted" / "audio.wav")
+
+
+@pytest.mark.postgres
+def test_json_null_chunk_spans_are_not_resumed(worker):
+    # Left by writers that cleared columns to JSON null rather than NULL
+    async def main():
+        await add_video("jsonnullrow", transcript_source="whisper")
+        async with async_session() as db:
+            await db.execute(
+                text(
+                    "UPDATE video_transcriptions SET chunk_spans = 'null'::json, "
+                    "whisper_segments = '[[0, 10, \"Hi\"]]' "
+                    "WHERE video_id = 'jsonnullrow'"
+                )
+            )
+            await db.commit()
+        return await load_checkpoint("jsonnullrow")
+
+    checkpoint = run_async(main())
+    assert checkpoint.chunk_count == 0
+    assert not checkpoint.resumable
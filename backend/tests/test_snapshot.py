@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, select
+
+import models.user_video_summary  # noqa: F401, registers the table for init_db
+from db import async_session, engine, init_db
+from models.query_interaction import QueryInteraction
+from models.video_transcription import TranscriptionStatus, VideoTranscription
+from scripts.snapshot import export_snapshot, import_snapshot
+from utils.chunking import IncrementalChunker
+
+pytestmark = pytest.mark.postgres
+
+TRANSCRIPT = " ".join(
+    f"Sentence {index} explains part {index % 7} of the topic." for index in range(400)
+)
+
+# Compared after the round trip; id and updated_at are assigned on import
+COMPARED = [
+    "video_id",
+    "video_url",
+    "title",
+    "thumbnail_url",
+    "duration_seconds",
+    "transcribed_seconds",
+    "transcript_source",
+    "transcript",
+    "chunk_spans",
+    "chunk_times",
+    "embeddings",
+    "summary",
+    "summary_embedding",
+    "section_summaries",
+    "section_embeddings",
+    "canonical_answers",
+    "status",
+    "created_at",
+]
+
+
+def run(coroutine):
+    """Run a test body in a fresh loop, closing its connections at the end."""
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def make_video(video_id: str) -> VideoTranscription:
+    chunker = IncrementalChunker()
+    chunker.add(TRANSCRIPT)
+    chunks = chunker.flush()
+    # Exactly representable in float32, as snapshots store embeddings
+    embeddings = [[index / 4, -index / 8, 0.5] for index in range(len(chunks))]
+    return VideoTranscription(
+        video_id=video_id,
+        video_url=f"https://www.youtube.com/watch?v={video_id}",
+        title=f"Video {video_id}",
+        thumbnail_url=f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+        duration_seconds=600.0,
+        transcribed_seconds=600.0,
+        transcript_source="captions:manual:en",
+        transcript=TRANSCRIPT,
+        chunk_spans=[[chunk.start_offset, chunk.end_offset] for chunk in chunks],
+        chunk_times=[[index * 10.0, index * 10.0 + 10] for index in range(len(chunks))],
+        embeddings=embeddings,
+        summary="A summary.",
+        summary_embedding=[0.25, 0.5, 0.75],
+        section_summaries=[
+            {"start_chunk": 0, "end_chunk": len(chunks), "summary": "Section."}
+        ],
+        section_embeddings=[[1.0, 0.0, 0.0]],
+        canonical_answers={"what is this video about?": "The topic."},
+        status=TranscriptionStatus.COMPLETED,
+    )
+
+
+async def reset_tables() -> None:
+    await init_db()
+    async with async_session() as db:
+        await db.execute(delete(QueryInteraction))
+        await db.execute(delete(models.user_video_summary.UserVideoSummary))
+        await db.execute(delete(VideoTranscription))
+        await db.commit()
+
+
+async def load_rows() -> dict:
+    async with async_session() as db:
+        videos = (await db.execute(select(VideoTranscription))).scalars().all()
+    return {
+        video.video_id: {column: getattr(video, column) for column in COMPARED}
+        for video in videos
+    }
+
+
+def test_export_then_import_into_empty_table(tmp_path):
+    path = str(tmp_path / "videos.parquet")
+
+    async def body():
+        await reset_tables()
+        async with async_session() as db:
+            db.add_all([make_video("aaaaaaaaaaa"), make_video("bbbbbbbbbbb")])
+            db.add(
+                VideoTranscription(
+                    video_id="ccccccccccc",
+                    video_url="https://www.youtube.com/watch?v=ccccccccccc",
+                    status=TranscriptionStatus.PENDING,
+                )
+            )
+            await db.commit()
+        exported = {
+            video_id: row
+            for video_id, row in (await load_rows()).items()
+            if row["status"] == TranscriptionStatus.COMPLETED
+        }
+        await export_snapshot(path, batch_size=1)
+
+        async with async_session() as db:
+            await db.execute(delete(VideoTranscription))
+            await db.commit()
+        await import_snapshot(path, batch_size=1, replace=False)
+        return exported, await load_rows()
+
+    exported, imported = run(body())
+    assert imported == exported
+
+
+def test_replace_overwrites_and_invalidates_chunk_references(tmp_path):
+    path = str(tmp_path / "videos.parquet")
+
+    async def body():
+        await reset_tables()
+        async with async_session() as db:
+            video = make_video("aaaaaaaaaaa")
+            video.transcript_version = 1
+            db.add(video)
+            await db.commit()
+        await export_snapshot(path, batch_size=10)
+
+        async with async_session() as db:
+            video = (await db.execute(select(VideoTranscription))).scalars().one()
+            video.title = "Edited"
+            await db.commit()
+        await import_snapshot(path, batch_size=10, replace=False)
+        skipped = (await load_rows())["aaaaaaaaaaa"]["title"]
+        await import_snapshot(path, batch_size=10, replace=True)
+        async with async_session() as db:
+            video = (await db.execute(select(VideoTranscription))).scalars().one()
+        return skipped, video
+
+    skipped, video = run(body())
+    assert skipped == "Edited"
+    assert video.title == "Video aaaaaaaaaaa"
+    assert video.transcript_version == 2
@@ -0,0 +1,121 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+    """Split text into overlapping chunks."""
+    chunks = []
+    start = 0
+    text_length = len(text)
+
+    while start < text_length:
+        end = min(start + chunk_size, text_length)
+        # If this is not the first chunk, include the overlap
+        if start > 0:
+            chunk_start = max(start - overlap, 0)
+        else:
+            chunk_start = start
+        chunks.append(text[chunk_start:end])
+        start = end - overlap if end < text_length else text_length
+
+    return chunks
+
+
+@dataclass
+class Chunk:
+    text: str
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+    # [start, end) character offsets into the chunker's text
+    start_offset: Optional[int] = None
+    end_offset: Optional[int] = None
+
+
+class IncrementalChunker:
+    """Chunk text that arrives piece by piece, e.g. as transcription segments.
+
+    Emits exactly the chunks chunk_text would produce for the final text, but
+    releases each one as soon as later text can no longer change it. When
+    pieces carry timestamps, each chunk is tagged with the span it covers.
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 100):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.text = ""
+        self.start = 0
+        # Character offset where each timed piece starts, and its times
+        self._offsets: List[int] = []
+        self._times: List[tuple] = []
+
+    def add(
+        self,
+        text: str,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+    ) -> None:
+        if start_time is not None and end_time is not None:
+            self._offsets.append(len(self.text))
+            self._times.append((start_time, end_time))
+        self.text += text
+
+    def _time_at(self, offset: int, index: int) -> Optional[float]:
+        position = bisect_right(self._offsets, offset) - 1
+        if position < 0:
+            return None
+        return self._times[position][index]
+
+    def _emit(self, end: int) -> Chunk:
+        chunk_start = max(self.start - self.overlap, 0) if self.start > 0 else 0
+        return Chunk(
+            self.text[chunk_start:end],
+            self._time_at(chunk_start, 0),
+            self._time_at(end - 1, 1),
+            chunk_start,
+            end,
+        )
+
+    def take_ready(self) -> List[Chunk]:
+        """Chunks that are final regardless of any text added later."""
+        chunks = []
+        # A chunk ending exactly at the current end of text would be the last
+        # one in chunk_text, so wait until text extends past it
+        while self.start + self.chunk_size < len(self.text):
+            end = self.start + self.chunk_size
+            chunks.append(self._emit(end))
+            self.start = end - self.overlap
+        return chunks
+
+    def flush(self) -> List[Chunk]:
+        """All remaining chunks, once no more text will be added."""
+        chunks = self.take_ready()
+        text_length = len(self.text)
+        while self.start < text_length:
+            end = min(self.start + self.chunk_size, text_length)
+            chunks.append(self._emit(end))
+            self.start = end - self.overlap if end < text_length else text_length
+        return chunks
+
+
+def slice_chunks(transcript: Optional[str], spans: Optional[List[list]]) -> List[str]:
+    """Chunk text from [start, end) offsets into the transcript."""
+    if not transcript or not spans:
+        return []
+    return [transcript[start:end] for start, end in spans]
+
+
+def locate_chunks(transcript: Optional[str], chunks: List[str]) -> Optional[List[list]]:
+    """[start, end) offsets of consecutive chunks in transcript, if all are found."""
+    if not transcript:
+        return None
+    spans = []
+    position = 0
+    for chunk in chunks:
+        start = transcript.find(chunk, position)
+        if start < 0:
+            return None
+        spans.append([start, start + len(chunk)])
+        # Chunks overlap, so the next one starts before this one ends
+        position = start + 1
+    return spans
@@ -1,27 +1,286 @@
+import asyncio
+import fcntl
 import logging
 import os
-from datetime import datetime, timedelta
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import IO, Iterator, List, NamedTuple, Optional
+
+from config import get_settings
+from utils.metrics import SCRATCH_EVICTIONS, SCRATCH_FILES, SCRATCH_USAGE_BYTES
 
 logger = logging.getLogger(__name__)
 
+LOCK_FILE = ".lock"
+# Bytes a job has reserved for files it is about to write
+RESERVATION_FILE = ".reserved"
+# Serializes capacity checks and reservations across processes
+QUOTA_LOCK_FILE = ".quota.lock"
+
+
+class ScratchQuotaExceeded(Exception):
+    pass
+
+
+class JobDir(NamedTuple):
+    path: str
+    # Bytes on disk, or the job's reservation if that is larger
+    size: int
+    files: int
+    mtime: float
+    # Reserved bytes not yet written
+    pending: int = 0
+
+
+def _try_lock(path: str) -> Optional[IO]:
+    """Lock an idle job directory, or None if a running job holds it."""
+    try:
+        lock = open(os.path.join(path, LOCK_FILE), "a")
+    except OSError:
+        return None
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+
+def _lock(path: str) -> IO:
+    """Create a job directory if needed and wait for its lock."""
+    lock_path = os.path.join(path, LOCK_FILE)
+    while True:
+        os.makedirs(path, exist_ok=True)
+        try:
+            lock = open(lock_path, "a")
+        except FileNotFoundError:
+            continue  # Moved aside for removal meanwhile
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # A directory removed while we waited leaves us holding a stale lock
+            if os.stat(lock_path).st_ino == os.fstat(lock.fileno()).st_ino:
+                return lock
+        except FileNotFoundError:
+            pass
+        lock.close()
+
+
+def _write_reservation(path: str, size: int) -> None:
+    partial_path = os.path.join(path, f"{RESERVATION_FILE}.partial")
+    with open(partial_path, "w") as f:
+        f.write(str(size))
+    os.replace(partial_path, os.path.join(path, RESERVATION_FILE))
+
+
+def _measure(path: str) -> JobDir:
+    size = files = reserved = 0
+    mtime = 0.0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if entry.name == RESERVATION_FILE:
+                        with open(entry.path) as f:
+                            reserved = int(f.read() or 0)
+                    else:
+                        size += stat.st_size
+                        files += 1
+                    mtime = max(mtime, stat.st_mtime)
+    return JobDir(path, max(size, reserved), files, mtime, max(reserved - size, 0))
+
 
 class ResourceCleaner:
-    def __init__(self, temp_dir: str, max_age_hours: int = 24):
-        self.temp_dir = temp_dir
+    """Owns the application scratch directory used for audio and intermediates.
+
+    Each job works in its own subdirectory, held under an flock while in use.
+    Directories that are not locked are removed once they are older than
+    max_age_hours, or evicted oldest first when the quota would be exceeded.
+    A job can reserve space before writing, and its directory then counts as
+    at least that size until it is removed.
+    """
+
+    def __init__(
+        self,
+        scratch_dir: str,
+        max_age_hours: int = 24,
+        quota_bytes: Optional[int] = None,
+        min_free_bytes: int = 0,
+    ):
+        self.scratch_dir = scratch_dir
         self.max_age_hours = max_age_hours
+        self.quota_bytes = quota_bytes
+        self.min_free_bytes = min_free_bytes
+        os.makedirs(scratch_dir, exist_ok=True)
+
+    def _job_dirs(self) -> List[JobDir]:
+        jobs = []
+        with os.scandir(self.scratch_dir) as entries:
+            for entry in entries:
+                if entry.name == QUOTA_LOCK_FILE:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        jobs.append(_measure(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        jobs.append(JobDir(entry.path, stat.st_size, 1, stat.st_mtime))
+                except FileNotFoundError:
+                    # Removed by its job while we were scanning
+                    continue
+        return jobs
+
+    def _remove(self, job: JobDir, reason: str) -> bool:
+        try:
+            if os.path.isdir(job.path):
+                lock = _try_lock(job.path)
+                if lock is None:
+                    return False
+                # Held throughout, and the directory is moved aside first, so a
+                # job starting meanwhile waits and then gets a fresh directory
+                with lock:
+                    removing_path = f"{job.path}.removing-{uuid.uuid4().hex[:8]}"
+                    os.rename(job.path, removing_path)
+                    shutil.rmtree(removing_path)
+            else:
+                os.remove(job.path)
+        except OSError as e:
+            logger.error(f"Failed to delete {job.path}: {e}")
+            return False
+        SCRATCH_EVICTIONS.labels(reason).inc()
+        logger.info(f"Removed scratch entry {job.path} ({reason}, {job.size} bytes)")
+        return True
+
+    def _record_usage(self, jobs: List[JobDir]) -> int:
+        usage = sum(job.size for job in jobs)
+        SCRATCH_USAGE_BYTES.set(usage)
+        SCRATCH_FILES.set(sum(job.files for job in jobs))
+        return usage
+
+    def sweep(self) -> int:
+        """Remove expired job directories; returns bytes still in use."""
+        cutoff = time.time() - self.max_age_hours * 3600
+        remaining = []
+        for job in self._job_dirs():
+            if job.mtime < cutoff and self._remove(job, "expired"):
+                continue
+            remaining.append(job)
+        return self._record_usage(remaining)
+
+    def _shortfall(self, jobs: List[JobDir], required_bytes: int) -> int:
+        shortfall = 0
+        if self.quota_bytes is not None:
+            usage = sum(job.size for job in jobs)
+            shortfall = usage + required_bytes - self.quota_bytes
+        if self.min_free_bytes:
+            # Reserved space is free on disk until its job writes it
+            pending = sum(job.pending for job in jobs)
+            free = shutil.disk_usage(self.scratch_dir).free - pending
+            shortfall = max(shortfall, self.min_free_bytes + required_bytes - free)
+        return shortfall
+
+    @contextmanager
+    def _quota_lock(self) -> Iterator[None]:
+        with open(os.path.join(self.scratch_dir, QUOTA_LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _make_room(self, required_bytes: int, job_path: Optional[str]) -> int:
+        """Evict idle jobs until required_bytes fit; returns any shortfall left."""
+        self.sweep()
+        # A job's own earlier reservation is replaced, not added to
+        jobs = [job for job in self._job_dirs() if job.path != job_path]
+        shortfall = self._shortfall(jobs, required_bytes)
+        if shortfall <= 0:
+            return shortfall
+        for job in sorted(jobs, key=lambda job: job.mtime):
+            if self._remove(job, "quota"):
+                shortfall -= job.size
+                if shortfall <= 0:
+                    break
+        self.sweep()
+        return shortfall
+
+    def ensure_capacity(
+        self,
+        required_bytes: int,
+        timeout: float = 0,
+        poll_interval: float = 5,
+        job_path: Optional[str] = None,
+    ) -> None:
+        """Make room for required_bytes, evicting idle jobs and then waiting.
+
+        With job_path, the space is also reserved for that job directory, so
+        concurrent jobs cannot all claim the same free space. Without it the
+        space is only checked.
+
+        Raises ScratchQuotaExceeded if the space cannot be found in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._quota_lock():
+                shortfall = self._make_room(required_bytes, job_path)
+                if shortfall <= 0:
+                    if job_path is not None:
+                        _write_reservation(job_path, required_bytes)
+                    return
+
+            if time.monotonic() >= deadline:
+                raise ScratchQuotaExceeded(
+                    f"Need {required_bytes} bytes in {self.scratch_dir}, "
+                    f"short by {shortfall} bytes"
+                )
+            time.sleep(poll_interval)
+
+    @contextmanager
+    def job_dir(self, name: str, keep_on_error: bool = False) -> Iterator[str]:
+        """A locked working directory for one job, removed when the job ends.
+
+        With keep_on_error, a failed job leaves its files for a retry to
+        reuse until they expire or are evicted.
+        """
+        path = os.path.join(self.scratch_dir, name)
+        with _lock(path) as lock:
+            failed = False
+            try:
+                yield path
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                if not (failed and keep_on_error):
+                    shutil.rmtree(path, ignore_errors=True)
+                fcntl.flock(lock, fcntl.LOCK_UN)
 
     async def cleanup_temp_files(self):
-        """Clean up temporary files older than max_age_hours."""
+        """Clean up expired scratch files without blocking the event loop."""
         try:
-            now = datetime.now()
-            for filename in os.listdir(self.temp_dir):
-                filepath = os.path.join(self.temp_dir, filename)
-                file_modified = datetime.fromtimestamp(os.path.getmtime(filepath))
-                if now - file_modified > timedelta(hours=self.max_age_hours):
-                    try:
-                        os.remove(filepath)
-                        logger.info(f"Cleaned up old temp file: {filepath}")
-                    except OSError as e:
-                        logger.error(f"Failed to delete {filepath}: {e}")
+            await asyncio.to_thread(self.sweep)
         except Exception as e:
             logger.error(f"Error during temp file cleanup: {e}")
+
+    async def run_periodic(self, interval_seconds: float):
+        """Janitor loop for the API process; cancel the task to stop it."""
+        while True:
+            await self.cleanup_temp_files()
+            await asyncio.sleep(interval_seconds)
+
+
+@lru_cache()
+def get_scratch_cleaner() -> ResourceCleaner:
+    settings = get_settings()
+    return ResourceCleaner(
+        settings.SCRATCH_DIR,
+        max_age_hours=settings.SCRATCH_MAX_AGE_HOURS,
+        quota_bytes=settings.SCRATCH_QUOTA_MB * 1024 * 1024,
+        min_free_bytes=settings.SCRATCH_MIN_FREE_MB * 1024 * 1024,
+    )
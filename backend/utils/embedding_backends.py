@@ -0,0 +1,170 @@
+import inspect
+import logging
+from pathlib import Path
+from typing import List, Optional, Protocol, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Matches the max_seq_length the sentence-transformers model was trained with
+MAX_SEQUENCE_LENGTH = 256
+
+
+def _repository(model_name: str) -> str:
+    """Where to load a model from: a local copy, or its sentence-transformers repo."""
+    if Path(model_name).is_dir():
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+
+class EmbeddingBackend(Protocol):
+    """Anything with the subset of the SentenceTransformer encode API we use."""
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        ...
+
+
+class SentenceTransformerBackend:
+    """Full-precision PyTorch model via sentence-transformers."""
+
+    def __init__(self, model_name: str, threads: int = 0):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self._torch = torch
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        with self._torch.no_grad():
+            return self.model.encode(texts, batch_size=batch_size)
+
+
+class OnnxBackend:
+    """Exported (optionally int8-quantized) ONNX model run with onnxruntime.
+
+    Uses the tokenizer published with the sentence-transformers model and
+    reproduces its mean pooling and normalization, so vectors are comparable
+    with SentenceTransformerBackend output.
+    """
+
+    def __init__(self, model_name: str, onnx_path: str, threads: int = 0):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "The onnx embedding backend requires onnxruntime and transformers"
+            ) from e
+
+        if not Path(onnx_path).exists():
+            raise FileNotFoundError(
+                f"ONNX model not found at {onnx_path}; "
+                "run python -m scripts.export_onnx_embeddings first"
+            )
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            onnx_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(_repository(model_name))
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=MAX_SEQUENCE_LENGTH,
+            return_tensors="np",
+        )
+        inputs = {
+            name: value.astype(np.int64)
+            for name, value in tokens.items()
+            if name in self.input_names
+        }
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(
+            mask.sum(axis=1), 1e-9, None
+        )
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        if isinstance(texts, str):
+            return self._encode_batch([texts])[0]
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(
+            [
+                self._encode_batch(texts[start : start + batch_size])
+                for start in range(0, len(texts), batch_size)
+            ]
+        )
+
+
+def load_backend(
+    name: str, model_name: str, onnx_path: Optional[str] = None, threads: int = 0
+) -> EmbeddingBackend:
+    """Create the embedding backend selected in settings."""
+    if name == "torch":
+        return SentenceTransformerBackend(model_name, threads)
+    if name == "onnx":
+        return OnnxBackend(model_name, onnx_path, threads)
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+def export_quantized_onnx(model_name: str, output_path: str) -> None:
+    """Export the transformer behind a sentence-transformers model to int8 ONNX."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    repository = _repository(model_name)
+    tokenizer = AutoTokenizer.from_pretrained(repository)
+    model = AutoModel.from_pretrained(repository).eval()
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fp32_path = output.with_suffix(".fp32.onnx")
+
+    sample = tokenizer(["An example sentence"], return_tensors="pt")
+    # Inputs are bound by position, so follow forward()'s order, which is
+    # not the tokenizer's (token_type_ids would land on attention_mask)
+    input_names = [
+        name for name in inspect.signature(model.forward).parameters if name in sample
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    quantize_dynamic(str(fp32_path), str(output), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+    logger.info(f"Exported int8 ONNX model to {output}")
+
+
+def cosine_agreement(
+    reference: EmbeddingBackend, candidate: EmbeddingBackend, texts: List[str]
+) -> np.ndarray:
+    """Per-text cosine similarity between two backends' embeddings."""
+    expected = np.asarray(reference.encode(texts), dtype=np.float32)
+    actual = np.asarray(candidate.encode(texts), dtype=np.float32)
+    return np.sum(expected * actual, axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
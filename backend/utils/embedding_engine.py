@@ -0,0 +1,190 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from config import get_settings
+from utils.embedding_backends import EmbeddingBackend, load_backend
+from utils.embeddings import get_model
+from utils.metrics import EMBEDDED_CHUNKS
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# The model each pool process loads once, in _init_pool_process
+_pool_backend: Optional[EmbeddingBackend] = None
+_engine = None
+
+
+def load_configured_backend(threads: int) -> EmbeddingBackend:
+    """The backend selected in settings, as loaded by each pool process."""
+    return load_backend(
+        settings.EMBEDDING_BACKEND,
+        settings.EMBEDDING_MODEL,
+        settings.EMBEDDING_ONNX_PATH,
+        threads,
+    )
+
+
+def _init_pool_process(loader: Callable[[int], EmbeddingBackend], threads: int):
+    global _pool_backend
+    _pool_backend = loader(threads)
+
+
+def _encode_in_pool_process(texts: List[str], batch_size: int) -> np.ndarray:
+    return np.asarray(_pool_backend.encode(texts, batch_size=batch_size))
+
+
+def length_sorted_batches(texts: List[str], batch_size: int) -> List[List[int]]:
+    """Indices of texts in batches of similar length.
+
+    Every text in a batch is padded to the longest one, so batching short
+    chunks with long ones wastes most of the short chunks' compute.
+    """
+    order = sorted(range(len(texts)), key=lambda index: len(texts[index]))
+    return [
+        order[start : start + batch_size] for start in range(0, len(order), batch_size)
+    ]
+
+
+class EmbeddingEngine:
+    """Embeds transcript chunks at ingestion.
+
+    Chunks are encoded in length-sorted batches of batch_size. Inputs of at
+    least pool_min_texts are split across a pool of processes, each with its
+    own copy of the model, which is started on first use and kept. Each
+    pool process calls loader, a picklable function of the thread count,
+    to load its model.
+
+    Daemonic processes, such as Celery prefork children, may not start a
+    pool, so there every input is encoded in-process.
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        batch_size: int,
+        processes: int = 0,
+        pool_min_texts: int = 0,
+        loader: Callable[[int], EmbeddingBackend] = load_configured_backend,
+    ):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.processes = processes
+        self.pool_min_texts = pool_min_texts
+        self.loader = loader
+        if processes > 1 and multiprocessing.current_process().daemon:
+            logger.warning(
+                f"Ignoring {processes} embedding processes in a daemonic worker "
+                "process; run the worker with -P solo to use them"
+            )
+            self.processes = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Split the cores between processes instead of oversubscribing them
+            threads = settings.EMBEDDING_THREADS or max(
+                1, (os.cpu_count() or 1) // self.processes
+            )
+            self._pool = ProcessPoolExecutor(
+                self.processes,
+                # Forking would copy this process's model and thread pools
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_pool_process,
+                initargs=(self.loader, threads),
+            )
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _encode_in_pool(
+        self, texts: List[str], batches: List[List[int]]
+    ) -> List[np.ndarray]:
+        # A few runs of consecutive batches per process, so lengths stay sorted
+        # within each run and a slow run does not hold up the whole input
+        runs = self.processes * 4
+        size = -(-len(batches) // runs)
+        groups = [
+            batches[start : start + size] for start in range(0, len(batches), size)
+        ]
+        pool = self._get_pool()
+        futures = [
+            pool.submit(
+                _encode_in_pool_process,
+                [texts[index] for batch in group for index in batch],
+                self.batch_size,
+            )
+            for group in groups
+        ]
+        vectors = []
+        for group, future in zip(groups, futures):
+            encoded = future.result()
+            for batch in group:
+                vectors.append(encoded[: len(batch)])
+                encoded = encoded[len(batch) :]
+        return vectors
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """One embedding row per text, in input order."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        started = time.perf_counter()
+        batches = length_sorted_batches(texts, self.batch_size)
+        mode = "process"
+        vectors = None
+        if self.processes > 1 and len(texts) >= self.pool_min_texts:
+            try:
+                vectors = self._encode_in_pool(texts, batches)
+                mode = "pool"
+            except (AssertionError, BrokenProcessPool, OSError) as e:
+                logger.warning(f"Embedding pool unavailable, encoding in-process: {e}")
+                self.close()
+                self.processes = 0
+        if vectors is None:
+            vectors = [
+                np.asarray(
+                    self.backend.encode(
+                        [texts[index] for index in batch], batch_size=len(batch)
+                    )
+                )
+                for batch in batches
+            ]
+
+        embeddings = np.empty((len(texts), vectors[0].shape[1]), dtype=np.float32)
+        for batch, batch_vectors in zip(batches, vectors):
+            embeddings[batch] = batch_vectors
+
+        elapsed = time.perf_counter() - started
+        EMBEDDED_CHUNKS.labels(mode).inc(len(texts))
+        logger.info(
+            f"Embedded {len(texts)} chunks in {elapsed:.2f}s "
+            f"({len(texts) / max(elapsed, 1e-9):.0f} chunks/s, {mode})"
+        )
+        return embeddings
+
+
+def get_engine() -> EmbeddingEngine:
+    """The ingestion engine, built from settings on first use."""
+    global _engine
+    if _engine is None:
+        _engine = EmbeddingEngine(
+            get_model(),
+            settings.EMBEDDING_BATCH_SIZE,
+            settings.EMBEDDING_PROCESSES,
+            settings.EMBEDDING_POOL_MIN_CHUNKS,
+        )
+    return _engine
+
+
+def close_engine() -> None:
+    if _engine is not None:
+        _engine.close()
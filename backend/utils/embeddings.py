@@ -1,13 +1,36 @@
-from typing import List
+from typing import List, Tuple
 
 import numpy as np
-import torch
-from sentence_transformers import SentenceTransformer
 
 from config import get_settings
+from utils.embedding_backends import EmbeddingBackend, load_backend
+from utils.metrics import MODEL_CACHE_REQUESTS
 
 settings = get_settings()
-model = SentenceTransformer("all-MiniLM-L6-v2")
+_model = None
+
+
+def get_model() -> EmbeddingBackend:
+    """Load the configured embedding backend on first use."""
+    global _model
+    label = f"{settings.EMBEDDING_BACKEND}-{settings.EMBEDDING_MODEL}"
+    if _model is not None:
+        MODEL_CACHE_REQUESTS.labels(label, "hit").inc()
+    else:
+        MODEL_CACHE_REQUESTS.labels(label, "miss").inc()
+        _model = load_backend(
+            settings.EMBEDDING_BACKEND,
+            settings.EMBEDDING_MODEL,
+            settings.EMBEDDING_ONNX_PATH,
+            settings.EMBEDDING_THREADS,
+        )
+    return _model
+
+
+def set_model(model: EmbeddingBackend) -> None:
+    """Replace the embedding model, e.g. with an offline stand-in for benchmarks."""
+    global _model
+    _model = model
 
 
 def split_transcript_into_chunks(transcript: str, chunk_size: int = 300) -> List[str]:
@@ -35,16 +58,25 @@ def split_transcript_into_chunks(transcript: str, chunk_size: int = 300) -> List
 
 def get_embeddings(text: str) -> np.ndarray:
     """Generate embeddings for a piece of text."""
-    with torch.no_grad():
-        return model.encode(text)
+    return get_model().encode(text)
 
 
-def find_relevant_chunks(
-    query: str, chunks: List[str], embeddings: List[np.ndarray], top_k: int = 3
-) -> List[str]:
-    """Find the most relevant chunks for a given query."""
-    query_embedding = get_embeddings(query)
+def get_batch_embeddings(texts: List[str]) -> np.ndarray:
+    """Encode several texts in one forward pass; one row per text."""
+    return np.asarray(get_model().encode(texts))
+
+
+def rank_chunks(
+    query: str, embeddings: List[np.ndarray], top_k: int = 3
+) -> List[Tuple[int, float]]:
+    """Return (chunk index, cosine similarity) for the top_k chunks, best first."""
+    return score_chunks(get_embeddings(query), embeddings, top_k)
 
+
+def score_chunks(
+    query_embedding: np.ndarray, embeddings: List[np.ndarray], top_k: int = 3
+) -> List[Tuple[int, float]]:
+    """Rank chunk embeddings against an already encoded query."""
     # Calculate similarities
     similarities = [
         np.dot(query_embedding, chunk_embedding)
@@ -55,4 +87,26 @@ def find_relevant_chunks(
     # Get indices of top_k most similar chunks
     top_indices = np.argsort(similarities)[-top_k:][::-1]
 
-    return [chunks[i] for i in top_indices]
+    return [(int(i), float(similarities[i])) for i in top_indices]
+
+
+def score_chunks_batch(
+    query_embeddings: np.ndarray, embeddings: np.ndarray, top_k: int = 3
+) -> List[List[Tuple[int, float]]]:
+    """Rank one embedding matrix against many queries with a single product."""
+    queries = query_embeddings / np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+    matrix = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarities = queries @ matrix.T
+
+    ranked = []
+    for row in similarities:
+        top_indices = np.argsort(row)[-top_k:][::-1]
+        ranked.append([(int(i), float(row[i])) for i in top_indices])
+    return ranked
+
+
+def find_relevant_chunks(
+    query: str, chunks: List[str], embeddings: List[np.ndarray], top_k: int = 3
+) -> List[str]:
+    """Find the most relevant chunks for a given query."""
+    return [chunks[i] for i, _ in rank_chunks(query, embeddings, top_k)]
@@ -0,0 +1,87 @@
+import gzip
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+import brotli
+from fastapi import Request, Response
+
+# Bodies smaller than this are not worth the CPU to compress
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+# Brotli's higher qualities are too slow for per-request compression
+BROTLI_QUALITY = 5
+ENCODINGS = ("br", "gzip")
+# Clients may store responses but must revalidate them before reuse
+CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+
+
+def make_etag(key: str, updated_at: datetime) -> str:
+    """Strong validator for a representation that changes with updated_at."""
+    return f'"{key}-{int(updated_at.timestamp() * 1_000_000):x}"'
+
+
+def match_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """Return the If-None-Match entry naming etag in any encoding, if any."""
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    opaque = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        opaque_candidate = candidate.strip('"')
+        base, _, encoding = opaque_candidate.rpartition("-")
+        if opaque_candidate == opaque or (base == opaque and encoding in ENCODINGS):
+            return candidate
+    return None
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, preferring br."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip()] = quality
+    for coding in ENCODINGS:
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+
+
+def not_modified(etag: str) -> Response:
+    """304 echoing the validator the client already holds."""
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
+
+
+def cached_json_response(request: Request, content: dict, etag: str) -> Response:
+    """Serialize content as JSON, compressed for the client, with its ETag.
+
+    Each encoding gets its own strong ETag, as the bytes differ between them.
+    """
+    body = json.dumps(content, separators=(",", ":")).encode()
+    body, encoding = compress(
+        body, negotiate_encoding(request.headers.get("accept-encoding", ""))
+    )
+    headers = dict(CACHE_HEADERS)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        etag = f'{etag[:-1]}-{encoding}"'
+    headers["ETag"] = etag
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator
+
+import redis
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+ASK_QUESTION_STAGE_SECONDS = Histogram(
+    "videogpt_ask_question_stage_seconds",
+    "Time spent in each stage of answering a question",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+TRANSCRIPTION_STAGE_SECONDS = Histogram(
+    "videogpt_transcription_stage_seconds",
+    "Time spent in each stage of the transcription task",
+    ["stage"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200),
+)
+
+JSON_DECODE_SECONDS = Histogram(
+    "videogpt_json_decode_seconds",
+    "Time spent decoding JSON columns read from the database",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+
+MODEL_CACHE_REQUESTS = Counter(
+    "videogpt_model_cache_requests_total",
+    "Model lookups served from the in-process cache or loaded from disk",
+    ["model", "result"],
+)
+
+SCRATCH_USAGE_BYTES = Gauge(
+    "videogpt_scratch_usage_bytes",
+    "Bytes used in the scratch directory at the last scan",
+    multiprocess_mode="livemax",
+)
+
+SCRATCH_FILES = Gauge(
+    "videogpt_scratch_files",
+    "Files in the scratch directory at the last scan",
+    multiprocess_mode="livemax",
+)
+
+SCRATCH_EVICTIONS = Counter(
+    "videogpt_scratch_evictions_total",
+    "Scratch entries removed by the janitor",
+    ["reason"],
+)
+
+TRANSCRIPT_SOURCES = Counter(
+    "videogpt_transcript_sources_total",
+    "Completed transcriptions by where their text came from",
+    ["source"],
+)
+
+RESUMED_TRANSCRIPTIONS = Counter(
+    "videogpt_resumed_transcriptions_total",
+    "Whisper jobs that found a checkpoint, by whether it could be used",
+    ["result"],
+)
+
+WHISPER_RUNS_AVOIDED = Counter(
+    "videogpt_whisper_runs_avoided_total",
+    "Videos transcribed from captions that an English-only lookup would have missed",
+    ["kind"],
+)
+
+EMBEDDED_CHUNKS = Counter(
+    "videogpt_embedded_chunks_total",
+    "Chunks embedded at ingestion, in the worker process or a process pool",
+    ["mode"],
+)
+
+INTERACTION_WRITES = Counter(
+    "videogpt_interaction_writes_total",
+    "Query interactions by how they were persisted, or dropped or failed",
+    ["result"],
+)
+
+DB_READ_ROUTES = Counter(
+    "videogpt_db_read_routes_total",
+    "Read-only sessions by the database they were routed to",
+    ["target"],
+)
+
+
+@contextmanager
+def observe_stage(histogram: Histogram, stage: str) -> Iterator[None]:
+    """Record the wall-clock duration of the enclosed block under a stage label."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(stage).observe(time.perf_counter() - started)
+
+
+def timed_json_loads(value: str) -> Any:
+    """json.loads that feeds JSON_DECODE_SECONDS, used as the engine deserializer."""
+    started = time.perf_counter()
+    try:
+        return json.loads(value)
+    finally:
+        JSON_DECODE_SECONDS.observe(time.perf_counter() - started)
+
+
+class DatabasePoolCollector:
+    """Reports connection pool usage of an engine at scrape time."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        pool = self.engine.pool
+        yield GaugeMetricFamily(
+            "videogpt_db_pool_checked_out",
+            "Connections currently checked out of the pool",
+            value=pool.checkedout(),
+        )
+        yield GaugeMetricFamily(
+            "videogpt_db_pool_overflow",
+            "Connections open beyond the configured pool size",
+            value=max(pool.overflow(), 0),
+        )
+        yield GaugeMetricFamily(
+            "videogpt_db_pool_size", "Configured pool size", value=pool.size()
+        )
+
+
+class CeleryQueueCollector:
+    """Reports the number of messages waiting in each Redis-backed Celery queue."""
+
+    def __init__(self, broker_url: str, queues: Iterable[str]):
+        self.client = redis.Redis.from_url(broker_url, socket_timeout=1)
+        self.queues = list(queues)
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        family = GaugeMetricFamily(
+            "videogpt_celery_queue_depth",
+            "Messages waiting in the Celery broker queue",
+            labels=["queue"],
+        )
+        for queue in self.queues:
+            try:
+                family.add_metric([queue], self.client.llen(queue))
+            except redis.RedisError as e:
+                logger.warning(f"Could not read depth of queue {queue}: {e}")
+        yield family
+
+
+def get_registry() -> CollectorRegistry:
+    """Registry to expose, aggregating across processes in multiprocess mode."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics(registry: CollectorRegistry) -> bytes:
+    return generate_latest(registry)
@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Shared by the API and workers, so one toggle reaches every process
+CONFIG_KEY = "videogpt:profiling"
+PROFILE_SUFFIX = ".folded"
+
+
+@dataclass
+class ProfilingConfig:
+    enabled: bool
+    # Fraction of requests and tasks whose profile is always kept
+    sample_rate: float
+    # Also keep the profile of anything slower than this; 0 disables. Every
+    # request and task is sampled while this is set, to catch the slow ones
+    slow_ms: float
+
+    @classmethod
+    def from_settings(cls) -> "ProfilingConfig":
+        return cls(
+            settings.PROFILING_ENABLED,
+            settings.PROFILE_SAMPLE_RATE,
+            settings.PROFILE_SLOW_MS,
+        )
+
+
+def fold_stack(frame) -> str:
+    """Root-first "function (file:line)" frames joined by semicolons.
+
+    One line of this plus a count is the collapsed format read by
+    flamegraph.pl, speedscope and most other flame graph tools.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} "
+            f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Statistical profiler sampling other threads' stacks every interval.
+
+    One background thread serves every open session and stops when the last
+    one closes. Sessions on the same thread, such as concurrent requests on
+    the event loop, all receive that thread's samples, so a request's
+    profile includes whatever else the loop ran meanwhile.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self._lock = threading.Lock()
+        self._sessions: Dict[int, Tuple[int, Counter]] = {}
+        self._next_token = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> int:
+        """Begin sampling the calling thread; returns a token for stop()."""
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._sessions[token] = (threading.get_ident(), Counter())
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="stack-sampler", daemon=True
+                )
+                self._thread.start()
+        return token
+
+    def stop(self, token: int) -> Counter:
+        """Folded stacks and their sample counts for the session."""
+        with self._lock:
+            return self._sessions.pop(token)[1]
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                sessions = list(self._sessions.values())
+            frames = sys._current_frames()
+            folded: Dict[int, str] = {}
+            for thread_id, counts in sessions:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                if thread_id not in folded:
+                    folded[thread_id] = fold_stack(frame)
+                counts[folded[thread_id]] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class ProfileStore:
+    """Folded stack files in one directory, keeping only the newest max_files."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(self, kind: str, name: str, duration: float, counts: Counter) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        label = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")[:80]
+        filename = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{kind}-{label}"
+            f"-{int(duration * 1000)}ms-{uuid.uuid4().hex[:6]}{PROFILE_SUFFIX}"
+        )
+        path = os.path.join(self.directory, filename)
+        partial_path = f"{path}.partial"
+        with open(partial_path, "w") as f:
+            for stack, count in counts.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(partial_path, path)
+        self._prune()
+        return filename
+
+    def _entries(self) -> List[os.DirEntry]:
+        try:
+            with os.scandir(self.directory) as entries:
+                profiles = [
+                    entry for entry in entries if entry.name.endswith(PROFILE_SUFFIX)
+                ]
+        except FileNotFoundError:
+            return []
+        return sorted(profiles, key=lambda entry: entry.stat().st_mtime, reverse=True)
+
+    def _prune(self) -> None:
+        for entry in self._entries()[self.max_files :]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # Pruned by another process
+
+    def list(self) -> List[dict]:
+        """Stored profiles, newest first."""
+        return [
+            {"name": entry.name, "bytes": entry.stat().st_size}
+            for entry in self._entries()
+        ]
+
+    def path(self, filename: str) -> Optional[str]:
+        """Path of a stored profile, or None for unknown or unsafe names."""
+        if os.path.basename(filename) != filename or not filename.endswith(
+            PROFILE_SUFFIX
+        ):
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.isfile(path) else None
+
+
+@lru_cache()
+def get_sampler() -> StackSampler:
+    return StackSampler(settings.PROFILE_INTERVAL_MS / 1000)
+
+
+@lru_cache()
+def get_profile_store() -> ProfileStore:
+    return ProfileStore(settings.PROFILE_DIR, settings.PROFILE_MAX_FILES)
+
+
+@lru_cache()
+def _redis() -> redis.Redis:
+    # Short timeout: the API refreshes the config off the event loop, but
+    # workers read it inline before each task
+    return redis.Redis.from_url(settings.REDIS_BROKER, socket_timeout=0.5)
+
+
+# (config, time.monotonic() when it was read)
+_config: Tuple[ProfilingConfig, float] = (
+    ProfilingConfig.from_settings(),
+    float("-inf"),
+)
+
+
+def config_is_stale() -> bool:
+    return time.monotonic() - _config[1] >= settings.PROFILE_CONFIG_TTL_SECONDS
+
+
+def refresh_config() -> ProfilingConfig:
+    """Read the runtime config from Redis, keeping the last one on failure."""
+    global _config
+    config = _config[0]
+    try:
+        stored = _redis().get(CONFIG_KEY)
+        config = (
+            ProfilingConfig(**json.loads(stored))
+            if stored
+            else ProfilingConfig.from_settings()
+        )
+    except Exception as e:
+        logger.warning(f"Failed to read profiling config: {e}")
+    _config = (config, time.monotonic())
+    return config
+
+
+def get_config() -> ProfilingConfig:
+    return refresh_config() if config_is_stale() else _config[0]
+
+
+def set_config(config: ProfilingConfig) -> None:
+    """Apply a config to every API and worker process within the TTL."""
+    global _config
+    _redis().set(CONFIG_KEY, json.dumps(asdict(config)))
+    _config = (config, time.monotonic())
+
+
+@dataclass
+class ActiveProfile:
+    token: int
+    started: float
+    # Kept regardless of duration, as part of the sample_rate share
+    sampled: bool
+    slow_seconds: Optional[float]
+
+
+def start_profile(config: ProfilingConfig) -> Optional[ActiveProfile]:
+    """Start sampling the calling thread if config selects this unit of work."""
+    if not config.enabled:
+        return None
+    sampled = random.random() < config.sample_rate
+    if not sampled and config.slow_ms <= 0:
+        return None
+    return ActiveProfile(
+        get_sampler().start(),
+        time.perf_counter(),
+        sampled,
+        config.slow_ms / 1000 if config.slow_ms > 0 else None,
+    )
+
+
+def finish_profile(profile: ActiveProfile, kind: str, name: str) -> Optional[str]:
+    """Stop sampling and store the profile if it was sampled or slow."""
+    duration = time.perf_counter() - profile.started
+    counts = get_sampler().stop(profile.token)
+    slow = profile.slow_seconds is not None and duration >= profile.slow_seconds
+    if not counts or not (profile.sampled or slow):
+        return None
+    try:
+        filename = get_profile_store().save(kind, name, duration, counts)
+    except OSError as e:
+        logger.warning(f"Failed to save profile of {kind} {name}: {e}")
+        return None
+    logger.info(f"Profiled {kind} {name} ({duration:.2f}s) to {filename}")
+    return filename
@@ -0,0 +1,105 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterator, Tuple
+
+from utils.metrics import MODEL_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_models: Dict[Tuple[str, str], object] = {}
+
+
+@dataclass
+class Segment:
+    """A piece of transcribed speech with its position in the audio, in seconds."""
+
+    start: float
+    end: float
+    text: str
+
+
+def _cached_model(backend: str, model_size: str, loader):
+    """Load a model once per worker process."""
+    key = (backend, model_size)
+    if key in _models:
+        MODEL_CACHE_REQUESTS.labels(f"{backend}-{model_size}", "hit").inc()
+    else:
+        MODEL_CACHE_REQUESTS.labels(f"{backend}-{model_size}", "miss").inc()
+        _models[key] = loader()
+    return _models[key]
+
+
+class WhisperTranscriber:
+    """openai-whisper running in fp32 on CPU."""
+
+    name = "whisper"
+
+    def __init__(self, model_size: str = "base", threads: int = 0, beam_size: int = 1):
+        self.model_size = model_size
+        self.threads = threads
+        self.beam_size = beam_size
+
+    def transcribe(self, audio_path: str) -> Iterator[Segment]:
+        import torch
+        import whisper
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        model = _cached_model(
+            self.name, self.model_size, lambda: whisper.load_model(self.model_size)
+        )
+        options = {"fp16": False}
+        # Leave whisper's default greedy decoding with temperature fallback alone
+        if self.beam_size > 1:
+            options["beam_size"] = self.beam_size
+        result = model.transcribe(audio_path, **options)
+        for segment in result["segments"]:
+            yield Segment(segment["start"], segment["end"], segment["text"])
+
+
+class FasterWhisperTranscriber:
+    """CTranslate2 Whisper via faster-whisper with int8 weights on CPU.
+
+    Segments are yielded as they are decoded rather than at the end.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str = "base", threads: int = 0, beam_size: int = 1):
+        self.model_size = model_size
+        self.threads = threads
+        self.beam_size = beam_size
+
+    def transcribe(self, audio_path: str) -> Iterator[Segment]:
+        from faster_whisper import WhisperModel
+
+        model = _cached_model(
+            self.name,
+            self.model_size,
+            lambda: WhisperModel(
+                self.model_size,
+                device="cpu",
+                compute_type="int8",
+                cpu_threads=self.threads,
+            ),
+        )
+        segments, _ = model.transcribe(audio_path, beam_size=self.beam_size)
+        for segment in segments:
+            yield Segment(segment.start, segment.end, segment.text)
+
+
+TRANSCRIBERS = {
+    WhisperTranscriber.name: WhisperTranscriber,
+    FasterWhisperTranscriber.name: FasterWhisperTranscriber,
+}
+
+
+def load_transcriber(
+    name: str, model_size: str = "base", threads: int = 0, beam_size: int = 1
+):
+    """Create the transcriber selected in settings."""
+    try:
+        transcriber_class = TRANSCRIBERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown transcriber backend: {name}")
+    return transcriber_class(model_size, threads, beam_size)
@@ -0,0 +1,53 @@
+import re
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+YOUTUBE_HOSTS = {
+    "youtube.com",
+    "www.youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtube-nocookie.com",
+    "www.youtube-nocookie.com",
+}
+SHORT_HOSTS = {"youtu.be", "www.youtu.be"}
+# Paths whose next segment is the video id, e.g. /shorts/<id>
+ID_PATH_PREFIXES = {"shorts", "embed", "live", "v", "e"}
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """The 11-character id of a YouTube video from any URL form, or None.
+
+    Handles watch URLs with extra parameters, youtu.be links, shorts, embeds,
+    live and mobile URLs, URLs without a scheme and bare ids.
+    """
+    url = url.strip()
+    if VIDEO_ID_PATTERN.match(url):
+        return url
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    host = (parts.hostname or "").lower()
+    segments = [segment for segment in parts.path.split("/") if segment]
+
+    candidate = None
+    if host in SHORT_HOSTS:
+        candidate = segments[0] if segments else None
+    elif host in YOUTUBE_HOSTS:
+        if segments == ["watch"]:
+            candidate = parse_qs(parts.query).get("v", [None])[0]
+        elif len(segments) >= 2 and segments[0] in ID_PATH_PREFIXES:
+            candidate = segments[1]
+    if candidate and VIDEO_ID_PATTERN.match(candidate):
+        return candidate
+    return None
+
+
+def canonical_url(video_id: str) -> str:
+    """The one URL stored and passed to workers for a video."""
+    return f"https://www.youtube.com/watch?v={video_id}"
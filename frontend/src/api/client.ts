@@ -68,11 +68,24 @@ export const getTranscriptionStatus = async (videoId: string) => {
   return response.data;
 };
 
+export const getTranscript = async (
+  videoId: string,
+  params: { start_chunk?: number; limit?: number; start_time?: number; end_time?: number } = {}
+) => {
+  const response = await api.get(`/transcript/${videoId}`, { params });
+  return response.data;
+};
+
 export const askQuestion = async (videoId: string, question: string) => {
   const response = await api.post('/query/ask-question', { video_id: videoId, question });
   return response.data;
 };
 
+export const askQuestions = async (videoId: string, questions: string[]) => {
+  const response = await api.post('/query/ask-questions', { video_id: videoId, questions });
+  return response.data;
+};
+
 export const logout = async () => {
   try {
     const response = await api.post('/auth/logout');
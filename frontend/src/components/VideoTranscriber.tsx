@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { useMutation, useQuery } from 'react-query';
+import { useInfiniteQuery, useMutation, useQuery } from 'react-query';
 import { useNavigate } from 'react-router-dom';
 import ReactMarkdown from 'react-markdown';
 import api from '../api/client';
@@ -17,6 +17,18 @@ interface QueryHistory {
   timestamp: string;
 }
 
+interface HistoryPage<T> {
+  items: T[];
+  nextCursor?: string;
+}
+
+// History endpoints return one page at a time, with the next page's cursor
+// in the X-Next-Cursor header
+async function fetchHistoryPage<T>(url: string, cursor?: string): Promise<HistoryPage<T>> {
+  const response = await api.get(url, { params: cursor ? { cursor } : undefined });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] };
+}
+
 interface VideoDetails {
   video_id: string;
   video_title: string;
@@ -33,26 +45,38 @@ export default function VideoTranscriber() {
   const navigate = useNavigate();
 
   // Fetch video history
-  const { data: videoHistory, isLoading: isLoadingHistory } = useQuery<VideoHistory[]>(
+  const {
+    data: videoHistoryPages,
+    isLoading: isLoadingHistory,
+    hasNextPage: hasMoreVideos,
+    fetchNextPage: fetchMoreVideos,
+    isFetchingNextPage: isFetchingMoreVideos,
+  } = useInfiniteQuery<HistoryPage<VideoHistory>>(
     'videoHistory',
-    async () => {
-      const response = await api.get('/videos/history');
-      return response.data;
+    ({ pageParam }) => fetchHistoryPage<VideoHistory>('/videos/history', pageParam),
+    {
+      getNextPageParam: (lastPage) => lastPage.nextCursor,
     }
   );
+  const videoHistory = videoHistoryPages?.pages.flatMap((page) => page.items);
 
   // Fetch query history for selected video
-  const { data: queryHistory, isLoading: isLoadingQueries } = useQuery<QueryHistory[]>(
+  const {
+    data: queryHistoryPages,
+    isLoading: isLoadingQueries,
+    hasNextPage: hasMoreQueries,
+    fetchNextPage: fetchMoreQueries,
+    isFetchingNextPage: isFetchingMoreQueries,
+  } = useInfiniteQuery<HistoryPage<QueryHistory>>(
     ['queryHistory', selectedVideoId],
-    async () => {
-      if (!selectedVideoId) return [];
-      const response = await api.get(`/videos/${selectedVideoId}/queries`);
-      return response.data;
-    },
+    ({ pageParam }) =>
+      fetchHistoryPage<QueryHistory>(`/videos/${selectedVideoId}/queries`, pageParam),
     {
       enabled: !!selectedVideoId,
+      getNextPageParam: (lastPage) => lastPage.nextCursor,
     }
   );
+  const queryHistory = queryHistoryPages?.pages.flatMap((page) => page.items);
 
   // Add query for video details
   const { data: videoDetails, isLoading: isLoadingDetails } = useQuery<VideoDetails>(
@@ -92,10 +116,9 @@ export default function VideoTranscriber() {
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     try {
-      await transcribeMutation.mutateAsync(videoUrl);
-      // Extract video ID and set as selected
-      const videoId = videoUrl.split('v=')[1];
-      setSelectedVideoId(videoId);
+      const result = await transcribeMutation.mutateAsync(videoUrl);
+      // The backend resolves every URL form (youtu.be, shorts, ...) to the id
+      setSelectedVideoId(result.video_id);
     } catch (error) {
       console.error('Error transcribing video:', error);
     }
@@ -191,6 +214,18 @@ export default function VideoTranscriber() {
               </div>
             )}
 
+            {hasMoreVideos && (
+              <div className="flex justify-center">
+                <button
+                  onClick={() => fetchMoreVideos()}
+                  disabled={isFetchingMoreVideos}
+                  className="text-blue-600 hover:text-blue-800 font-medium disabled:opacity-50"
+                >
+                  {isFetchingMoreVideos ? 'Loading...' : 'Load more videos'}
+                </button>
+              </div>
+            )}
+
             {/* New Video Form */}
             <div className="mt-8 bg-white rounded-lg shadow-sm p-6">
               <h3 className="text-lg font-medium text-gray-900 mb-4">Process New Video</h3>
@@ -326,6 +361,15 @@ export default function VideoTranscriber() {
                       </p>
                     </div>
                   ))}
+                  {hasMoreQueries && (
+                    <button
+                      onClick={() => fetchMoreQueries()}
+                      disabled={isFetchingMoreQueries}
+                      className="text-blue-600 hover:text-blue-800 font-medium disabled:opacity-50"
+                    >
+                      {isFetchingMoreQueries ? 'Loading...' : 'Load older questions'}
+                    </button>
+                  )}
                 </div>
               )}
             </div>